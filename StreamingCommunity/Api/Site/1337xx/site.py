@@ -12,6 +12,7 @@ from rich.console import Console
 from StreamingCommunity.Util.config_json import config_manager
 from StreamingCommunity.Util.headers import get_userAgent
 from StreamingCommunity.Util.table import TVShowManager
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -26,6 +27,7 @@ table_show_manager = TVShowManager()
 max_timeout = config_manager.get_int("REQUESTS", "timeout")
 
 
+@profiler.timed('search')
 def title_search(query: str) -> int:
     """
     Search for titles based on a search query.
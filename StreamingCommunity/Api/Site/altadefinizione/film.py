@@ -17,6 +17,7 @@ from StreamingCommunity.Util.headers import get_headers
 from StreamingCommunity.Util.config_json import config_manager
 from StreamingCommunity.Lib.Downloader import HLS_Downloader
 from StreamingCommunity.TelegramHelp.telegram_bot import get_bot_instance, TelegramSession
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -33,6 +34,7 @@ console = Console()
 max_timeout = config_manager.get_int("REQUESTS", "timeout")
 
 
+@profiler.timed('download_film')
 def download_film(select_title: MediaItem) -> str:
     """
     Downloads a film using the provided film ID, title name, and domain.
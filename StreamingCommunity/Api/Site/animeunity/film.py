@@ -4,6 +4,10 @@
 from rich.console import Console
 
 
+# Internal utilities
+from StreamingCommunity.Util.profiler import profiler
+
+
 # Logic class
 from .serie import download_episode
 from .util.ScrapeSerie import ScrapeSerieAnime
@@ -19,6 +23,7 @@ from StreamingCommunity.Api.Player.vixcloud import VideoSourceAnime
 console = Console()
 
 
+@profiler.timed('download_film')
 def download_film(select_title: MediaItem):
     """
     Function to download a film.
@@ -14,6 +14,7 @@ from StreamingCommunity.Util.os import os_manager
 from StreamingCommunity.Util.message import start_message
 from StreamingCommunity.Lib.Downloader import MP4_downloader
 from StreamingCommunity.TelegramHelp.telegram_bot import TelegramSession, get_bot_instance
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -82,6 +83,7 @@ def download_episode(index_select: int, scrape_serie: ScrapeSerieAnime, video_so
     return path, kill_handler
 
 
+@profiler.timed('download_series')
 def download_series(select_title: MediaItem, season_selection: str = None, episode_selection: str = None):
     """
     Function to download episodes of a TV series.
@@ -12,6 +12,7 @@ from StreamingCommunity.Util.config_json import config_manager
 from StreamingCommunity.Util.headers import get_userAgent
 from StreamingCommunity.Util.table import TVShowManager
 from StreamingCommunity.TelegramHelp.telegram_bot import get_bot_instance
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -51,6 +52,7 @@ def get_real_title(record: dict) -> str:
         return record.get('title_it', '')
 
 
+@profiler.timed('search')
 def title_search(query: str) -> int:
     """
     Perform anime search on animeunity.so.
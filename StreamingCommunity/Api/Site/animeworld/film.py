@@ -10,6 +10,7 @@ from rich.console import Console
 from StreamingCommunity.Util.os import os_manager
 from StreamingCommunity.Util.message import start_message
 from StreamingCommunity.Lib.Downloader import MP4_downloader
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -26,6 +27,7 @@ from StreamingCommunity.Api.Player.sweetpixel import VideoSource
 console = Console()
 
 
+@profiler.timed('download_film')
 def download_film(select_title: MediaItem):
     """
     Function to download a film.
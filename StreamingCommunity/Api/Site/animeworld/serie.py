@@ -14,6 +14,7 @@ from rich.prompt import Prompt
 from StreamingCommunity.Util.os import os_manager
 from StreamingCommunity.Util.message import start_message
 from StreamingCommunity.Lib.Downloader import MP4_downloader
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -70,6 +71,7 @@ def download_episode(index_select: int, scrape_serie: ScrapSerie) -> Tuple[str,b
     return path, kill_handler
 
 
+@profiler.timed('download_series')
 def download_series(select_title: MediaItem, episode_selection: str = None):
     """
     Function to download episodes of a TV series.
@@ -12,6 +12,7 @@ from rich.console import Console
 from StreamingCommunity.Util.config_json import config_manager
 from StreamingCommunity.Util.headers import get_userAgent, get_headers
 from StreamingCommunity.Util.table import TVShowManager
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -59,6 +60,7 @@ def get_session_and_csrf() -> dict:
     logging.info(f"CSRF Token: {csrf_token}")
     return session_id, csrf_token
 
+@profiler.timed('search')
 def title_search(query: str) -> int:
     """
     Function to perform an anime search using a provided title.
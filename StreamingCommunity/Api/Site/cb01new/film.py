@@ -11,6 +11,7 @@ from rich.console import Console
 from StreamingCommunity.Util.os import os_manager
 from StreamingCommunity.Util.message import start_message
 from StreamingCommunity.Lib.Downloader import HLS_Downloader
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -26,6 +27,7 @@ from StreamingCommunity.Api.Player.maxstream import VideoSource
 console = Console()
 
 
+@profiler.timed('download_film')
 def download_film(select_title: MediaItem) -> str:
     """
     Downloads a film using the provided obj.
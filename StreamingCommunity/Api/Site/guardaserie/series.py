@@ -13,6 +13,7 @@ from rich.prompt import Prompt
 # Internal utilities
 from StreamingCommunity.Util.message import start_message
 from StreamingCommunity.Lib.Downloader import HLS_Downloader
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -127,6 +128,7 @@ def download_episode(scape_info_serie: GetSerieInfo, index_season_selected: int,
                 break
 
 
+@profiler.timed('download_series')
 def download_series(dict_serie: MediaItem, season_selection: str = None, episode_selection: str = None) -> None:
     """
     Handle downloading a complete series.
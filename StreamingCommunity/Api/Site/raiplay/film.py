@@ -14,6 +14,7 @@ from StreamingCommunity.Util.os import os_manager
 from StreamingCommunity.Util.message import start_message
 from StreamingCommunity.Lib.Downloader import HLS_Downloader
 from StreamingCommunity.Util.headers import get_headers
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -29,6 +30,7 @@ from StreamingCommunity.Api.Player.mediapolisvod import VideoSource
 console = Console()
 
 
+@profiler.timed('download_film')
 def download_film(select_title: MediaItem) -> Tuple[str, bool]:
     """
     Downloads a film using the provided MediaItem information.
@@ -12,6 +12,7 @@ from StreamingCommunity.Util.table import TVShowManager
 from StreamingCommunity.Api.Template.config_loader import site_constant
 from StreamingCommunity.Api.Template.Class.SearchType import MediaManager
 from .util.ScrapeSerie import GetSerieInfo
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Variable
@@ -46,6 +47,7 @@ def determine_media_type(item):
         return "film"
 
 
+@profiler.timed('search')
 def title_search(query: str) -> int:
     """
     Search for titles based on a search query.
@@ -12,6 +12,7 @@ from StreamingCommunity.Util.os import os_manager
 from StreamingCommunity.Util.message import start_message
 from StreamingCommunity.Lib.Downloader import HLS_Downloader
 from StreamingCommunity.TelegramHelp.telegram_bot import TelegramSession, get_bot_instance
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -27,6 +28,7 @@ from StreamingCommunity.Api.Player.vixcloud import VideoSource
 console = Console()
 
 
+@profiler.timed('download_film')
 def download_film(select_title: MediaItem, proxy: str = None) -> str:
     """
     Downloads a film using the provided film ID, title name, and domain.
@@ -12,6 +12,7 @@ from rich.prompt import Prompt
 # Internal utilities
 from StreamingCommunity.Util.message import start_message
 from StreamingCommunity.Lib.Downloader import HLS_Downloader
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -118,6 +119,7 @@ def download_episode(index_season_selected: int, scrape_serie: GetSerieInfo, dow
             if stopped:
                 break
 
+@profiler.timed('download_series')
 def download_series(select_season: MediaItem, season_selection: str = None, episode_selection: str = None, proxy = None) -> None:
     """
     Handle downloading a complete series.
@@ -13,6 +13,7 @@ from rich.console import Console
 from StreamingCommunity.Util.config_json import config_manager
 from StreamingCommunity.Util.headers import get_userAgent
 from StreamingCommunity.Util.table import TVShowManager
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -45,6 +46,7 @@ def extract_nonce(proxy) -> str:
     return ""
 
 
+@profiler.timed('search')
 def title_search(query: str, proxy: str) -> int:
     """
     Search for titles based on a search query.
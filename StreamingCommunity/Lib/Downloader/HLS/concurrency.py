@@ -0,0 +1,244 @@
+# 17.10.26
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict
+
+
+# External libraries
+import httpx
+
+
+# Internal utilities
+from StreamingCommunity.Util.config_json import config_manager
+
+
+# Variable
+STORE_FILE_NAME = "concurrency.json"
+LATENCY_ALPHA = 0.2             # EWMA weight of the last request latency
+LATENCY_FACTOR = 2.5            # Latency over this many times the best one is a congestion signal
+DECREASE_FACTOR = 0.5           # Multiplicative decrease on congestion
+THROUGHPUT_TOLERANCE = 0.95     # A window under this fraction of the previous one stops the growth
+FAILURE_RATIO = 0.1             # Share of 5xx/timeouts in a window that counts as congestion
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Check if a request error is an explicit 429 Too Many Requests."""
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429
+
+
+def is_congestion_error(error: Exception) -> bool:
+    """
+    Check if a request error means the server is overloaded (429, 5xx or timeout).
+    Other errors (404, broken data) say nothing about the parallelism.
+
+    Parameters:
+        - error (Exception): Error raised by the request.
+    """
+    if isinstance(error, httpx.TimeoutException):
+        return True
+
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+
+    return False
+
+
+class ConcurrencyStore:
+    """
+    Best worker count found for each CDN host, kept in a JSON file next to config.json.
+    """
+    def __init__(self, path: str = None):
+        """
+        Parameters:
+            - path (str): Path of the JSON file (default next to config.json).
+        """
+        self.path = path or os.path.join(os.path.dirname(config_manager.file_path), STORE_FILE_NAME)
+        self.lock = threading.Lock()
+
+    def _read(self) -> Dict[str, dict]:
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+
+        except Exception as e:
+            logging.error(f"Invalid concurrency store {self.path}: {e}")
+            return {}
+
+    def get(self, host: str) -> int:
+        """Return the stored worker count of a host, or None."""
+        with self.lock:
+            workers = self._read().get(host, {}).get('workers')
+        return int(workers) if workers else None
+
+    def set(self, host: str, workers: int) -> None:
+        """Save the worker count of a host."""
+        with self.lock:
+            data = self._read()
+            data[host] = {'workers': int(workers), 'updated': int(time.time())}
+
+            try:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f, indent=4)
+                os.replace(tmp_path, self.path)
+
+            except Exception as e:
+                logging.error(f"Can't save concurrency store {self.path}: {e}")
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller of the number of segment requests in flight for one host.
+
+    Every window of `limit` completed requests the throughput is compared with the previous window:
+    while it keeps rising the limit grows by one. A 429, a window with many 5xx/timeouts or a latency
+    far above the best one seen halves the limit, at most once per window. The limit of the fastest window is kept in `best_limit`.
+    """
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: int = 32, adaptive: bool = True):
+        """
+        Parameters:
+            - initial (int): Starting number of requests in flight.
+            - min_limit (int): Lower bound of the limit.
+            - max_limit (int): Upper bound of the limit.
+            - adaptive (bool): If False the limit stays at `initial`.
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.adaptive = adaptive
+
+        self.lock = threading.Lock()
+
+        # Feedback
+        self.latency_ewma = None
+        self.min_latency = None
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.window_count = 0
+        self.window_failures = 0
+        self.window_congested = False
+        self.window_decreased = False
+        self.last_throughput = 0.0
+        self.best_throughput = 0.0
+        self.best_limit = int(self.limit)
+        self.n_decrease = 0
+
+    def get_limit(self) -> int:
+        """Return the current number of allowed requests in flight."""
+        return int(self.limit)
+
+    def _decrease(self, reason: str) -> None:
+        """Multiplicative decrease, at most once per window, lock must be held."""
+        if self.window_decreased:
+            return
+
+        old_limit = self.get_limit()
+        self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+        self.window_decreased = True
+        self.n_decrease += 1
+        logging.info(f"Concurrency {old_limit} -> {self.get_limit()} ({reason})")
+
+    def _close_window(self) -> None:
+        """Adjust the limit at the end of a window, lock must be held."""
+        elapsed = max(time.monotonic() - self.window_start, 1e-6)
+        throughput = self.window_bytes / elapsed
+
+        if throughput > self.best_throughput and not self.window_congested:
+            self.best_throughput = throughput
+            self.best_limit = self.get_limit()
+
+        if self.window_failures > (self.window_count + self.window_failures) * FAILURE_RATIO:
+            self._decrease(f"{self.window_failures} errors")
+
+        elif self.window_congested:
+            self._decrease(f"latency {self.latency_ewma:.2f}s")
+
+        elif not self.window_decreased and throughput >= self.last_throughput * THROUGHPUT_TOLERANCE and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+            logging.info(f"Concurrency -> {self.get_limit()} ({throughput / 1024 / 1024:.2f} MB/s)")
+
+        # Let the latency baseline follow a CDN that got slower for good
+        self.min_latency += (self.latency_ewma - self.min_latency) * LATENCY_ALPHA
+        self.last_throughput = throughput
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.window_count = 0
+        self.window_failures = 0
+        self.window_congested = False
+        self.window_decreased = False
+
+    def record_success(self, latency: float, size: int) -> None:
+        """
+        Feed the result of a completed request.
+
+        Parameters:
+            - latency (float): Seconds taken by the request.
+            - size (int): Bytes received.
+        """
+        if not self.adaptive:
+            return
+
+        with self.lock:
+            self.latency_ewma = latency if self.latency_ewma is None else \
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self.latency_ewma
+            self.min_latency = self.latency_ewma if self.min_latency is None else min(self.min_latency, self.latency_ewma)
+
+            if self.latency_ewma > self.min_latency * LATENCY_FACTOR:
+                self.window_congested = True
+
+            self.window_bytes += size
+            self.window_count += 1
+            if self.window_count >= self.get_limit():
+                self._close_window()
+
+    def record_failure(self, error: Exception) -> None:
+        """
+        Feed a failed request, only congestion errors reduce the limit.
+        A 429 cuts it right away, other errors are weighed at the end of the window.
+
+        Parameters:
+            - error (Exception): Error raised by the request.
+        """
+        if not self.adaptive or not is_congestion_error(error):
+            return
+
+        with self.lock:
+            if is_rate_limited(error):
+                self._decrease("429 Too Many Requests")
+            else:
+                self.window_failures += 1
+
+
+class ConcurrencyBudget:
+    """
+    Total number of segment requests in flight shared by the tracks downloaded at the same time.
+    """
+    def __init__(self, max_total: int):
+        """
+        Parameters:
+            - max_total (int): Max requests in flight across all tracks.
+        """
+        self.max_total = max(1, max_total)
+        self.inflight = 0
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Take a request slot if one is free."""
+        with self.lock:
+            if self.inflight >= self.max_total:
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self) -> None:
+        """Give back a request slot."""
+        with self.lock:
+            self.inflight -= 1
@@ -0,0 +1,114 @@
+# 17.10.26
+
+import atexit
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
+
+# Internal utilities
+from StreamingCommunity.Util.config_json import config_manager
+
+
+# Logic class
+from ...M3U8 import M3U8_Decryption
+
+
+# Config
+DECRYPT_STAGE = str(config_manager.get('M3U8_DOWNLOAD', 'decrypt_stage')).strip().lower()
+DECRYPT_WORKERS = config_manager.get_int('M3U8_DOWNLOAD', 'decrypt_workers')
+
+# Variable
+STAGE_MODES = ("inline", "thread", "process")
+_shared_stage = None
+_shared_lock = threading.Lock()
+
+
+def decrypt_segment(key: bytes, iv: bytes, method: str, buffer: bytearray) -> bytes:
+    """
+    Decrypt a whole segment in a worker process.
+
+    Parameters:
+        - key (bytes): The encryption key.
+        - iv (bytes): The initialization vector.
+        - method (str): The encryption method.
+        - buffer (bytearray): The encrypted segment.
+    """
+    return M3U8_Decryption(key, iv, method).decrypt_inplace(buffer).tobytes()
+
+
+class DecryptStage:
+    """
+    Dedicated CPU stage for AES segment decryption, so the network workers (or the event loop) only move bytes.
+
+    Modes:
+        - `inline`   decrypt in the calling worker
+        - `thread`   decrypt in a small thread pool, in place over the segment buffer (pycryptodomex releases the GIL)
+        - `process`  decrypt in a process pool, the segment is copied to and from the worker process
+    """
+    def __init__(self, mode: str = DECRYPT_STAGE, workers: int = DECRYPT_WORKERS):
+        """
+        Parameters:
+            - mode (str): 'inline', 'thread' or 'process'.
+            - workers (int): Number of decrypt threads or processes.
+        """
+        if mode not in STAGE_MODES:
+            logging.error(f"Invalid decrypt_stage '{mode}', using inline decryption")
+            mode = "inline"
+
+        self.mode = mode
+        self.executor: Executor = None
+
+        if mode == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="decrypt")
+        elif mode == "process":
+            self.executor = ProcessPoolExecutor(max_workers=max(1, workers))
+
+    @property
+    def offloaded(self) -> bool:
+        """True if segments are decrypted outside the network workers."""
+        return self.executor is not None
+
+    def _submit(self, decryption: M3U8_Decryption, buffer: bytearray):
+        if self.mode == "process":
+            return self.executor.submit(decrypt_segment, decryption.key, decryption.iv, decryption.method, buffer)
+        return self.executor.submit(decryption.decrypt_inplace, buffer)
+
+    def decrypt(self, decryption: M3U8_Decryption, buffer: bytearray):
+        """
+        Decrypt a whole segment and wait for the result.
+
+        Parameters:
+            - decryption (M3U8_Decryption): Decryption of the segment.
+            - buffer (bytearray): The encrypted segment.
+
+        Returns:
+            memoryview or bytes: The plaintext.
+        """
+        if self.executor is None:
+            return decryption.decrypt_inplace(buffer)
+        return self._submit(decryption, buffer).result()
+
+    async def decrypt_async(self, decryption: M3U8_Decryption, buffer: bytearray):
+        """Asyncio version of `decrypt`, the event loop keeps running while the stage works."""
+        if self.executor is None:
+            return decryption.decrypt_inplace(buffer)
+        return await asyncio.wrap_future(self._submit(decryption, buffer))
+
+    def close(self) -> None:
+        """Stop the stage workers."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+def get_decrypt_stage() -> DecryptStage:
+    """Return the decrypt stage shared by every track of the process, created on first use."""
+    global _shared_stage
+
+    with _shared_lock:
+        if _shared_stage is None:
+            _shared_stage = DecryptStage()
+            atexit.register(_shared_stage.close)
+        return _shared_stage
@@ -3,8 +3,12 @@
 import os
 import re
 import time
+import signal
+import asyncio
 import logging
 import shutil
+import threading
+import functools
 from typing import Any, Dict, List, Optional
 
 
@@ -16,10 +20,10 @@ from rich.panel import Panel
 
 # Internal utilities
 from StreamingCommunity.Util.config_json import config_manager
-from StreamingCommunity.Util.headers import get_userAgent
 from StreamingCommunity.Util.os import compute_sha1_hash, os_manager, internet_manager
 from StreamingCommunity.TelegramHelp.telegram_bot import get_bot_instance
 from StreamingCommunity.Util.plex_naming import post_process_media_file
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
@@ -27,10 +31,17 @@ from ...FFmpeg import (
     print_duration_table,
     join_video,
     join_audios,
-    join_subtitle
+    join_subtitle,
+    join_all,
+    has_audio_stream,
+    StreamMuxer
 )
 from ...M3U8 import M3U8_Parser, M3U8_UrlFix
 from .segments import M3U8_Segments
+from .transport import HLS_Transport
+from .journal import SegmentJournal
+from .concurrency import ConcurrencyBudget
+from ..telemetry import telemetry
 
 
 # Config
@@ -41,10 +52,13 @@ DOWNLOAD_SPECIFIC_SUBTITLE = config_manager.get_list('M3U8_DOWNLOAD', 'specific_
 MERGE_AUDIO = config_manager.get_bool('M3U8_DOWNLOAD', 'merge_audio')
 MERGE_SUBTITLE = config_manager.get_bool('M3U8_DOWNLOAD', 'merge_subs')
 CLEANUP_TMP = config_manager.get_bool('M3U8_DOWNLOAD', 'cleanup_tmp_folder')
+PARALLEL_TRACKS = config_manager.get_bool('M3U8_DOWNLOAD', 'parallel_tracks')
+MAX_WORKERS = config_manager.get_int('M3U8_DOWNLOAD', 'max_workers')
+STREAM_MUX = config_manager.get_bool('M3U8_DOWNLOAD', 'stream_mux')
+USE_CODEC = config_manager.get_bool('M3U8_CONVERSION', 'use_codec')
 FILTER_CUSTOM_REOLUTION = str(config_manager.get('M3U8_PARSER', 'force_resolution')).strip().lower()
 GET_ONLY_LINK = config_manager.get_bool('M3U8_PARSER', 'get_only_link')
 RETRY_LIMIT = config_manager.get_int('REQUESTS', 'max_retry')
-MAX_TIMEOUT = config_manager.get_int("REQUESTS", "timeout")
 TELEGRAM_BOT = config_manager.get_bool('DEFAULT', 'telegram_bot')
 
 console = Console()
@@ -52,8 +66,12 @@ console = Console()
 
 class HLSClient:
     """Client for making HTTP requests to HLS endpoints with retry mechanism."""
-    def __init__(self):
-        self.headers = {'User-Agent': get_userAgent()}
+    def __init__(self, transport: HLS_Transport):
+        """
+        Args:
+            transport: Shared connection pool used for every request
+        """
+        self.transport = transport
 
     def request(self, url: str, return_content: bool = False) -> Optional[httpx.Response]:
         """
@@ -66,10 +84,9 @@ class HLSClient:
         Returns:
             Response content/text or None if all retries fail
         """
-        client = httpx.Client(headers=self.headers, timeout=MAX_TIMEOUT, follow_redirects=True)
         for attempt in range(RETRY_LIMIT):
             try:
-                response = client.get(url)
+                response = self.transport.get(url)
                 response.raise_for_status()
                 return response.content if return_content else response.text
 
@@ -154,6 +171,7 @@ class M3U8Manager:
         self.url_fixer = M3U8_UrlFix()
         self.video_url = None
         self.video_res = None
+        self.video_mirrors = []
         self.audio_streams = []
         self.sub_streams = []
         self.is_master = False
@@ -193,6 +211,10 @@ class M3U8Manager:
                 logging.error("Resolution not recognized.")
                 self.video_url, self.video_res = self.parser._video.get_best_uri()
 
+            self.video_mirrors = self.parser._video.get_alternate_uris(self.video_url)
+            if self.video_mirrors:
+                logging.info(f"Redundant video variants: {self.video_mirrors}")
+
             self.audio_streams = []
             if ENABLE_AUDIO:
                 self.audio_streams = [
@@ -276,12 +298,13 @@ class DownloadManager:
         self.missing_segments = []
         self.stopped = False
 
-    def download_video(self, video_url: str):
-        """Downloads video segments from the M3U8 playlist."""
+    def download_video(self, video_url: str, video_mirrors: List[str] = None):
+        """Downloads video segments from the M3U8 playlist, `video_mirrors` are redundant copies of the same variant."""
         video_full_url = self.url_fixer.generate_full_url(video_url)
         video_tmp_dir = os.path.join(self.temp_dir, 'video')
+        mirrors = [self.url_fixer.generate_full_url(uri) for uri in video_mirrors or []]
 
-        downloader = M3U8_Segments(url=video_full_url, tmp_folder=video_tmp_dir)
+        downloader = M3U8_Segments(url=video_full_url, tmp_folder=video_tmp_dir, transport=self.client.transport, mirrors=mirrors)
         result = downloader.download_streams("Video", "video")
         self.missing_segments.append(result)
 
@@ -298,7 +321,7 @@ class DownloadManager:
         audio_full_url = self.url_fixer.generate_full_url(audio['uri'])
         audio_tmp_dir = os.path.join(self.temp_dir, 'audio', audio['language'])
 
-        downloader = M3U8_Segments(url=audio_full_url, tmp_folder=audio_tmp_dir)
+        downloader = M3U8_Segments(url=audio_full_url, tmp_folder=audio_tmp_dir, transport=self.client.transport)
         result = downloader.download_streams(f"Audio {audio['language']}", "audio")
         self.missing_segments.append(result)
 
@@ -325,15 +348,17 @@ class DownloadManager:
 
         return self.stopped
 
-    def download_all(self, video_url: str, audio_streams: List[Dict], sub_streams: List[Dict]):
+    def download_all(self, video_url: str, audio_streams: List[Dict], sub_streams: List[Dict], video_mirrors: List[str] = None):
         """
         Downloads all selected streams (video, audio, subtitles).
         """
+        if PARALLEL_TRACKS:
+            return asyncio.run(self.download_all_parallel(video_url, audio_streams, sub_streams, video_mirrors))
+
         return_stopped = False
 
-        video_file = os.path.join(self.temp_dir, 'video', '0.ts')
-        if not os.path.exists(video_file):
-            if self.download_video(video_url):
+        if not SegmentJournal.is_track_complete(os.path.join(self.temp_dir, 'video')):
+            if self.download_video(video_url, video_mirrors):
                 if not return_stopped:
                     return_stopped = True
 
@@ -341,8 +366,7 @@ class DownloadManager:
             #if self.stopped:
             #    break
 
-            audio_file = os.path.join(self.temp_dir, 'audio', audio['language'], '0.ts')
-            if not os.path.exists(audio_file):
+            if not SegmentJournal.is_track_complete(os.path.join(self.temp_dir, 'audio', audio['language'])):
                 if self.download_audio(audio):
                     if not return_stopped:
                         return_stopped = True
@@ -359,6 +383,91 @@ class DownloadManager:
 
         return return_stopped
 
+    def download_all_muxed(self, video_url: str, audio_streams: List[Dict], sub_streams: List[Dict], out_path: str, video_mirrors: List[str] = None):
+        """
+        Downloads video and audio tracks at the same time straight into FFmpeg, which writes `out_path`.
+        The in-order writer of every track feeds a named pipe, no full-size TS is written to the temp folder.
+        """
+        muxer = StreamMuxer(os.path.join(self.temp_dir, 'fifo'), out_path, len(audio_streams))
+        muxer.start()
+
+        try:
+            stopped = asyncio.run(self.download_all_parallel(video_url, audio_streams, sub_streams, video_mirrors, muxer))
+        except BaseException:
+            muxer.abort()
+            raise
+
+        try:
+            if not muxer.finish():
+                raise RuntimeError(f"FFmpeg stream mux failed, see {muxer.log_path}")
+        finally:
+            muxer.cleanup()
+
+        return stopped
+
+    async def download_all_parallel(self, video_url: str, audio_streams: List[Dict], sub_streams: List[Dict], video_mirrors: List[str] = None, muxer: StreamMuxer = None):
+        """
+        Downloads all selected streams at the same time on one event loop.
+        Segment requests in flight of every track are bounded by one global budget (`max_workers`),
+        each track keeps its own progress bar stacked under the others.
+        With a `muxer` every track is written to its pipe, so tracks complete on disk are downloaded again.
+        """
+        budget = ConcurrencyBudget(MAX_WORKERS)
+        tracks = []
+
+        video_tmp_dir = os.path.join(self.temp_dir, 'video')
+        if muxer is not None or not SegmentJournal.is_track_complete(video_tmp_dir):
+            mirrors = [self.url_fixer.generate_full_url(uri) for uri in video_mirrors or []]
+            tracks.append((self.url_fixer.generate_full_url(video_url), video_tmp_dir, "Video", "video", mirrors))
+
+        for audio in audio_streams:
+            audio_tmp_dir = os.path.join(self.temp_dir, 'audio', audio['language'])
+            if muxer is not None or not SegmentJournal.is_track_complete(audio_tmp_dir):
+                tracks.append((self.url_fixer.generate_full_url(audio['uri']), audio_tmp_dir, f"Audio {audio['language']}", "audio", []))
+
+        downloaders = []
+        for position, (url, tmp_dir, description, stream_type, mirrors) in enumerate(tracks):
+            downloader = M3U8_Segments(url=url, tmp_folder=tmp_dir, transport=self.client.transport, budget=budget, mirrors=mirrors)
+            downloader.progress_position = position
+            if muxer is not None:
+                downloader.output_pipe = functools.partial(muxer.open_input, position)
+            downloaders.append(downloader)
+
+        # One SIGINT handler for every track, installed from the main thread
+        if downloaders and threading.current_thread() is threading.main_thread():
+            def interrupt_handler(signum, frame):
+                for i, downloader in enumerate(downloaders):
+                    downloader.handle_interrupt(signum, frame, verbose=(i == 0))
+            signal.signal(signal.SIGINT, interrupt_handler)
+
+        loop = asyncio.get_running_loop()
+        jobs = [
+            downloader.download_streams_async(description, stream_type, setup_interrupt=False)
+            for downloader, (_, _, description, stream_type, _) in zip(downloaders, tracks)
+        ]
+        jobs += [
+            loop.run_in_executor(None, self.download_subtitle, sub)
+            for sub in sub_streams
+            if not os.path.exists(os.path.join(self.temp_dir, 'subs', f"{sub['language']}.vtt"))
+        ]
+
+        try:
+            results = await asyncio.gather(*jobs, return_exceptions=True)
+        finally:
+            await self.client.transport.aclose()
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        for result in results[:len(downloaders)]:
+            if isinstance(result, dict):
+                self.missing_segments.append(result)
+                if result.get('stopped', False):
+                    self.stopped = True
+
+        if errors:
+            raise errors[0]
+
+        return self.stopped
+
 
 class MergeManager:
     """Handles merging of video, audio, and subtitle streams."""
@@ -375,20 +484,106 @@ class MergeManager:
         self.audio_streams = audio_streams
         self.sub_streams = sub_streams
 
+    @staticmethod
+    def _get_track_file(track_dir: str) -> str:
+        """Returns the data file of a downloaded track: 0.mp4 for fMP4 / CMAF tracks, else 0.ts."""
+        mp4_path = os.path.join(track_dir, '0.mp4')
+        if os.path.exists(mp4_path):
+            return mp4_path
+        return os.path.join(track_dir, '0.ts')
+
+    def _get_sub_tracks(self) -> List[Dict]:
+        """Returns the downloaded subtitle files to merge."""
+        sub_tracks = []
+        for s in self.sub_streams:
+            sub_path = os.path.join(self.temp_dir, 'subs', f"{s['language']}.vtt")
+            if os.path.exists(sub_path):
+                sub_tracks.append({
+                    'path': sub_path,
+                    'language': s['language']
+                })
+                logging.info(f"Sottotitolo valido: {sub_path}")
+            else:
+                logging.warning(f"Sottotitolo non trovato: {sub_path}")
+
+        return sub_tracks
+
+    def _get_audio_tracks(self) -> List[Dict]:
+        """Returns the downloaded audio tracks to merge."""
+        audio_tracks = [{
+            'path': self._get_track_file(os.path.join(self.temp_dir, 'audio', a['language'])),
+            'name': a['language']
+        } for a in self.audio_streams]
+        
+        # Verifica esistenza file audio
+        valid_audio_tracks = []
+        for track in audio_tracks:
+            if os.path.exists(track['path']):
+                valid_audio_tracks.append(track)
+                logging.info(f"Traccia audio valida: {track['path']}")
+            else:
+                logging.warning(f"Traccia audio non trovata: {track['path']}")
+
+        return valid_audio_tracks
+
+    def _merge_multi_pass(self, video_file: str, audio_tracks: List[Dict], sub_tracks: List[Dict]) -> str:
+        """
+        Merges audio and subtitles with one FFmpeg pass each, through the intermediate merged_audio.mp4.
+        Returns path to the merged file.
+        """
+        merged_file = video_file
+
+        if audio_tracks:
+            merged_file = join_audios(
+                video_path=video_file,
+                audio_tracks=audio_tracks,
+                out_path=os.path.join(self.temp_dir, 'merged_audio.mp4'),
+                codec=self.parser.codec
+            )
+            logging.info(f"Creato file con audio: {merged_file}, esiste: {os.path.exists(merged_file)}")
+
+        if sub_tracks:
+            merged_file = join_subtitle(
+                video_path=merged_file,
+                subtitles_list=sub_tracks,
+                out_path=os.path.join(self.temp_dir, 'final.mp4')
+            )
+            logging.info(f"Creato file finale con sottotitoli: {merged_file}, esiste: {os.path.exists(merged_file)}")
+
+        return merged_file
+
+    def merge_muxed(self, muxed_file: str) -> str:
+        """
+        Adds the subtitles to the file written by the stream muxer, video and audio are already in it.
+        Returns path to the final file.
+        """
+        if not MERGE_SUBTITLE or not self.sub_streams:
+            return muxed_file
+
+        sub_tracks = self._get_sub_tracks()
+        if not sub_tracks:
+            return muxed_file
+
+        return join_subtitle(
+            video_path=muxed_file,
+            subtitles_list=sub_tracks,
+            out_path=os.path.join(self.temp_dir, 'final.mp4')
+        )
+
     def merge(self) -> str:
         """
         Merges downloaded streams into final video file.
         Returns path to the final merged file.
 
         Process:
-        1. If no audio/subs, just process video
-        2. If audio exists, merge with video
-        3. If subtitles exist, add them to the video
+        1. If no audio/subs, just process video (an fMP4 track is already a playable MP4)
+        2. If audio or subtitles exist, merge everything with the video in one FFmpeg pass
+        3. If the single pass fails, merge audio and subtitles with one pass each
         
         Se il processo standard fallisce, usa un approccio di fallback che replica
         lo script di riparazione per garantire che si generi sempre un file.
         """
-        video_file = os.path.join(self.temp_dir, 'video', '0.ts')
+        video_file = self._get_track_file(os.path.join(self.temp_dir, 'video'))
         merged_file = video_file
         
         # Log l'inizio del processo di merge
@@ -404,7 +599,10 @@ class MergeManager:
         
         try:
             # Tentativo con il processo standard
-            if not self.audio_streams and not self.sub_streams:
+            if not self.audio_streams and not self.sub_streams and video_file.endswith('.mp4'):
+                logging.info(f"Traccia fMP4 senza audio/sottotitoli, nessun remux: {video_file}")
+
+            elif not self.audio_streams and not self.sub_streams:
                 merged_file = join_video(
                     video_path=video_file,
                     out_path=video_mp4_path,
@@ -413,51 +611,26 @@ class MergeManager:
                 logging.info(f"Creato file video senza audio/sottotitoli: {merged_file}, esiste: {os.path.exists(merged_file)}")
 
             else:
-                if MERGE_AUDIO and self.audio_streams:
-                    audio_tracks = [{
-                        'path': os.path.join(self.temp_dir, 'audio', a['language'], '0.ts'),
-                        'name': a['language']
-                    } for a in self.audio_streams]
-                    
-                    # Verifica esistenza file audio
-                    valid_audio_tracks = []
-                    for track in audio_tracks:
-                        if os.path.exists(track['path']):
-                            valid_audio_tracks.append(track)
-                            logging.info(f"Traccia audio valida: {track['path']}")
-                        else:
-                            logging.warning(f"Traccia audio non trovata: {track['path']}")
-                    
-                    if valid_audio_tracks:
-                        merged_file = join_audios(
+                valid_audio_tracks = self._get_audio_tracks() if MERGE_AUDIO and self.audio_streams else []
+                sub_tracks = self._get_sub_tracks() if MERGE_SUBTITLE and self.sub_streams else []
+
+                try:
+                    # One pass: every track is read once and final.mp4 written once
+                    if valid_audio_tracks or sub_tracks:
+                        merged_file = join_all(
                             video_path=video_file,
                             audio_tracks=valid_audio_tracks,
-                            out_path=merged_audio_path,
-                            codec=self.parser.codec
-                        )
-                        logging.info(f"Creato file con audio: {merged_file}, esiste: {os.path.exists(merged_file)}")
-
-                if MERGE_SUBTITLE and self.sub_streams:
-                    sub_tracks = []
-                    for s in self.sub_streams:
-                        sub_path = os.path.join(self.temp_dir, 'subs', f"{s['language']}.vtt")
-                        if os.path.exists(sub_path):
-                            sub_tracks.append({
-                                'path': sub_path,
-                                'language': s['language']
-                            })
-                            logging.info(f"Sottotitolo valido: {sub_path}")
-                        else:
-                            logging.warning(f"Sottotitolo non trovato: {sub_path}")
-                    
-                    if sub_tracks:
-                        merged_file = join_subtitle(
-                            video_path=merged_file,
                             subtitles_list=sub_tracks,
-                            out_path=final_mp4_path
+                            out_path=final_mp4_path,
+                            codec=self.parser.codec
                         )
-                        logging.info(f"Creato file finale con sottotitoli: {merged_file}, esiste: {os.path.exists(merged_file)}")
-            
+                        logging.info(f"Creato file finale in un passaggio: {merged_file}")
+
+                except Exception as e:
+                    logging.error(f"Errore durante il merge in un passaggio: {str(e)}")
+                    logging.info("Tentativo di merge con audio e sottotitoli separati...")
+                    merged_file = self._merge_multi_pass(video_file, valid_audio_tracks, sub_tracks)
+
             # Verifica se il file è stato effettivamente creato
             if not os.path.exists(merged_file) or os.path.getsize(merged_file) == 0:
                 raise FileNotFoundError(f"Il file {merged_file} non è stato creato o è vuoto")
@@ -510,9 +683,7 @@ class MergeManager:
                 else:
                     logging.warning("Nessun file audio trovato, usando solo video")
                     ffmpeg_cmd.extend(['-map', '0:v'])
-                    if ':a' in subprocess.check_output(['ffprobe', '-v', 'error', '-show_entries', 
-                                                   'stream=codec_type', '-of', 'default=nw=1:nk=1', video_file],
-                                                  text=True):
+                    if has_audio_stream(video_file):
                         ffmpeg_cmd.extend(['-map', '0:a'])
                 
                 ffmpeg_cmd.extend(['-c', 'copy', '-y', merged_audio_path])
@@ -580,7 +751,8 @@ class HLS_Downloader:
     def __init__(self, m3u8_url: str, output_path: Optional[str] = None):
         self.m3u8_url = m3u8_url
         self.path_manager = PathManager(m3u8_url, output_path)
-        self.client = HLSClient()
+        self.transport = HLS_Transport()
+        self.client = HLSClient(self.transport)
         self.m3u8_manager = M3U8Manager(m3u8_url, self.client)
         self.download_manager: Optional[DownloadManager] = None
         self.merge_manager: Optional[MergeManager] = None
@@ -631,9 +803,10 @@ class HLS_Downloader:
             self.path_manager.setup_directories()
 
             # Parse M3U8 and determine if it's a master playlist
-            self.m3u8_manager.parse()
-            self.m3u8_manager.select_streams()
-            self.m3u8_manager.log_selection()
+            with profiler.phase('parse'):
+                self.m3u8_manager.parse()
+                self.m3u8_manager.select_streams()
+                self.m3u8_manager.log_selection()
 
             self.download_manager = DownloadManager(
                 temp_dir=self.path_manager.temp_dir,
@@ -641,13 +814,6 @@ class HLS_Downloader:
                 url_fixer=self.m3u8_manager.url_fixer
             )
 
-            # Check if download was stopped
-            download_stopped = self.download_manager.download_all(
-                video_url=self.m3u8_manager.video_url,
-                audio_streams=self.m3u8_manager.audio_streams,
-                sub_streams=self.m3u8_manager.sub_streams
-            )
-
             self.merge_manager = MergeManager(
                 temp_dir=self.path_manager.temp_dir,
                 parser=self.m3u8_manager.parser,
@@ -655,11 +821,35 @@ class HLS_Downloader:
                 sub_streams=self.m3u8_manager.sub_streams
             )
 
-            final_file = self.merge_manager.merge()
+            # Check if download was stopped
+            if self._use_stream_mux():
+                muxed_file = os.path.join(self.path_manager.temp_dir, 'muxed.mp4')
+                with profiler.phase('download'):
+                    download_stopped = self.download_manager.download_all_muxed(
+                        video_url=self.m3u8_manager.video_url,
+                        audio_streams=self.m3u8_manager.audio_streams,
+                        sub_streams=self.m3u8_manager.sub_streams,
+                        out_path=muxed_file,
+                        video_mirrors=self.m3u8_manager.video_mirrors
+                    )
+                with telemetry.phase('merge', kind='hls', mode='stream_mux'):
+                    final_file = self.merge_manager.merge_muxed(muxed_file)
+
+            else:
+                with profiler.phase('download'):
+                    download_stopped = self.download_manager.download_all(
+                        video_url=self.m3u8_manager.video_url,
+                        audio_streams=self.m3u8_manager.audio_streams,
+                        sub_streams=self.m3u8_manager.sub_streams,
+                        video_mirrors=self.m3u8_manager.video_mirrors
+                    )
+                with telemetry.phase('merge', kind='hls', mode='tracks'):
+                    final_file = self.merge_manager.merge()
             self.path_manager.move_final_file(final_file)
             
             # Post-process file for Plex naming conventions
-            processed_path = post_process_media_file(self.path_manager.output_path)
+            with telemetry.phase('post_process', kind='hls'):
+                processed_path = post_process_media_file(self.path_manager.output_path)
             # Update output path if changed
             if processed_path != self.path_manager.output_path:
                 self.path_manager.output_path = processed_path
@@ -690,6 +880,25 @@ class HLS_Downloader:
                 'stopped': False
             }
 
+        finally:
+            self.transport.close()
+
+    def _use_stream_mux(self) -> bool:
+        """Check if the tracks can be piped into FFmpeg while downloading (`stream_mux`)."""
+        if not STREAM_MUX:
+            return False
+
+        if not StreamMuxer.is_supported():
+            logging.info("Stream mux needs named pipes, not available on this system")
+            return False
+
+        # The muxer only remuxes, and it writes one file with video and audio
+        if USE_CODEC or (self.m3u8_manager.audio_streams and not MERGE_AUDIO):
+            logging.info("Stream mux disabled: use_codec or merge_audio settings need the separate merge")
+            return False
+
+        return True
+
     def _print_summary(self):
         """Prints download summary including file size, duration, and any missing segments."""
         if TELEGRAM_BOT:
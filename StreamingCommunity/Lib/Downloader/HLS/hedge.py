@@ -0,0 +1,71 @@
+# 17.10.26
+
+import threading
+from collections import deque
+from typing import Optional
+
+
+# Variable
+LATENCY_HISTORY = 200
+MIN_SAMPLES = 20
+
+
+class HedgePolicy:
+    """
+    Decides when a straggling segment deserves a duplicate (hedged) request.
+
+    A request is a straggler once it has been in flight longer than a percentile of the latencies
+    of the last completed requests. Hedges are capped to a ratio of the completed segments,
+    so the extra bandwidth stays bounded even when the whole CDN slows down.
+    """
+    def __init__(self, percentile: float = 95, max_ratio: float = 0.05, min_samples: int = MIN_SAMPLES):
+        """
+        Parameters:
+            - percentile (float): Latency percentile used as straggler threshold.
+            - max_ratio (float): Max hedged requests per completed segment.
+            - min_samples (int): Completed requests needed before the first hedge.
+        """
+        self.percentile = min(max(percentile, 0), 100)
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.lock = threading.Lock()
+
+        # Stats
+        self.n_completed = 0
+        self.n_hedged = 0
+        self.n_won = 0
+
+    def record_latency(self, latency: float) -> None:
+        """
+        Add the latency of a completed request (first byte to last byte).
+
+        Parameters:
+            - latency (float): Seconds taken by the request.
+        """
+        with self.lock:
+            self.latencies.append(latency)
+            self.n_completed += 1
+
+    def threshold(self) -> Optional[float]:
+        """Return the in-flight time after which a request is a straggler, None until enough samples are collected."""
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            ordered = sorted(self.latencies)
+
+        position = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[position]
+
+    def try_hedge(self) -> bool:
+        """Reserve one hedged request if the bandwidth cap allows it."""
+        with self.lock:
+            if self.n_hedged + 1 > self.max_ratio * self.n_completed:
+                return False
+            self.n_hedged += 1
+            return True
+
+    def record_win(self) -> None:
+        """The duplicate request finished before the original one."""
+        with self.lock:
+            self.n_won += 1
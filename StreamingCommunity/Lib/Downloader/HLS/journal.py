@@ -0,0 +1,319 @@
+# 17.10.26
+
+import os
+import sys
+import shutil
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+
+# Variable
+JOURNAL_FILE_NAME = "segments.journal"
+STATUS_OK = "ok"
+STATUS_FAILED = "fail"
+COMPLETE_MARKER = "end"
+REORDER_MARKER = "reorder"
+OWN_FILE_OFFSET = -1
+INIT_INDEX = -1
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def copy_range(src_fd: int, dst_fd: int, offset: int, count: int) -> None:
+    """
+    Append `count` bytes read at `offset` of `src_fd` to `dst_fd`.
+    Uses `os.copy_file_range` or `os.sendfile` so data never goes through Python buffers,
+    and falls back to `pread`/`write` where the kernel doesn't support them.
+
+    Parameters:
+        - src_fd (int): Source file descriptor.
+        - dst_fd (int): Destination file descriptor, written at its current position.
+        - offset (int): Read offset in the source.
+        - count (int): Number of bytes to copy.
+    """
+    copied = 0
+
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while copied < count:
+                n = os.copy_file_range(src_fd, dst_fd, count - copied, offset + copied)
+                if n == 0:
+                    break
+                copied += n
+
+        except OSError as e:
+            logging.info(f"copy_file_range not available: {e}")
+
+    if copied < count and hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        try:
+            while copied < count:
+                n = os.sendfile(dst_fd, src_fd, offset + copied, count - copied)
+                if n == 0:
+                    break
+                copied += n
+
+        except OSError as e:
+            logging.info(f"sendfile not available: {e}")
+
+    while copied < count:
+        chunk = os.pread(src_fd, min(COPY_CHUNK_SIZE, count - copied), offset + copied)
+        if not chunk:
+            raise IOError(f"Unexpected end of file, copied {copied}/{count} bytes")
+        os.write(dst_fd, chunk)
+        copied += len(chunk)
+
+
+class SegmentJournal:
+    """
+    Append-only journal of the segments written to a track data file.
+
+    File layout (one record per line):
+        - `# <total_segments> <playlist_id>`      header
+        - `<index> <offset> <size> <status>`       one line per written or failed segment
+        - `end`                                    all segments written in playlist order
+        - `reorder <data_file>`                    the records describe `<data_file>.reorder`, not swapped in yet
+
+    The last record of an index wins, so a failed segment fetched again on resume
+    simply gets a new line pointing to the bytes appended at the end of the data file.
+    An offset of -1 means the segment is stored in its own file (`segments/<index>.ts`).
+    The index -1 is the init section of an fMP4 track, always at the start of the data file.
+    """
+    def __init__(self, tmp_folder: str):
+        """
+        Parameters:
+            - tmp_folder (str): Track temporary folder holding the data file and the journal.
+        """
+        self.path = os.path.join(tmp_folder, JOURNAL_FILE_NAME)
+        self.segment_folder = os.path.join(tmp_folder, "segments")
+        self.entries: Dict[int, Tuple[int, int, str]] = {}
+        self.total_segments = 0
+        self.playlist_id = None
+        self.complete = False
+        self.reorder_name = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_track_complete(tmp_folder: str) -> bool:
+        """
+        Check if the journal of a track folder reports a complete download.
+
+        Parameters:
+            - tmp_folder (str): Track temporary folder.
+        """
+        path = os.path.join(tmp_folder, JOURNAL_FILE_NAME)
+        if not os.path.exists(path):
+            return False
+
+        try:
+            with open(path, 'r') as f:
+                lines = f.read().splitlines()
+            return bool(lines) and lines[-1].strip() == COMPLETE_MARKER
+
+        except Exception as e:
+            logging.error(f"Can't read journal {path}: {e}")
+            return False
+
+    def _load(self) -> bool:
+        """Read the journal from disk, return False if missing or unreadable."""
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, 'r') as f:
+                lines = f.read().splitlines()
+
+            header = lines[0].split()
+            self.total_segments, self.playlist_id = int(header[1]), header[2]
+
+            for line in lines[1:]:
+                parts = line.split()
+
+                if parts == [COMPLETE_MARKER]:
+                    self.complete = True
+
+                elif len(parts) == 2 and parts[0] == REORDER_MARKER:
+                    self.reorder_name = parts[1]
+
+                # Skip a record cut in half by a crash
+                elif len(parts) == 4:
+                    index, offset, size = int(parts[0]), int(parts[1]), int(parts[2])
+                    self.entries[index] = (offset, size, parts[3])
+
+        except Exception as e:
+            logging.error(f"Invalid journal {self.path}, starting from scratch: {e}")
+            self.entries = {}
+            return False
+
+        return self.reorder_name is None or self._finish_reorder()
+
+    def _finish_reorder(self) -> bool:
+        """
+        Swap in the data file of a reorder cut short by a crash.
+        The journal is rewritten before the swap, so its records already describe the reordered file.
+        """
+        data_path = os.path.join(os.path.dirname(self.path), self.reorder_name)
+        tmp_path = f"{data_path}.reorder"
+
+        try:
+            if os.path.exists(tmp_path):
+                logging.info(f"Finish interrupted reorder of {data_path}")
+                os.replace(tmp_path, data_path)
+
+            self.reorder_name = None
+            self._rewrite()
+            return True
+
+        except Exception as e:
+            logging.error(f"Can't finish reorder of {data_path}, starting from scratch: {e}")
+            self.entries = {}
+            self.reorder_name = None
+            return False
+
+    def open(self, total_segments: int, playlist_id: str) -> bool:
+        """
+        Load the journal of a previous run or start a new one.
+
+        Parameters:
+            - total_segments (int): Number of segments of the playlist.
+            - playlist_id (str): Identifier of the segment list, a journal for another playlist is discarded.
+
+        Returns:
+            bool: True if a previous run is resumed.
+        """
+        resumed = self._load() and self.total_segments == total_segments and self.playlist_id == playlist_id
+
+        if not resumed:
+            self.entries = {}
+            self.complete = False
+            self.total_segments = total_segments
+            self.playlist_id = playlist_id
+            self._rewrite()
+
+        else:
+            logging.info(f"Resume journal {self.path}: {len(self.get_written())}/{total_segments} segments already written")
+
+        self._file = open(self.path, 'a')
+        return resumed
+
+    def _rewrite(self) -> None:
+        """Write the journal from scratch with the current entries, through a temporary file so it is never half written."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(f"# {self.total_segments} {self.playlist_id}\n")
+            for index in sorted(self.entries):
+                offset, size, status = self.entries[index]
+                f.write(f"{index} {offset} {size} {status}\n")
+
+            if self.reorder_name is not None:
+                f.write(f"{REORDER_MARKER} {self.reorder_name}\n")
+            if self.complete:
+                f.write(f"{COMPLETE_MARKER}\n")
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, self.path)
+
+    def record(self, index: int, offset: int, size: int, status: str = STATUS_OK) -> None:
+        """
+        Append the record of a segment, data must already be flushed to the data file.
+
+        Parameters:
+            - index (int): Segment index.
+            - offset (int): Byte offset of the segment in the data file.
+            - size (int): Segment size in bytes.
+            - status (str): 'ok' or 'fail'.
+        """
+        with self._lock:
+            self.entries[index] = (offset, size, status)
+            self._file.write(f"{index} {offset} {size} {status}\n")
+            self._file.flush()
+
+    def get_written(self) -> List[int]:
+        """Return the indexes already written to the data file."""
+        return [index for index, (_, _, status) in self.entries.items() if status == STATUS_OK and index != INIT_INDEX]
+
+    def has_init(self) -> bool:
+        """Check if the init section of an fMP4 track is in the data file."""
+        return INIT_INDEX in self.entries
+
+    def get_pending(self) -> List[int]:
+        """Return the sorted indexes missing or failed, to download again."""
+        written = set(self.get_written())
+        return [index for index in range(self.total_segments) if index not in written]
+
+    def get_data_size(self) -> int:
+        """Return the size of the committed data, any byte past it is a partial write."""
+        return max((offset + size for offset, size, _ in self.entries.values() if offset != OWN_FILE_OFFSET), default=0)
+
+    def get_segment_path(self, index: int) -> str:
+        """Return the path of a segment stored in its own file."""
+        return os.path.join(self.segment_folder, f"{index}.ts")
+
+    def needs_reorder(self) -> bool:
+        """Check if segments are out of playlist order (holes filled on resume) or stored in their own files."""
+        last_offset = -1
+        for index in sorted(self.get_written()):
+            offset = self.entries[index][0]
+            if offset == OWN_FILE_OFFSET or offset < last_offset:
+                return True
+            last_offset = offset
+
+        return False
+
+    def reorder(self, data_path: str) -> None:
+        """
+        Rewrite the data file with the segments in playlist order and update the offsets.
+        Segments stored in their own file are concatenated and removed.
+        The new journal is written before the new data file replaces the old one, a crash in between
+        is completed by the next `open` (see `_finish_reorder`).
+
+        Parameters:
+            - data_path (str): Path of the track data file.
+        """
+        tmp_path = f"{data_path}.reorder"
+        new_entries = {}
+
+        with open(data_path, 'ab+') as data, open(tmp_path, 'wb') as dst:
+            dst_offset = 0
+
+            # The init section sorts first
+            for index in sorted(self.get_written() + ([INIT_INDEX] if self.has_init() else [])):
+                offset, size, status = self.entries[index]
+
+                if offset == OWN_FILE_OFFSET:
+                    with open(self.get_segment_path(index), 'rb') as src:
+                        copy_range(src.fileno(), dst.fileno(), 0, size)
+                else:
+                    copy_range(data.fileno(), dst.fileno(), offset, size)
+
+                new_entries[index] = (dst_offset, size, status)
+                dst_offset += size
+
+            os.fsync(dst.fileno())
+
+        self.close()
+        self.entries = new_entries
+        self.reorder_name = os.path.basename(data_path)
+        self._rewrite()
+
+        os.replace(tmp_path, data_path)
+        self.reorder_name = None
+        self._rewrite()
+        self._file = open(self.path, 'a')
+
+        if os.path.isdir(self.segment_folder):
+            shutil.rmtree(self.segment_folder, ignore_errors=True)
+
+    def mark_complete(self) -> None:
+        """Mark every segment as written in playlist order."""
+        self.complete = True
+        self._file.write(f"{COMPLETE_MARKER}\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the journal file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
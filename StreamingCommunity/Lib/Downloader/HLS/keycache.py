@@ -0,0 +1,95 @@
+# 17.10.26
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+
+# Variable
+KEY_CACHE_SIZE = 64
+
+
+class KeyCache:
+    """
+    Process-wide LRU cache of the decryption keys, by absolute key URI.
+
+    Every track, retry and segment using the same key URI fetches it once. When several workers
+    ask for a key not cached yet, only the first one fetches it and the others wait for its result.
+    """
+    def __init__(self, max_size: int = KEY_CACHE_SIZE):
+        """
+        Parameters:
+            - max_size (int): Max number of keys kept.
+        """
+        self.max_size = max_size
+        self.keys: "OrderedDict[str, bytes]" = OrderedDict()
+        self.pending: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.fetches = 0
+
+    def get_cached(self, uri: str) -> Optional[bytes]:
+        """Return the key if already cached, without fetching it."""
+        with self.lock:
+            key = self.keys.get(uri)
+            if key is not None:
+                self.keys.move_to_end(uri)
+                self.hits += 1
+            return key
+
+    def get(self, uri: str, fetch: Callable[[str], bytes]) -> bytes:
+        """
+        Return the key of an URI, fetching it on first use.
+
+        Parameters:
+            - uri (str): Absolute key URI.
+            - fetch (Callable): Function downloading the key bytes, called at most once at a time per URI.
+        """
+        with self.lock:
+            key = self.keys.get(uri)
+            if key is not None:
+                self.keys.move_to_end(uri)
+                self.hits += 1
+                return key
+
+            future = self.pending.get(uri)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.pending[uri] = future
+
+        # Another worker is fetching the same key
+        if not owner:
+            return future.result()
+
+        try:
+            key = fetch(uri)
+
+        except Exception as e:
+            with self.lock:
+                del self.pending[uri]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            self.fetches += 1
+            self.keys[uri] = key
+            while len(self.keys) > self.max_size:
+                self.keys.popitem(last=False)
+            del self.pending[uri]
+
+        logging.info(f"Fetched decryption key: {uri}")
+        future.set_result(key)
+        return key
+
+    def clear(self) -> None:
+        """Drop every cached key."""
+        with self.lock:
+            self.keys.clear()
+
+
+key_cache = KeyCache()
@@ -0,0 +1,104 @@
+# 17.10.26
+
+import time
+import logging
+import threading
+from typing import List
+from urllib.parse import urlparse, urlunparse
+
+
+# Variable
+FAIL_THRESHOLD = 3
+COOLDOWN = 30.0
+MAX_COOLDOWN = 300.0
+
+
+def rewrite_host(url: str, host: str) -> str:
+    """
+    Return the URL served by another host, same scheme, path and query.
+
+    Parameters:
+        - url (str): Original URL.
+        - host (str): New netloc, e.g. 'cdn2.example.com' or 'cdn2.example.com:8080'.
+    """
+    return urlunparse(urlparse(url)._replace(netloc=host))
+
+
+class MirrorSet:
+    """
+    Health of the equivalent sources (CDN hosts or redundant playlists) of one track.
+
+    Segments are spread round robin over the healthy sources. A source failing `FAIL_THRESHOLD` requests
+    in a row is left aside for a cooldown, doubled every time it goes down again.
+    """
+    def __init__(self, names: List[str], fail_threshold: int = FAIL_THRESHOLD, cooldown: float = COOLDOWN):
+        """
+        Parameters:
+            - names (List[str]): Name of every source (used in logs), the first one is the primary.
+            - fail_threshold (int): Failures in a row before a source is left aside.
+            - cooldown (float): Seconds a failing source is left aside the first time.
+        """
+        self.names = names
+        self.fail_threshold = fail_threshold
+        self.cooldown = cooldown
+        self.failures = [0] * len(names)
+        self.n_down = [0] * len(names)
+        self.down_until = [0.0] * len(names)
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _healthy(self, now: float) -> List[int]:
+        healthy = [i for i in range(len(self.names)) if self.down_until[i] <= now]
+        if not healthy:
+            # Every source is down, use the one coming back first
+            healthy = [min(range(len(self.names)), key=lambda i: self.down_until[i])]
+        return healthy
+
+    def pick(self, index: int, attempt: int = 0) -> int:
+        """
+        Return the source to request a segment from, every retry moves to the next healthy source.
+
+        Parameters:
+            - index (int): The index of the segment.
+            - attempt (int): Number of the attempt, starting from 0.
+        """
+        if len(self.names) == 1:
+            return 0
+
+        with self.lock:
+            healthy = self._healthy(time.monotonic())
+            return healthy[(index + attempt) % len(healthy)]
+
+    def has_alternative(self, source: int) -> bool:
+        """True if another healthy source can serve the retry of a request failed on `source`."""
+        if len(self.names) == 1:
+            return False
+
+        with self.lock:
+            now = time.monotonic()
+            return any(i != source and self.down_until[i] <= now for i in range(len(self.names)))
+
+    def record_success(self, source: int) -> None:
+        """A request to the source succeeded."""
+        if self.failures[source]:
+            with self.lock:
+                self.failures[source] = 0
+
+    def record_failure(self, source: int) -> None:
+        """A request to the source failed, it is left aside after too many failures in a row."""
+        if len(self.names) == 1:
+            return
+
+        with self.lock:
+            self.failures[source] += 1
+            if self.failures[source] < self.fail_threshold:
+                return
+
+            pause = min(MAX_COOLDOWN, self.cooldown * (2 ** self.n_down[source]))
+            self.down_until[source] = time.monotonic() + pause
+            self.n_down[source] += 1
+            self.failures[source] = 0
+
+        logging.warning(f"Source {self.names[source]} failed {self.fail_threshold} requests in a row, skip it for {pause:.0f}s")
@@ -0,0 +1,132 @@
+# 17.10.26
+
+import os
+import shutil
+import logging
+import threading
+from typing import Dict, Optional
+
+
+# Variable
+MISSING = object()
+
+
+class SegmentReorderBuffer:
+    """
+    Memory-capped reorder window between segment producers and the in-order writer.
+
+    Segments arriving before the one the writer is waiting for are parked in memory
+    until `max_bytes` is reached. Past that limit a blocking producer waits for the writer
+    to free space, a non-blocking one (or one waiting too long) spills the segment to disk.
+    The segment the writer is waiting for is always accepted in memory, so the window can't deadlock.
+    """
+    def __init__(self, max_bytes: int, spill_folder: str, block_timeout: float = 5.0):
+        """
+        Parameters:
+            - max_bytes (int): Max bytes of out-of-order segments kept in memory.
+            - spill_folder (str): Folder used for segments that don't fit in memory.
+            - block_timeout (float): Max seconds a blocking producer waits before spilling.
+        """
+        self.max_bytes = max_bytes
+        self.spill_folder = spill_folder
+        self.block_timeout = block_timeout
+
+        self.condition = threading.Condition()
+        self.items: Dict[int, Optional[bytes]] = {}
+        self.spilled: Dict[int, str] = {}
+        self.expected_index = 0
+
+        # Stats
+        self.buffered_bytes = 0
+        self.peak_bytes = 0
+        self.spilled_count = 0
+
+    def __len__(self) -> int:
+        with self.condition:
+            return len(self.items) + len(self.spilled)
+
+    def _add(self, index: int, data: Optional[bytes]) -> None:
+        """Keep a segment in memory, lock must be held."""
+        self.items[index] = data
+        self.buffered_bytes += len(data) if data else 0
+        self.peak_bytes = max(self.peak_bytes, self.buffered_bytes)
+        self.condition.notify_all()
+
+    def _has_room(self, index: int, size: int) -> bool:
+        """Check if a segment can be kept in memory, lock must be held."""
+        return index == self.expected_index or size == 0 or self.buffered_bytes + size <= self.max_bytes
+
+    def put(self, index: int, data: Optional[bytes], block: bool = True) -> None:
+        """
+        Hand a segment to the writer.
+
+        Parameters:
+            - index (int): Segment index.
+            - data (bytes): Segment content, None marks a failed segment.
+            - block (bool): Wait for room in memory instead of spilling right away.
+        """
+        size = len(data) if data else 0
+
+        with self.condition:
+            if block and not self._has_room(index, size):
+                self.condition.wait_for(lambda: self._has_room(index, size), timeout=self.block_timeout)
+
+            if self._has_room(index, size):
+                self._add(index, data)
+                return
+
+        # Spill outside the lock, the writer keeps going meanwhile
+        os.makedirs(self.spill_folder, exist_ok=True)
+        spill_path = os.path.join(self.spill_folder, f"{index}.ts")
+        with open(spill_path, 'wb') as f:
+            f.write(data)
+
+        with self.condition:
+            self.spilled[index] = spill_path
+            self.spilled_count += 1
+            self.condition.notify_all()
+
+    def pop(self, index: int, timeout: float):
+        """
+        Wait for a segment and remove it from the window.
+
+        Parameters:
+            - index (int): Segment index the writer needs.
+            - timeout (float): Max seconds to wait.
+
+        Returns:
+            bytes, None for a failed segment, or MISSING if it didn't arrive in time.
+        """
+        with self.condition:
+            self.expected_index = index
+            self.condition.notify_all()
+
+            if not self.condition.wait_for(lambda: index in self.items or index in self.spilled, timeout=timeout):
+                return MISSING
+
+            if index in self.items:
+                data = self.items.pop(index)
+                self.buffered_bytes -= len(data) if data else 0
+                self.condition.notify_all()
+                return data
+
+            spill_path = self.spilled.pop(index)
+
+        with open(spill_path, 'rb') as f:
+            data = f.read()
+        os.remove(spill_path)
+        return data
+
+    def close(self) -> None:
+        """Drop every parked segment and remove the spill folder."""
+        with self.condition:
+            self.items.clear()
+            self.spilled.clear()
+            self.buffered_bytes = 0
+            self.condition.notify_all()
+
+        if os.path.isdir(self.spill_folder):
+            try:
+                shutil.rmtree(self.spill_folder)
+            except Exception as e:
+                logging.error(f"Can't remove spill folder {self.spill_folder}: {e}")
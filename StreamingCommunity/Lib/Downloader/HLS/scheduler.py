@@ -0,0 +1,85 @@
+# 17.10.26
+
+import time
+import heapq
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+
+# Variable
+PRIORITY_RETRY = 0
+PRIORITY_NORMAL = 1
+
+
+class SegmentScheduler:
+    """
+    Queue of the segments still to fetch, consumed by a sliding window of requests in flight.
+
+    Fresh segments come out in playlist order. A failed segment is put back with its backoff delay
+    and, once the delay is over, goes ahead of every fresh segment: the in-order writer is
+    probably waiting for it, and the backoff never holds a request slot.
+    """
+    def __init__(self, indexes: Iterable[int]):
+        """
+        Parameters:
+            - indexes (Iterable[int]): Segment indexes to fetch.
+        """
+        self.lock = threading.Lock()
+        self.ready: List[Tuple[int, int, int]] = [(PRIORITY_NORMAL, index, 0) for index in sorted(indexes)]
+        self.delayed: List[Tuple[float, int, int]] = []
+        heapq.heapify(self.ready)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.ready) + len(self.delayed)
+
+    def _promote(self) -> None:
+        """Move the retries whose backoff is over to the ready queue, lock must be held."""
+        now = time.monotonic()
+        while self.delayed and self.delayed[0][0] <= now:
+            _, index, attempt = heapq.heappop(self.delayed)
+            heapq.heappush(self.ready, (PRIORITY_RETRY, index, attempt))
+
+    def add(self, indexes: Iterable[int]) -> None:
+        """
+        Queue new segments, e.g. appended to a live playlist.
+
+        Parameters:
+            - indexes (Iterable[int]): Segment indexes to fetch.
+        """
+        with self.lock:
+            for index in indexes:
+                heapq.heappush(self.ready, (PRIORITY_NORMAL, index, 0))
+
+    def retry(self, index: int, attempt: int, delay: float) -> None:
+        """
+        Put back a failed segment.
+
+        Parameters:
+            - index (int): Segment index.
+            - attempt (int): Number of the next attempt.
+            - delay (float): Seconds to wait before the segment can be fetched again.
+        """
+        with self.lock:
+            heapq.heappush(self.delayed, (time.monotonic() + delay, index, attempt))
+
+    def pop(self) -> Optional[Tuple[int, int]]:
+        """
+        Return the next segment to fetch as (index, attempt), or None if nothing is ready yet.
+        """
+        with self.lock:
+            self._promote()
+            if not self.ready:
+                return None
+
+            _, index, attempt = heapq.heappop(self.ready)
+            return index, attempt
+
+    def next_ready_in(self) -> Optional[float]:
+        """Return the seconds until a segment is ready (0 if one is ready now), None if the queue is empty."""
+        with self.lock:
+            if self.ready:
+                return 0.0
+            if not self.delayed:
+                return None
+            return max(0.0, self.delayed[0][0] - time.monotonic())
@@ -3,27 +3,24 @@
 import os
 import sys
 import time
-import queue
+import asyncio
 import signal
 import logging
-import binascii
 import threading
-from queue import PriorityQueue
 from urllib.parse import urljoin, urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import BinaryIO, Callable, Dict, List, Optional
 
 
 # External libraries
-import httpx
 from tqdm import tqdm
 from rich.console import Console
 
 
 # Internal utilities
 from StreamingCommunity.Util.color import Colors
-from StreamingCommunity.Util.headers import get_userAgent
 from StreamingCommunity.Util.config_json import config_manager
+from StreamingCommunity.Util.os import compute_sha1_hash
 
 
 # Logic class
@@ -33,24 +30,51 @@ from ...M3U8 import (
     M3U8_Parser,
     M3U8_UrlFix
 )
+from .transport import HLS_Transport
+from .journal import SegmentJournal, STATUS_FAILED, OWN_FILE_OFFSET, INIT_INDEX
+from .reorder import SegmentReorderBuffer, MISSING
+from .concurrency import AdaptiveConcurrency, ConcurrencyStore, ConcurrencyBudget
+from .scheduler import SegmentScheduler
+from .sink import SegmentSink, MemorySink, FileSink, DecryptionError
+from .keycache import key_cache
+from .decrypt_stage import DecryptStage, get_decrypt_stage
+from .hedge import HedgePolicy
+from .mirrors import MirrorSet, rewrite_host
+from ..metrics import JobMetrics, metrics_hub
+from ..telemetry import telemetry
 
 # Config
-TQDM_DELAY_WORKER = config_manager.get_float('M3U8_DOWNLOAD', 'tqdm_delay')
 REQUEST_MAX_RETRY = config_manager.get_int('REQUESTS', 'max_retry')
-REQUEST_VERIFY = config_manager.get_bool('REQUESTS', 'verify')
 DEFAULT_VIDEO_WORKERS = config_manager.get_int('M3U8_DOWNLOAD', 'default_video_workser')
 DEFAULT_AUDIO_WORKERS = config_manager.get_int('M3U8_DOWNLOAD', 'default_audio_workser')
-MAX_TIMEOOUT = config_manager.get_int("REQUESTS", "timeout")
+ADAPTIVE_WORKERS = config_manager.get_bool('M3U8_DOWNLOAD', 'adaptive_workers')
+MAX_WORKERS = config_manager.get_int('M3U8_DOWNLOAD', 'max_workers')
 SEGMENT_MAX_TIMEOUT = config_manager.get_int("M3U8_DOWNLOAD", "segment_timeout")
+REORDER_BUFFER_MB = config_manager.get_int('M3U8_DOWNLOAD', 'reorder_buffer_mb')
+DOWNLOAD_ENGINE = str(config_manager.get('M3U8_DOWNLOAD', 'download_engine')).strip().lower()
+SEGMENT_ASSEMBLY = str(config_manager.get('M3U8_DOWNLOAD', 'segment_assembly')).strip().lower()
+HEDGE_REQUESTS = config_manager.get_bool('M3U8_DOWNLOAD', 'hedge_requests')
+HEDGE_PERCENTILE = config_manager.get_float('M3U8_DOWNLOAD', 'hedge_percentile')
+HEDGE_MAX_RATIO = config_manager.get_float('M3U8_DOWNLOAD', 'hedge_max_ratio')
+CDN_MIRRORS = config_manager.get_dict('M3U8_DOWNLOAD', 'cdn_mirrors')
+LIVE_RECORDING = config_manager.get_bool('M3U8_DOWNLOAD', 'live_recording')
+LIVE_MAX_DURATION = config_manager.get_int('M3U8_DOWNLOAD', 'live_max_duration')
 TELEGRAM_BOT = config_manager.get_bool('DEFAULT', 'telegram_bot')
 MAX_INTERRUPT_COUNT = 3
+WINDOW_POLL_INTERVAL = 0.5
+BUDGET_POLL_INTERVAL = 0.05
+STREAM_CHUNK_SIZE = 64 * 1024
+HEDGE_SPARE_THREADS = 4
+LIVE_IDLE_POLLS = 6
+WRITER_JOIN_TIMEOUT = 30
+MIN_COMPLETE_RATIO = 0.999          # Share of the segments a track needs, the missing ones are skipped
 
 # Variable
 console = Console()
 
 
 class M3U8_Segments:
-    def __init__(self, url: str, tmp_folder: str, is_index_url: bool = True):
+    def __init__(self, url: str, tmp_folder: str, is_index_url: bool = True, transport: HLS_Transport = None, budget: ConcurrencyBudget = None, mirrors: List[str] = None):
         """
         Initializes the M3U8_Segments object.
 
@@ -58,6 +82,9 @@ class M3U8_Segments:
             - url (str): The URL of the M3U8 playlist.
             - tmp_folder (str): The temporary folder to store downloaded segments.
             - is_index_url (bool): Flag indicating if `m3u8_index` is a URL (default True).
+            - transport (HLS_Transport): Shared connection pool, a private one is created if not provided.
+            - budget (ConcurrencyBudget): Requests in flight shared with the other tracks downloaded at the same time.
+            - mirrors (List[str]): URLs of redundant copies of the playlist (same segments on other CDNs).
         """
         self.url = url
         self.tmp_folder = tmp_folder
@@ -66,20 +93,55 @@ class M3U8_Segments:
         self.tmp_file_path = os.path.join(self.tmp_folder, "0.ts")
         os.makedirs(self.tmp_folder, exist_ok=True)
 
+        # Connection pool
+        self.own_transport = transport is None
+        self.transport = transport or HLS_Transport()
+
         # Util class
-        self.decryption: M3U8_Decryption = None 
+        self.segment_keys = []
+        self.init_section: Dict = None      # EXT-X-MAP of fMP4 / CMAF tracks
+        self.mirror_urls = mirrors or []
+        self.sources: List[List[str]] = []
+        self.source_hosts: List[Optional[str]] = []
+        self.mirrors: MirrorSet = None
+
+        # Live recording
+        self.live = False
+        self.live_recording = threading.Event()
+        self.live_stop = threading.Event()
+        self.target_duration = 0
+        self.last_sequence = -1
+        stage = get_decrypt_stage()
+        self.decrypt_stage: DecryptStage = stage if stage.offloaded else None
         self.class_ts_estimator = M3U8_Ts_Estimator(0, self) 
         self.class_url_fixer = M3U8_UrlFix(url)
 
         # Sync
-        self.queue = PriorityQueue()
-        self.buffer = {}
+        self.reorder_buffer = SegmentReorderBuffer(REORDER_BUFFER_MB * 1024 * 1024, os.path.join(self.tmp_folder, "spill"))
+        self.buffer_blocking = True
+        self.direct_assembly = SEGMENT_ASSEMBLY == "direct"
         self.expected_index = 0 
+        self.journal: SegmentJournal = None
+        self.concurrency: AdaptiveConcurrency = None
+        self.budget = budget
+        self.budget_blocked = False
+        self.progress_position = None
+        self.metrics: JobMetrics = None
+        self.output_pipe: Callable[[], Optional[BinaryIO]] = None     # Opens the pipe of a stream muxer, instead of the data file
+        self.output_incomplete = False                                 # Segments never reached the pipe, the muxed file is short
+        self.write_offset = 0
+        self.pending_segments = []
+        self.skip_segments = set()
 
         self.stop_event = threading.Event()
         self.downloaded_segments = set()
-        self.base_timeout = 0.5
-        self.current_timeout = 3.0
+
+        # Hedged requests
+        self.hedge = HedgePolicy(HEDGE_PERCENTILE, HEDGE_MAX_RATIO) if HEDGE_REQUESTS else None
+        self.inflight_started: Dict[int, float] = {}
+        self.hedged_segments = set()
+        self.claimed_segments = set()
+        self.claim_lock = threading.Lock()
 
         # Stopping
         self.interrupt_flag = threading.Event()
@@ -95,30 +157,46 @@ class M3U8_Segments:
         self.active_retries = 0 
         self.active_retries_lock = threading.Lock()
 
-    def __get_key__(self, m3u8_parser: M3U8_Parser) -> bytes:
+    def _fetch_key(self, key_uri: str) -> bytes:
         """
-        Fetches the encryption key from the M3U8 playlist.
+        Fetches an encryption key, called through the shared key cache.
 
         Args:
-            m3u8_parser (M3U8_Parser): An instance of M3U8_Parser containing parsed M3U8 data.
+            key_uri (str): Absolute URI of the key.
 
         Returns:
             bytes: The decryption key in byte format.
         """
-        key_uri = urljoin(self.url, m3u8_parser.keys.get('uri'))
-        parsed_url = urlparse(key_uri)
-        self.key_base_url = f"{parsed_url.scheme}://{parsed_url.netloc}/"
-        
         try:
-            client_params = {'headers': {'User-Agent': get_userAgent()}, 'timeout': MAX_TIMEOOUT, 'verify': REQUEST_VERIFY}
-            response = httpx.get(url=key_uri, **client_params)
+            response = self.transport.get(key_uri)
             response.raise_for_status()
-
-            hex_content = binascii.hexlify(response.content).decode('utf-8')
-            return bytes.fromhex(hex_content)
+            return response.content
             
         except Exception as e:
             raise Exception(f"Failed to fetch key: {e}")
+
+    def _get_decryption(self, index: int) -> Optional[M3U8_Decryption]:
+        """
+        Returns the decryption of a segment, None if it's not encrypted.
+        The key comes from the process-wide cache, fetched on first use.
+        """
+        key_info = self.segment_keys[index]
+        if key_info is None:
+            return None
+
+        key = key_cache.get(key_info['uri'], self._fetch_key)
+        return M3U8_Decryption(key, key_info['iv'], key_info['method'])
+
+    async def _get_decryption_async(self, index: int) -> Optional[M3U8_Decryption]:
+        """Asyncio version of `_get_decryption`, a key not cached yet is fetched off the event loop."""
+        key_info = self.segment_keys[index]
+        if key_info is None:
+            return None
+
+        key = key_cache.get_cached(key_info['uri'])
+        if key is None:
+            key = await asyncio.get_running_loop().run_in_executor(None, key_cache.get, key_info['uri'], self._fetch_key)
+        return M3U8_Decryption(key, key_info['iv'], key_info['method'])
     
     def parse_data(self, m3u8_content: str) -> None:
         """
@@ -132,20 +210,191 @@ class M3U8_Segments:
 
         self.expected_real_time_s = m3u8_parser.duration
 
-        if m3u8_parser.keys:
-            key = self.__get_key__(m3u8_parser)    
-            self.decryption = M3U8_Decryption(
-                key, 
-                m3u8_parser.keys.get('iv'), 
-                m3u8_parser.keys.get('method')
-            )
+        self.segments, self.segment_keys = self._resolve_segments(m3u8_parser)
+
+        # fMP4 / CMAF: init section + fragments make a playable MP4, no TS in between
+        if m3u8_parser.init_section is not None:
+            self.init_section = dict(m3u8_parser.init_section, uri=urljoin(self.url, m3u8_parser.init_section['uri']))
+            self.tmp_file_path = os.path.join(self.tmp_folder, "0.mp4")
+        self.live = self._is_live(m3u8_parser)
+        self.target_duration = m3u8_parser.target_duration
+        self.last_sequence = m3u8_parser.media_sequence + len(self.segments) - 1
+        self.class_ts_estimator.total_segments = len(self.segments)
+        self.playlist_id = compute_sha1_hash("\n".join(urlparse(seg).path for seg in self.segments))
+
+        # Fetch the first key now, a broken key URI fails before any segment is requested
+        if self.segment_keys and self.segment_keys[0]:
+            self._get_decryption(0)
+
+        self._load_sources()
+
+        if self.live:
+            console.print(f"[cyan]Live playlist: recording new segments until the stream ends"
+                          + (f" or for [green]{LIVE_MAX_DURATION}s" if LIVE_MAX_DURATION else ""))
+
+    def _is_live(self, m3u8_parser: M3U8_Parser) -> bool:
+        """
+        Check if the playlist has to be recorded by reloading it: an EVENT playlist, or any playlist
+        without EXT-X-ENDLIST when `live_recording` is on.
+        """
+        if m3u8_parser.is_event or (m3u8_parser.is_open and LIVE_RECORDING):
+            logging.info(f"Live playlist ({'event' if m3u8_parser.is_event else 'no EXT-X-ENDLIST'}), switch to live recording: {self.url}")
+            return True
+
+        if m3u8_parser.is_open:
+            logging.info(f"Playlist without EXT-X-ENDLIST downloaded as VOD, set live_recording to record it: {self.url}")
+        return False
 
-        self.segments = [
+    def _resolve_segments(self, m3u8_parser: M3U8_Parser):
+        """
+        Returns the absolute segment URLs of a parsed playlist and their keys, with absolute key URIs.
+        """
+        segments = [
             self.class_url_fixer.generate_full_url(seg)
             if "http" not in seg else seg
             for seg in m3u8_parser.segments
         ]
-        self.class_ts_estimator.total_segments = len(self.segments)
+        segment_keys = [
+            dict(key_info, uri=urljoin(self.url, key_info['uri'])) if key_info else None
+            for key_info in m3u8_parser.segment_keys
+        ]
+        return segments, segment_keys
+
+    def _load_sources(self) -> None:
+        """
+        Builds the equivalent URLs of every segment: the track playlist, the redundant playlists of the
+        same variant and the hosts set in `cdn_mirrors`. Requests are spread over them by the mirror set.
+        """
+        self.sources = [self.segments]
+        self.source_hosts = [None]
+
+        # The windows of redundant live playlists can't be matched by position
+        for mirror_url in (self.mirror_urls if not self.live else []):
+            try:
+                response = self.transport.get(mirror_url)
+                response.raise_for_status()
+                mirror_parser = M3U8_Parser()
+                mirror_parser.parse_data(uri=mirror_url, raw_content=response.text)
+
+            except Exception as e:
+                logging.info(f"Skip mirror playlist {mirror_url}: {e}")
+                continue
+
+            if len(mirror_parser.segments) != len(self.segments):
+                logging.info(f"Skip mirror playlist {mirror_url}: {len(mirror_parser.segments)} segments instead of {len(self.segments)}")
+                continue
+
+            self.sources.append([urljoin(mirror_url, seg) for seg in mirror_parser.segments])
+            self.source_hosts.append(None)
+
+        if self.segments:
+            for source in list(self.sources):
+                for host in CDN_MIRRORS.get(urlparse(source[0]).netloc, []):
+                    self.sources.append([rewrite_host(seg, host) for seg in source])
+                    self.source_hosts.append(host)
+
+        self.mirrors = MirrorSet([urlparse(source[0]).netloc if source else "" for source in self.sources])
+        if len(self.sources) > 1:
+            logging.info(f"Segments spread over {len(self.sources)} sources: {self.mirrors.names}")
+
+    def _append_live_segments(self, m3u8_parser: M3U8_Parser) -> List[int]:
+        """
+        Appends the segments of a reloaded live playlist with a media sequence never seen before.
+
+        Returns:
+            List[int]: Indexes of the new segments.
+        """
+        segments, segment_keys = self._resolve_segments(m3u8_parser)
+        first_sequence = m3u8_parser.media_sequence
+
+        if first_sequence > self.last_sequence + 1:
+            logging.warning(f"Live playlist moved past {first_sequence - self.last_sequence - 1} segments before they were listed")
+
+        new_indexes = []
+        for position, url in enumerate(segments):
+            sequence = first_sequence + position
+            if sequence <= self.last_sequence:
+                continue
+
+            new_indexes.append(len(self.segments))
+            self.segments.append(url)
+            self.segment_keys.append(segment_keys[position])
+            for source, host in zip(self.sources[1:], self.source_hosts[1:]):
+                source.append(rewrite_host(url, host))
+            self.last_sequence = sequence
+
+        return new_indexes
+
+    def _follow_live_playlist(self, scheduler: SegmentScheduler, progress_bar: tqdm) -> None:
+        """
+        Reloads a live/event playlist and queues the new segments, until EXT-X-ENDLIST, `live_max_duration`,
+        a stop from the user or a playlist not growing anymore.
+        Reloads follow RFC 8216 (6.3.4): one target duration after a change, half of it otherwise.
+        """
+        start_time = time.monotonic()
+        delay = self.target_duration
+        idle_polls = 0
+        failures = 0
+
+        try:
+            while not self.live_stop.wait(delay) and not self.interrupt_flag.is_set() and not self.download_interrupted:
+                if LIVE_MAX_DURATION and time.monotonic() - start_time >= LIVE_MAX_DURATION:
+                    logging.info(f"Live recording stopped after {LIVE_MAX_DURATION}s")
+                    break
+
+                try:
+                    response = self.transport.get(self.url)
+                    response.raise_for_status()
+                    m3u8_parser = M3U8_Parser()
+                    m3u8_parser.parse_data(uri=self.url, raw_content=response.text)
+                    failures = 0
+
+                except Exception as e:
+                    failures += 1
+                    logging.info(f"Failed to reload live playlist ({failures}/{REQUEST_MAX_RETRY}): {e}")
+                    if failures >= REQUEST_MAX_RETRY:
+                        logging.error(f"Live playlist unreachable, recording stopped: {self.url}")
+                        break
+                    continue
+
+                new_indexes = self._append_live_segments(m3u8_parser)
+                if new_indexes:
+                    self.class_ts_estimator.total_segments = len(self.segments)
+                    progress_bar.total = len(self.segments)
+                    progress_bar.refresh()
+                    scheduler.add(new_indexes)
+
+                if not m3u8_parser.is_open:
+                    logging.info("Live playlist ended (EXT-X-ENDLIST)")
+                    break
+
+                idle_polls = 0 if new_indexes else idle_polls + 1
+                if idle_polls >= LIVE_IDLE_POLLS:
+                    logging.info(f"Live playlist not updated for {idle_polls} reloads, recording stopped")
+                    break
+
+                target_duration = m3u8_parser.target_duration or self.target_duration
+                delay = target_duration if new_indexes else target_duration / 2
+
+        except Exception as e:
+            logging.error(f"Live recording stopped: {str(e)}")
+
+        finally:
+            self.live_recording.clear()
+
+    def _start_live_recording(self, scheduler: SegmentScheduler, progress_bar: tqdm) -> None:
+        """Starts the thread reloading the playlist of a live track, no-op for a VOD track."""
+        if not self.live:
+            return
+
+        live_thread = threading.Thread(target=self._follow_live_playlist, args=(scheduler, progress_bar))
+        live_thread.daemon = True
+        live_thread.start()
+
+    def _has_pending(self, scheduler: SegmentScheduler) -> bool:
+        """True while segments are queued or can still be appended by the live playlist."""
+        # Check the live flag first: it is cleared only after the last segments are queued
+        return self.live_recording.is_set() or len(scheduler) > 0
 
     def get_info(self) -> None:
         """
@@ -158,8 +407,7 @@ class M3U8_Segments:
         """
         if self.is_index_url:
             try:
-                client_params = {'headers': {'User-Agent': get_userAgent()}, 'timeout': MAX_TIMEOOUT, 'verify': REQUEST_VERIFY}
-                response = httpx.get(self.url, **client_params, follow_redirects=True)
+                response = self.transport.get(self.url)
                 response.raise_for_status()
                 
                 self.parse_data(response.text)
@@ -169,236 +417,700 @@ class M3U8_Segments:
             except Exception as e:
                 raise RuntimeError(f"M3U8 info retrieval failed: {e}")
     
-    def setup_interrupt_handler(self):
+    def handle_interrupt(self, signum, frame, verbose: bool = True) -> None:
         """
-        Set up a signal handler for graceful interruption.
+        SIGINT handler: the first presses stop the download gracefully, MAX_INTERRUPT_COUNT presses force it.
+
+        Parameters:
+            - verbose (bool): Print the stop messages, disabled for the tracks sharing one handler.
         """
-        def interrupt_handler(signum, frame):
-            with self.interrupt_lock:
-                self.interrupt_count += 1
-                if self.interrupt_count >= MAX_INTERRUPT_COUNT:
-                    self.force_stop = True
-                    
-            if self.force_stop:
+        with self.interrupt_lock:
+            self.interrupt_count += 1
+            if self.interrupt_count >= MAX_INTERRUPT_COUNT:
+                self.force_stop = True
+
+        # The first press ends a live recording, the segments already listed are still downloaded
+        if self.live_recording.is_set() and not self.live_stop.is_set() and not self.force_stop:
+            if verbose:
+                console.print("\n[red]- Stopping live recording... (Ctrl+C again to stop the download)")
+            self.live_stop.set()
+            return
+                
+        if self.force_stop:
+            if verbose:
                 console.print("\n[red]Force stop triggered! Exiting immediately.")
 
-            else:
-                if not self.interrupt_flag.is_set():
-                    remaining = MAX_INTERRUPT_COUNT - self.interrupt_count
+        else:
+            if not self.interrupt_flag.is_set():
+                remaining = MAX_INTERRUPT_COUNT - self.interrupt_count
+                if verbose:
                     console.print(f"\n[red]- Stopping gracefully... (Ctrl+C {remaining}x to force)")
-                    self.download_interrupted = True
+                self.download_interrupted = True
 
-                    if remaining == 1:
-                        self.interrupt_flag.set()
+                if remaining == 1:
+                    self.interrupt_flag.set()
 
-                    
+    def setup_interrupt_handler(self):
+        """
+        Set up a signal handler for graceful interruption.
+        """
         if threading.current_thread() is threading.main_thread():
-            signal.signal(signal.SIGINT, interrupt_handler)
+            signal.signal(signal.SIGINT, self.handle_interrupt)
         else:
             print("Signal handler must be set in the main thread")
 
-    def _get_http_client(self):
-        client_params = {
-            'headers': {'User-Agent': get_userAgent()},
-            'timeout': SEGMENT_MAX_TIMEOUT,
-            'follow_redirects': True,
-            'http2': False,
-            'verify': REQUEST_VERIFY
-        }
-        return httpx.Client(**client_params)
-                            
-    def download_segment(self, ts_url: str, index: int, progress_bar: tqdm, backoff_factor: float = 1.1) -> None:
+    def _open_sink(self, index: int, decryption: Optional[M3U8_Decryption], hedge: bool = False) -> SegmentSink:
+        """Return the sink receiving the body of a segment: its own file in direct assembly mode, memory otherwise."""
+        if self.direct_assembly:
+            return FileSink(self.journal.get_segment_path(index), decryption, self.decrypt_stage, ".hedge.part" if hedge else ".part")
+        return MemorySink(decryption, self.decrypt_stage)
+
+    def _is_claimed(self, index: int) -> bool:
+        """True once a request for the segment has won, the other requests for it can stop."""
+        return index in self.claimed_segments
+
+    def _claim_segment(self, index: int) -> bool:
         """
-        Downloads a TS segment and adds it to the segment queue with retry logic.
+        Marks the segment as delivered, only the first request finishing it (original or hedged) gets True.
+        """
+        with self.claim_lock:
+            if index in self.claimed_segments:
+                return False
+            self.claimed_segments.add(index)
+            return True
+
+    def _commit_segment(self, index: int, sink: SegmentSink, progress_bar: tqdm) -> bool:
+        """
+        Hands a fully received and decrypted segment to the writer (or to the journal in direct assembly mode).
 
         Parameters:
-            - ts_url (str): The URL of the TS segment.
             - index (int): The index of the segment.
+            - sink (SegmentSink): Sink holding the segment, `finish` already called.
             - progress_bar (tqdm): Progress counter for tracking download progress.
-            - backoff_factor (float): The backoff factor for exponential backoff (default is 1.5 seconds).
+
+        Returns:
+            bool: False if another request already delivered the segment, the sink is then dropped.
         """
-        for attempt in range(REQUEST_MAX_RETRY):
-            if self.interrupt_flag.is_set():
-                return
-            
-            try:
-                with self._get_http_client() as client:
-                    response = client.get(ts_url)
+        if not self._claim_segment(index):
+            return False
+
+        self.class_ts_estimator.update_progress_bar(sink.received, progress_bar)
+
+        if self.direct_assembly:
+            self.journal.record(index, OWN_FILE_OFFSET, sink.commit())
+        else:
+            self.reorder_buffer.put(index, sink.getvalue(), block=self.buffer_blocking)
+            self.metrics.record_reorder_depth(len(self.reorder_buffer))
+
+        self.downloaded_segments.add(index)
+        progress_bar.update(1)
+        return True
+
+    def _abort_decryption(self, index: int, error: Exception) -> None:
+        """Stops the whole download, a segment that can't be decrypted means a wrong key."""
+        logging.error(f"Decryption failed for segment {index}: {str(error)}")
+        self.interrupt_flag.set()   # Interrupt the download process
+        self.stop_event.set()       # Trigger the stopping event for all threads
+
+    def _register_failure(self, ts_url: str, index: int, attempt: int, error: Exception, progress_bar: tqdm, failover: bool = False) -> bool:
+        """
+        Updates retry statistics after a failed attempt.
+        When another source can serve the retry, the error is blamed on the failing host and the window is left as is.
+
+        Returns:
+            bool: True if it was the last attempt and the segment is marked as failed.
+        """
+        logging.info(f"Attempt {attempt + 1} failed for segment {index} - '{ts_url}': {error}")
+        if not failover:
+            self.concurrency.record_failure(error)
         
-                    # Validate response and content
-                    response.raise_for_status()
-                    segment_content = response.content
-                    content_size = len(segment_content)
-
-                    # Decrypt if needed and verify decrypted content
-                    if self.decryption is not None:
-                        try:
-                            segment_content = self.decryption.decrypt(segment_content)
-                            
-                        except Exception as e:
-                            logging.error(f"Decryption failed for segment {index}: {str(e)}")
-                            self.interrupt_flag.set()   # Interrupt the download process
-                            self.stop_event.set()       # Trigger the stopping event for all threads
-                            break                       # Stop the current task immediately
-
-                    self.class_ts_estimator.update_progress_bar(content_size, progress_bar)
-                    self.queue.put((index, segment_content))
-                    self.downloaded_segments.add(index)  
-                    progress_bar.update(1)
-                    return
+        if attempt > self.info_maxRetry:
+            self.info_maxRetry = ( attempt + 1 )
+        self.info_nRetry += 1
+        self.metrics.record_retry()
 
-            except Exception as e:
-                logging.info(f"Attempt {attempt + 1} failed for segment {index} - '{ts_url}': {e}")
-                
-                if attempt > self.info_maxRetry:
-                    self.info_maxRetry = ( attempt + 1 )
-                self.info_nRetry += 1
-
-                if attempt + 1 == REQUEST_MAX_RETRY:
-                    console.log(f"[red]Final retry failed for segment: {index}")
-                    self.queue.put((index, None))  # Marker for failed segment
-                    progress_bar.update(1)
-                    self.info_nFailed += 1
-                    return
-                
-                with self.active_retries_lock:
-                    self.active_retries += 1
-                
-                sleep_time = backoff_factor * (2 ** attempt)
-                logging.info(f"Retrying segment {index} in {sleep_time} seconds...")
-                time.sleep(sleep_time)
-                
-                with self.active_retries_lock:
-                    self.active_retries -= 1
+        if attempt + 1 == REQUEST_MAX_RETRY and self._claim_segment(index):
+            console.log(f"[red]Final retry failed for segment: {index}")
+            if self.direct_assembly:
+                self.journal.record(index, OWN_FILE_OFFSET, 0, STATUS_FAILED)
+            else:
+                self.reorder_buffer.put(index, None)  # Marker for failed segment
+            progress_bar.update(1)
+            self.info_nFailed += 1
+            self.metrics.record_failure()
+            return True
+        
+        return False
+
+    def _schedule_retry(self, ts_url: str, index: int, attempt: int, error: Exception, progress_bar: tqdm, scheduler: SegmentScheduler, backoff_factor: float, failover: bool = False) -> None:
+        """
+        Registers a failed attempt and puts the segment back in the scheduler with exponential backoff.
+        With `failover` the retry goes to another source right away, without backoff.
+        """
+        if self._is_claimed(index):
+            return  # A hedged request delivered it meanwhile
+        if self._register_failure(ts_url, index, attempt, error, progress_bar, failover):
+            return
+
+        with self.active_retries_lock:
+            self.active_retries += 1
+
+        sleep_time = 0 if failover else backoff_factor * (2 ** attempt)
+        logging.info(f"Retrying segment {index} in {sleep_time} seconds...")
+        scheduler.retry(index, attempt + 1, sleep_time)
+
+    def _start_request(self, index: int, hedge: bool) -> float:
+        """Return the start time of a request, the original one is tracked as in flight for hedging."""
+        start_time = time.monotonic()
+        if not hedge:
+            self.inflight_started[index] = start_time
+        return start_time
+
+    def _record_success(self, latency: float, size: int) -> None:
+        """Feeds the latency of a completed request to the concurrency controller and to the hedge policy."""
+        self.concurrency.record_success(latency, size)
+        self.metrics.record_request(latency)
+        if self.hedge is not None:
+            self.hedge.record_latency(latency)
+
+    def _end_request(self, index: int, sink: Optional[SegmentSink], hedge: bool) -> None:
+        """Drops what the sink still holds and frees the slot of the request."""
+        if sink is not None:
+            sink.discard()
+        if hedge:
+            return  # Hedged requests don't take a slot of the shared budget
+
+        self.inflight_started.pop(index, None)
+        if self.budget is not None:
+            self.budget.release()
+
+    def download_segment(self, index: int, attempt: int, progress_bar: tqdm, scheduler: SegmentScheduler, backoff_factor: float = 1.1, hedge: bool = False) -> None:
+        """
+        Makes one attempt to download a TS segment, on failure the segment goes back to the scheduler.
+        The body is streamed in chunks into the segment sink, decrypted on the fly.
+        A hedged request races the original one: the first to finish delivers the segment and the other stops
+        at its next chunk. A failed hedged request is dropped, retries stay with the original one.
+        Every attempt (and the hedged request) goes to the next healthy source of the segment.
+
+        Parameters:
+            - index (int): The index of the segment.
+            - attempt (int): Number of the attempt, starting from 0.
+            - progress_bar (tqdm): Progress counter for tracking download progress.
+            - scheduler (SegmentScheduler): Queue of the segments to fetch.
+            - backoff_factor (float): The backoff factor for exponential backoff.
+            - hedge (bool): Duplicate request for a straggling segment.
+        """
+        source = self.mirrors.pick(index, attempt + 1 if hedge else attempt)
+        ts_url = self.sources[source][index]
+        sink = None
+        try:
+            if self.interrupt_flag.is_set() or self._is_claimed(index):
+                return
+
+            decryption = self._get_decryption(index)
+            start_time = self._start_request(index, hedge)
+            with self.transport.stream(ts_url, timeout=SEGMENT_MAX_TIMEOUT) as response:
+                response.raise_for_status()
+                sink = self._open_sink(index, decryption, hedge)
+                for chunk in response.iter_bytes(STREAM_CHUNK_SIZE):
+                    self.metrics.record_bytes(len(chunk))
+                    if self._is_claimed(index):
+                        return  # Lost the race with the other request
+                    sink.write(chunk)
+
+            self._record_success(time.monotonic() - start_time, sink.received)
+            self.mirrors.record_success(source)
+            sink.finish()
+            if self._commit_segment(index, sink, progress_bar) and hedge:
+                self.hedge.record_win()
+
+        except DecryptionError as e:
+            self._abort_decryption(index, e)
+
+        except Exception as e:
+            self.mirrors.record_failure(source)
+            if hedge:
+                logging.info(f"Hedged request failed for segment {index}: {e}")
+            else:
+                self._schedule_retry(ts_url, index, attempt, e, progress_bar, scheduler, backoff_factor, self.mirrors.has_alternative(source))
+
+        finally:
+            self._end_request(index, sink, hedge)
+
+    async def download_segment_async(self, index: int, attempt: int, progress_bar: tqdm, scheduler: SegmentScheduler, backoff_factor: float = 1.1, hedge: bool = False) -> None:
+        """
+        Asyncio version of `download_segment`.
+
+        Parameters:
+            - index (int): The index of the segment.
+            - attempt (int): Number of the attempt, starting from 0.
+            - progress_bar (tqdm): Progress counter for tracking download progress.
+            - scheduler (SegmentScheduler): Queue of the segments to fetch.
+            - backoff_factor (float): The backoff factor for exponential backoff.
+            - hedge (bool): Duplicate request for a straggling segment.
+        """
+        source = self.mirrors.pick(index, attempt + 1 if hedge else attempt)
+        ts_url = self.sources[source][index]
+        sink = None
+        try:
+            if self.interrupt_flag.is_set() or self._is_claimed(index):
+                return
+
+            decryption = await self._get_decryption_async(index)
+            start_time = self._start_request(index, hedge)
+            client = self.transport.get_async_client(ts_url)
+            async with client.stream("GET", ts_url, timeout=SEGMENT_MAX_TIMEOUT) as response:
+                response.raise_for_status()
+                sink = self._open_sink(index, decryption, hedge)
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    self.metrics.record_bytes(len(chunk))
+                    if self._is_claimed(index):
+                        return  # Lost the race with the other request
+                    await sink.write_async(chunk)
+
+            self._record_success(time.monotonic() - start_time, sink.received)
+            self.mirrors.record_success(source)
+            await sink.finish_async()
+
+            # Renaming the segment file or spilling it to disk blocks, keep it off the event loop
+            committed = await asyncio.get_running_loop().run_in_executor(None, self._commit_segment, index, sink, progress_bar)
+            if committed and hedge:
+                self.hedge.record_win()
+
+        except DecryptionError as e:
+            self._abort_decryption(index, e)
+
+        except Exception as e:
+            self.mirrors.record_failure(source)
+            if hedge:
+                logging.info(f"Hedged request failed for segment {index}: {e}")
+            else:
+                self._schedule_retry(ts_url, index, attempt, e, progress_bar, scheduler, backoff_factor, self.mirrors.has_alternative(source))
+
+        finally:
+            self._end_request(index, sink, hedge)
+
+    def _fetch_init_section(self) -> bytes:
+        """Fetches the init section (EXT-X-MAP) of an fMP4 track, once for all the fragments."""
+        headers = {}
+        if self.init_section['byterange']:
+            length, _, offset = self.init_section['byterange'].partition('@')
+            start = int(offset or 0)
+            headers['Range'] = f"bytes={start}-{start + int(length) - 1}"
+
+        try:
+            response = self.transport.get(self.init_section['uri'], headers=headers)
+            response.raise_for_status()
+            return response.content
+
+        except Exception as e:
+            logging.error(f"Failed to fetch init section {self.init_section['uri']}: {e}")
+            raise
+
+    def _write_init_section(self, f) -> None:
+        """Writes the init section at the start of the data file (or pipe), before the first fragment."""
+        init_data = self._fetch_init_section()
+        f.write(init_data)
+        f.flush()
+        self.journal.record(INIT_INDEX, self.write_offset, len(init_data))
+        self.write_offset += len(init_data)
+
+    def _prepare_journal(self) -> None:
+        """
+        Opens the segment journal of the track and resumes a previous run if it matches the playlist.
+        Bytes past the last journaled segment (partial write of a crashed run) are dropped.
+        """
+        self.journal = SegmentJournal(self.tmp_folder)
+
+        # Streamed into a muxer: segments go in playlist order and a pipe can't be resumed
+        if self.output_pipe is not None:
+            self.direct_assembly = False
+            if os.path.exists(self.journal.path):
+                os.remove(self.journal.path)
+
+        resumed = self.journal.open(len(self.segments), self.playlist_id)
+        self.write_offset = self.journal.get_data_size() if resumed else 0
+
+        if self.output_pipe is None:
+            with open(self.tmp_file_path, 'ab') as f:
+                f.truncate(self.write_offset)
+
+                if self.init_section is not None and not self.journal.has_init():
+                    self._write_init_section(f)
+
+        written = self.journal.get_written()
+        self.downloaded_segments.update(written)
+        self.pending_segments = self.journal.get_pending()
+        self.skip_segments = set(written)
+        self.expected_index = self._next_expected(-1)
+
+        if self.direct_assembly:
+            os.makedirs(self.journal.segment_folder, exist_ok=True)
+
+        if resumed:
+            console.print(f"[cyan]Resume download: [green]{len(written)}[white]/[green]{len(self.segments)} [cyan]segments already on disk")
+
+    def _next_expected(self, index: int) -> int:
+        """Return the first index after `index` that still has to be written."""
+        index += 1
+        while index in self.skip_segments:
+            index += 1
+        return index
+
+    def _write_segment(self, f, index: int, segment_content: bytes) -> None:
+        """Appends a segment (or records it as failed) and commits it to the journal."""
+        offset = self.write_offset
+
+        if segment_content is None:
+            self.journal.record(index, offset, 0, STATUS_FAILED)
+
+        else:
+            f.write(segment_content)
+            f.flush()
+            self.write_offset += len(segment_content)
+            self.journal.record(index, offset, len(segment_content))
+
+        self.expected_index = self._next_expected(index)
+
+    def _open_output(self) -> Optional[BinaryIO]:
+        """Return the file the writer appends to: the track data file, or the pipe of the stream muxer."""
+        if self.output_pipe is None:
+            return open(self.tmp_file_path, 'ab')
+
+        f = self.output_pipe()
+        if f is not None and self.init_section is not None:
+            try:
+                self._write_init_section(f)
+            except Exception:
+                f.close()
+                return None
+        return f
 
     def write_segments_to_file(self):
         """
         Writes segments to file with additional verification.
         """
-        with open(self.tmp_file_path, 'wb') as f:
-            while not self.stop_event.is_set() or not self.queue.empty():
+        f = self._open_output()
+        if f is None:
+            self.interrupt_flag.set()   # Nobody will read the track
+            return
+
+        with f:
+            while self.expected_index < len(self.segments) or self.live_recording.is_set():
                 if self.interrupt_flag.is_set():
                     break
                 
                 try:
-                    index, segment_content = self.queue.get(timeout=self.current_timeout)
-
-                    # Successful queue retrieval: reduce timeout
-                    self.current_timeout = max(self.base_timeout, self.current_timeout / 2)
+                    segment_content = self.reorder_buffer.pop(self.expected_index, timeout=0.5)
 
-                    # Handle failed segments
-                    if segment_content is None:
-                        if index == self.expected_index:
-                            self.expected_index += 1
+                    # Downloads are over and the next segment will never arrive
+                    if segment_content is MISSING:
+                        if self.stop_event.is_set():
+                            break
                         continue
 
-                    # Write segment if it's the next expected one
-                    if index == self.expected_index:
-                        f.write(segment_content)
-                        f.flush()
-                        self.expected_index += 1
+                    self._write_segment(f, self.expected_index, segment_content)
+                    self.metrics.record_reorder_depth(len(self.reorder_buffer))
 
-                        # Write any buffered segments that are now in order
-                        while self.expected_index in self.buffer:
-                            next_segment = self.buffer.pop(self.expected_index)
-
-                            if next_segment is not None:
-                                f.write(next_segment)
-                                f.flush()
+                except Exception as e:
+                    logging.error(f"Error writing segment {self.expected_index}: {str(e)}")
+                    if self.output_pipe is not None:
+                        self.interrupt_flag.set()   # The muxer is gone, the rest of the track is useless
+                    break
 
-                            self.expected_index += 1
-                    
-                    else:
-                        self.buffer[index] = segment_content
+    def _finalize_journal(self) -> None:
+        """
+        Puts the data file in playlist order once the track passes verification, failed segments are skipped.
+        The journal is marked complete only when every segment is on disk.
+        """
+        try:
+            # Segments streamed into a muxer are not on disk
+            if self.output_pipe is None and not self.interrupt_flag.is_set() and not self.download_interrupted and self._is_complete_enough():
+                
+                if self.journal.needs_reorder():
+                    logging.info(f"Assemble segments in playlist order: {self.tmp_file_path}")
+                    self.journal.reorder(self.tmp_file_path)
 
-                except queue.Empty:
-                    self.current_timeout = min(MAX_TIMEOOUT, self.current_timeout * 1.1)
-                    time.sleep(0.05)
+                if self.info_nFailed == 0 and len(self.journal.get_written()) == len(self.segments):
+                    self.journal.mark_complete()
 
-                    if self.stop_event.is_set():
-                        break
+        except Exception as e:
+            logging.error(f"Error finalizing journal: {str(e)}")
 
-                except Exception as e:
-                    logging.error(f"Error writing segment {index}: {str(e)}")
+        finally:
+            self.journal.close()
     
-    def download_streams(self, description: str, type: str):
+    def _start_streams(self, description: str):
         """
-        Downloads all TS segments in parallel and writes them to a file.
+        Creates the progress bar and starts the writer thread (none in direct assembly mode).
 
-        Parameters:
-            - description: Description to insert on tqdm bar
-            - type (str): Type of download: 'video' or 'audio'
+        Returns:
+            tuple: (writer_thread, progress_bar)
         """
-        if TELEGRAM_BOT:
-
-          # Viene usato per lo screen 
-          console.log("####")
-          
-        self.get_info()
-        self.setup_interrupt_handler()
-
         progress_bar = tqdm(
             total=len(self.segments), 
+            initial=len(self.segments) - len(self.pending_segments),
             unit='s',
             ascii='░▒█',
             bar_format=self._get_bar_format(description),
             mininterval=0.6,
             maxinterval=1.0,
             file=sys.stdout,        # Using file=sys.stdout to force in-place updates because sys.stderr may not support carriage returns in this environment.
+            position=self.progress_position,
+            postfix=["--:--", ""]       # [ETA, size and speed], set by the estimator
         )
 
-        try:
-            writer_thread = threading.Thread(target=self.write_segments_to_file)
-            writer_thread.daemon = True
-            writer_thread.start()
+        self.metrics = metrics_hub.start_job(description)
 
-            # Configure workers and delay
-            max_workers = self._get_worker_count(type)
-            
-            # Download segments with completion verification
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = []
-                for index, segment_url in enumerate(self.segments):
+        # Set before the writer starts, so it waits for the segments still to come
+        if self.live:
+            self.live_recording.set()
 
-                    # Check for interrupt before submitting each task
-                    if self.interrupt_flag.is_set():
-                        break
+        if self.direct_assembly:
+            return None, progress_bar
+
+        writer_thread = threading.Thread(target=self.write_segments_to_file)
+        writer_thread.daemon = True
+        writer_thread.start()
+        return writer_thread, progress_bar
+
+    def _next_job(self, scheduler: SegmentScheduler, n_inflight: int):
+        """Return the next (index, attempt) to start if the window and the shared budget have a free slot, else None."""
+        self.budget_blocked = False
+        if n_inflight >= self.concurrency.get_limit():
+            return None
+
+        if self.budget is not None and not self.budget.try_acquire():
+            self.budget_blocked = True
+            return None
+
+        job = scheduler.pop()
+        if job is None:
+            if self.budget is not None:
+                self.budget.release()
+
+        elif job[1] > 0:
+            with self.active_retries_lock:
+                self.active_retries -= 1
+        return job
+
+    def _window_timeout(self, scheduler: SegmentScheduler, n_inflight: int) -> float:
+        """Return how long the dispatcher can wait for a completion before a queued retry is due."""
+        ready_in = scheduler.next_ready_in()
+        if self.budget_blocked and ready_in is not None:
+            return BUDGET_POLL_INTERVAL
+        if ready_in is None or n_inflight >= self.concurrency.get_limit():
+            return WINDOW_POLL_INTERVAL
+        return min(WINDOW_POLL_INTERVAL, ready_in)
 
-                    time.sleep(TQDM_DELAY_WORKER)
-                    futures.append(executor.submit(self.download_segment, segment_url, index, progress_bar))
+    def _pick_hedge(self) -> Optional[int]:
+        """
+        Return the straggling segment that gets a hedged request now, None if there is none or the cap is reached.
+        In ordered assembly only the segment the writer waits for is hedged, the others don't hold back anything.
+        """
+        if self.hedge is None:
+            return None
+
+        threshold = self.hedge.threshold()
+        if threshold is None:
+            return None
+
+        now = time.monotonic()
+        for index, started in list(self.inflight_started.items()):
+            if now - started < threshold or index in self.hedged_segments or self._is_claimed(index):
+                continue
+            if not self.direct_assembly and index != self.expected_index:
+                continue
+            if not self.hedge.try_hedge():
+                return None
+
+            logging.info(f"Hedge segment {index}, in flight for {now - started:.2f}s (threshold {threshold:.2f}s)")
+            self.hedged_segments.add(index)
+            return index
+
+        return None
+
+    def _download_threaded(self, progress_bar: tqdm) -> None:
+        """
+        Downloads all segments with a sliding window of requests in flight on a ThreadPoolExecutor.
+        A new request starts as soon as one completes, the window size comes from the concurrency controller.
+        At most one hedged request runs at a time, on a spare thread. A thread losing a hedge race can't be
+        interrupted while it waits for the CDN, so it leaves the window and runs out on a spare thread.
+        """
+        scheduler = SegmentScheduler(self.pending_segments)
+        self._start_live_recording(scheduler, progress_bar)
+        inflight = set()
+        hedging = set()
+        lost = set()
+        future_index = {}
+        executor = ThreadPoolExecutor(max_workers=self.concurrency.max_limit + 1 + HEDGE_SPARE_THREADS)
 
-                # Wait for futures with interrupt handling
-                for future in as_completed(futures):
-                    if self.interrupt_flag.is_set():
+        try:
+            while not self.interrupt_flag.is_set():
+                job = self._next_job(scheduler, len(inflight) - len(hedging) - len(lost))
+                while job is not None:
+                    future = executor.submit(self.download_segment, job[0], job[1], progress_bar, scheduler)
+                    future_index[future] = job[0]
+                    inflight.add(future)
+                    job = self._next_job(scheduler, len(inflight) - len(hedging) - len(lost))
+
+                hedge_index = self._pick_hedge() if not hedging else None
+                if hedge_index is not None:
+                    future = executor.submit(self.download_segment, hedge_index, 0, progress_bar, scheduler, hedge=True)
+                    future_index[future] = hedge_index
+                    inflight.add(future)
+                    hedging.add(future)
+
+                if len(inflight) == len(lost):
+                    if not self._has_pending(scheduler):
                         break
+                    time.sleep(self._window_timeout(scheduler, 0))
+                    continue
+
+                done, inflight = wait(inflight, timeout=self._window_timeout(scheduler, len(inflight) - len(hedging) - len(lost)), return_when=FIRST_COMPLETED)
+                hedging -= done
+                lost -= done
+                for future in done:
+                    index = future_index.pop(future)
                     try:
                         future.result()
                     except Exception as e:
                         logging.error(f"Error in download thread: {str(e)}")
 
-                # Interrupt handling for missing segments
-                if not self.interrupt_flag.is_set():
-                    total_segments = len(self.segments)
-                    completed_segments = len(self.downloaded_segments)
-                    
-                    if completed_segments < total_segments:
-                        missing_segments = set(range(total_segments)) - self.downloaded_segments
-                        logging.warning(f"Missing segments: {sorted(missing_segments)}")
-                        
-                        # Retry missing segments with interrupt check
-                        for index in missing_segments:
-                            if self.interrupt_flag.is_set():
-                                break
-
-                            try:
-                                self.download_segment(self.segments[index], index, progress_bar)
-                                
-                            except Exception as e:
-                                logging.error(f"Failed to retry segment {index}: {str(e)}")
+                    # The other request of a hedged segment lost the race
+                    if index in self.hedged_segments and self._is_claimed(index):
+                        for other in inflight:
+                            if future_index[other] == index and len(lost) < HEDGE_SPARE_THREADS:
+                                lost.add(other)
+
+        finally:
+            # Don't wait for the requests that lost a hedge race, they drop their data on their own
+            executor.shutdown(wait=bool(inflight - lost))
+
+    async def _download_async(self, progress_bar: tqdm) -> None:
+        """
+        Asyncio version of `_download_threaded`, the window is made of asyncio tasks.
+        The request losing a hedge race is cancelled right away, even while waiting for its first byte.
+        """
+        scheduler = SegmentScheduler(self.pending_segments)
+        self._start_live_recording(scheduler, progress_bar)
+        inflight = set()
+        hedging = set()
+        task_index = {}
+
+        while not self.interrupt_flag.is_set():
+            job = self._next_job(scheduler, len(inflight) - len(hedging))
+            while job is not None:
+                task = asyncio.ensure_future(self.download_segment_async(job[0], job[1], progress_bar, scheduler))
+                task_index[task] = job[0]
+                inflight.add(task)
+                job = self._next_job(scheduler, len(inflight) - len(hedging))
+
+            hedge_index = self._pick_hedge() if not hedging else None
+            if hedge_index is not None:
+                task = asyncio.ensure_future(self.download_segment_async(hedge_index, 0, progress_bar, scheduler, hedge=True))
+                task_index[task] = hedge_index
+                inflight.add(task)
+                hedging.add(task)
+
+            if not inflight:
+                if not self._has_pending(scheduler):
+                    break
+                await asyncio.sleep(self._window_timeout(scheduler, 0))
+                continue
+
+            done, inflight = await asyncio.wait(inflight, timeout=self._window_timeout(scheduler, len(inflight) - len(hedging)), return_when=asyncio.FIRST_COMPLETED)
+            hedging -= done
+            for task in done:
+                index = task_index.pop(task)
+                if not task.cancelled() and task.exception() is not None:
+                    logging.error(f"Error in download task: {str(task.exception())}")
+
+                # The other request of a hedged segment lost the race
+                if index in self.hedged_segments and self._is_claimed(index):
+                    for other in inflight:
+                        if task_index.get(other) == index:
+                            other.cancel()
+
+        # Let the requests already started end after an interrupt
+        if inflight:
+            await asyncio.gather(*inflight, return_exceptions=True)
+
+    def download_streams(self, description: str, type: str):
+        """
+        Downloads all TS segments in parallel and writes them to a file.
+        The engine ('thread' or 'async') is selected by the `download_engine` config key.
+
+        Parameters:
+            - description: Description to insert on tqdm bar
+            - type (str): Type of download: 'video' or 'audio'
+        """
+        if DOWNLOAD_ENGINE == "async":
+            return asyncio.run(self._run_async_engine(description, type))
 
+        if TELEGRAM_BOT:
+
+          # Viene usato per lo screen 
+          console.log("####")
+          
+        self.get_info()
+        self._prepare_journal()
+        self._prepare_concurrency(type)
+        self.setup_interrupt_handler()
+        writer_thread, progress_bar = self._start_streams(description)
+
+        try:
+            self._download_threaded(progress_bar)
         finally:
             self._cleanup_resources(writer_thread, progress_bar)
 
+        if self.output_incomplete:
+            raise RuntimeError(f"{description} track incomplete in the stream muxer")
+        if not self.interrupt_flag.is_set():
+            self._verify_download_completion()
+
+        return self._generate_results(type)
+
+    async def _run_async_engine(self, description: str, type: str) -> Dict:
+        """Runs `download_streams_async` on a private event loop and closes its async clients."""
+        try:
+            return await self.download_streams_async(description, type)
+        finally:
+            await self.transport.aclose()
+
+    async def download_streams_async(self, description: str, type: str, setup_interrupt: bool = True):
+        """
+        Asyncio version of `download_streams`, can share one event loop with other tracks.
+        Async clients of the shared transport must be closed by the caller with `transport.aclose()`.
+
+        Parameters:
+            - description: Description to insert on tqdm bar
+            - type (str): Type of download: 'video' or 'audio'
+            - setup_interrupt (bool): Install the SIGINT handler, False when the caller dispatches it to every track.
+        """
+        if TELEGRAM_BOT:
+
+          # Viene usato per lo screen 
+          console.log("####")
+
+        await asyncio.get_running_loop().run_in_executor(None, self.get_info)
+        self._prepare_journal()
+        self._prepare_concurrency(type)
+        self.buffer_blocking = False    # Never block the event loop, spill to disk instead
+        if setup_interrupt:
+            self.setup_interrupt_handler()
+        writer_thread, progress_bar = self._start_streams(description)
+
+        try:
+            await self._download_async(progress_bar)
+        finally:
+            # Writer join, journal reorder and file I/O block, the other tracks on the loop keep downloading
+            await asyncio.get_running_loop().run_in_executor(None, self._cleanup_resources, writer_thread, progress_bar)
+            if self.own_transport:
+                await self.transport.aclose()
+
+        if self.output_incomplete:
+            raise RuntimeError(f"{description} track incomplete in the stream muxer")
         if not self.interrupt_flag.is_set():
             self._verify_download_completion()
 
@@ -407,12 +1119,13 @@ class M3U8_Segments:
     def _get_bar_format(self, description: str) -> str:
         """
         Generate platform-appropriate progress bar format.
+        The remaining time is the ETA of the estimator (bytes left over measured bandwidth), not the tqdm one.
         """
         return (
             f"{Colors.YELLOW}[HLS] {Colors.WHITE}({Colors.CYAN}{description}{Colors.WHITE}): "
             f"{Colors.RED}{{percentage:.2f}}% "
             f"{Colors.MAGENTA}{{bar}} "
-            f"{Colors.YELLOW}{{elapsed}}{Colors.WHITE} < {Colors.CYAN}{{remaining}}{Colors.WHITE}{{postfix}}{Colors.WHITE}"
+            f"{Colors.YELLOW}{{elapsed}}{Colors.WHITE} < {Colors.CYAN}{{postfix[0]}}{Colors.WHITE}{{postfix[1]}}{Colors.WHITE}"
         )
     
     def _get_worker_count(self, stream_type: str) -> int:
@@ -425,27 +1138,102 @@ class M3U8_Segments:
         }.get(stream_type.lower(), 1)
 
         return base_workers
+
+    def _prepare_concurrency(self, stream_type: str) -> None:
+        """
+        Creates the concurrency controller of the track.
+        It starts from the best worker count stored for the CDN host, or from the configured one.
+        """
+        self.cdn_host = urlparse(self.segments[0]).netloc if self.segments else ""
+        initial = self._get_worker_count(stream_type)
+
+        if ADAPTIVE_WORKERS:
+            stored = ConcurrencyStore().get(self.cdn_host)
+            if stored:
+                logging.info(f"Start with {stored} workers learned for host: {self.cdn_host}")
+                initial = stored
+
+        self.concurrency = AdaptiveConcurrency(initial, max_limit=max(MAX_WORKERS, initial), adaptive=ADAPTIVE_WORKERS)
+
+    def _save_concurrency(self) -> None:
+        """Stores the best worker count found for the CDN host, for the next downloads."""
+        if not ADAPTIVE_WORKERS or self.concurrency is None or self.download_interrupted:
+            return
+
+        logging.info(f"Best worker count for host {self.cdn_host}: {self.concurrency.best_limit}")
+        ConcurrencyStore().set(self.cdn_host, self.concurrency.best_limit)
     
     def _generate_results(self, stream_type: str) -> Dict:
         """Package final download results."""
         return {
             'type': stream_type,
             'nFailed': self.info_nFailed,
-            'stopped': self.download_interrupted
+            'stopped': self.download_interrupted,
+            'peak_buffer': self.reorder_buffer.peak_bytes,
+            'spilled': self.reorder_buffer.spilled_count,
+            'workers': self.concurrency.best_limit,
+            'hedged': self.hedge.n_hedged if self.hedge is not None else 0,
+            'hedge_wins': self.hedge.n_won if self.hedge is not None else 0
         }
     
+    def _is_complete_enough(self) -> bool:
+        """Check if enough segments are on disk for the track to be used."""
+        return len(self.downloaded_segments) >= len(self.segments) * MIN_COMPLETE_RATIO
+
     def _verify_download_completion(self) -> None:
         """Validate final download integrity."""
         total = len(self.segments)
-        if len(self.downloaded_segments) / total < 0.999:
+        if not self._is_complete_enough():
             missing = sorted(set(range(total)) - self.downloaded_segments)
             raise RuntimeError(f"Download incomplete ({len(self.downloaded_segments)/total:.1%}). Missing segments: {missing}")
         
+    def _join_writer(self, writer_thread: threading.Thread) -> None:
+        """
+        Wait for the writer to flush the segments still buffered, once the downloads are over.
+        A muxer pipe is waited for without timeout: FFmpeg reads the tracks in timestamp order, so the writer can
+        block on its pipe while another track catches up. It ends once the track is written, on interrupt, or
+        when FFmpeg exits (broken pipe).
+        """
+        if self.output_pipe is None:
+            self.stop_event.set()
+            writer_thread.join(timeout=WRITER_JOIN_TIMEOUT)
+
+        else:
+            while writer_thread.is_alive():
+
+                # Every buffered segment has been handed over, one still missing will never arrive
+                if len(self.reorder_buffer) == 0:
+                    self.stop_event.set()
+                writer_thread.join(timeout=WINDOW_POLL_INTERVAL)
+
+            if self.expected_index < len(self.segments) and not self.download_interrupted:
+                logging.error(f"Stream mux input ended at segment {self.expected_index}/{len(self.segments)}")
+                self.output_incomplete = True
+
+        if writer_thread.is_alive():
+            logging.error(f"Writer still running after {WRITER_JOIN_TIMEOUT}s, segments left in the buffer are dropped")
+
     def _cleanup_resources(self, writer_thread: threading.Thread, progress_bar: tqdm) -> None:
         """Ensure resource cleanup and final reporting."""
+        self.live_stop.set()
+        if writer_thread is not None:
+            self._join_writer(writer_thread)
         self.stop_event.set()
-        writer_thread.join(timeout=30)
         progress_bar.close()
+        metrics_hub.end_job(self.metrics)
+        telemetry.end_job(
+            self.metrics,
+            segments=len(self.segments),
+            interrupted=self.download_interrupted,
+            peak_buffer=self.reorder_buffer.peak_bytes,
+            spilled=self.reorder_buffer.spilled_count,
+            workers=self.concurrency.best_limit if self.concurrency is not None else None
+        )
+        self._finalize_journal()
+        self._save_concurrency()
+
+        if self.own_transport:
+            self.transport.close()
         
         #if self.download_interrupted:
         #    console.print("\n[red]Download terminated by user")
@@ -453,7 +1241,7 @@ class M3U8_Segments:
         if self.info_nFailed > 0:
             self._display_error_summary()
 
-        self.buffer = {}
+        self.reorder_buffer.close()
         self.expected_index = 0
 
     def _display_error_summary(self) -> None:
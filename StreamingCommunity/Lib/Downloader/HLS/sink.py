@@ -0,0 +1,191 @@
+# 17.10.26
+
+import os
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+
+
+# Logic class
+from ...M3U8 import M3U8_Decryption
+from .decrypt_stage import DecryptStage
+
+
+class DecryptionError(Exception):
+    """Raised when a segment can't be decrypted, retrying the download won't help."""
+    pass
+
+
+class SegmentSink(ABC):
+    """
+    Destination of one segment while its body streams in.
+    Every chunk is decrypted (if needed) and written right away, so a worker only holds one chunk of ciphertext.
+    With a decrypt stage the ciphertext is collected instead, and the whole segment is decrypted by the stage at the end.
+    """
+    blocking_io = False     # Writes hit the disk, the async engine runs them off the event loop
+
+    def __init__(self, decryption: M3U8_Decryption = None, stage: DecryptStage = None):
+        """
+        Parameters:
+            - decryption (M3U8_Decryption): Decryption of the segment, None for clear segments.
+            - stage (DecryptStage): Offloaded decrypt stage, None to decrypt chunk by chunk in the caller.
+        """
+        self.decryption = decryption
+        self.stage = stage if decryption is not None else None
+        self.decryptor = decryption.new_stream() if decryption is not None and self.stage is None else None
+        self.ciphertext = bytearray() if self.stage is not None else None
+        self.received = 0
+
+    @abstractmethod
+    def _write(self, data) -> None:
+        """Store plaintext bytes, in order."""
+
+    def _write_plaintext(self, data) -> None:
+        """Write the whole plaintext decrypted by the stage."""
+        self._write(data)
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Add the next chunk of the response body.
+
+        Parameters:
+            - chunk (bytes): Raw bytes as received.
+        """
+        self.received += len(chunk)
+
+        if self.ciphertext is not None:
+            self.ciphertext += chunk
+            return
+
+        if self.decryptor is not None:
+            try:
+                chunk = self.decryptor.update(chunk)
+            except Exception as e:
+                raise DecryptionError(e) from e
+
+        if chunk:
+            self._write(chunk)
+
+    async def _run_io(self, func, *args) -> None:
+        """Call a method writing data, on the default executor if it blocks on disk."""
+        if not self.blocking_io:
+            func(*args)
+            return
+
+        future = asyncio.get_running_loop().run_in_executor(None, func, *args)
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])    # The write must end before the cancelled request discards the sink
+            raise
+
+    async def write_async(self, chunk: bytes) -> None:
+        """Asyncio version of `write`."""
+        await self._run_io(self.write, chunk)
+
+    def finish(self) -> None:
+        """Decrypt the last block (or the whole segment on the stage) once the body has been received."""
+        if self.ciphertext is not None:
+            try:
+                plaintext = self.stage.decrypt(self.decryption, self.ciphertext)
+            except Exception as e:
+                raise DecryptionError(e) from e
+
+            self._write_plaintext(plaintext)
+
+        elif self.decryptor is not None:
+            try:
+                tail = self.decryptor.finalize()
+            except Exception as e:
+                raise DecryptionError(e) from e
+
+            if tail:
+                self._write(tail)
+
+    async def finish_async(self) -> None:
+        """Asyncio version of `finish`, the event loop keeps running while the stage decrypts."""
+        if self.ciphertext is None:
+            await self._run_io(self.finish)
+            return
+
+        try:
+            plaintext = await self.stage.decrypt_async(self.decryption, self.ciphertext)
+        except Exception as e:
+            raise DecryptionError(e) from e
+
+        await self._run_io(self._write_plaintext, plaintext)
+
+    def discard(self) -> None:
+        """Drop what has been written, no-op once committed."""
+        pass
+
+
+class MemorySink(SegmentSink):
+    """Keeps the plaintext in memory, for the in-order writer."""
+    def __init__(self, decryption: M3U8_Decryption = None, stage: DecryptStage = None):
+        super().__init__(decryption, stage)
+        self.buffer = bytearray()
+
+    def _write(self, data) -> None:
+        self.buffer += data
+
+    def _write_plaintext(self, data) -> None:
+        # Keep the stage output (a view over the decrypted buffer) as is, no copy
+        self.buffer = data
+
+    def getvalue(self):
+        """Return the plaintext of the segment."""
+        return self.buffer
+
+    def discard(self) -> None:
+        self.buffer = bytearray()
+        self.ciphertext = None
+
+
+class FileSink(SegmentSink):
+    """
+    Writes the plaintext to the segment file.
+    Data goes to a `.part` file, renamed by `commit`, so a crash never leaves a truncated segment under the final name.
+    """
+    blocking_io = True
+
+    def __init__(self, path: str, decryption: M3U8_Decryption = None, stage: DecryptStage = None, part_suffix: str = ".part"):
+        """
+        Parameters:
+            - path (str): Final path of the segment file.
+            - decryption (M3U8_Decryption): Decryption of the segment, None for clear segments.
+            - stage (DecryptStage): Offloaded decrypt stage, None to decrypt chunk by chunk in the caller.
+            - part_suffix (str): Suffix of the partial file, must differ between requests racing for the same segment.
+        """
+        super().__init__(decryption, stage)
+        self.path = path
+        self.part_path = f"{path}{part_suffix}"
+        self.size = 0
+        self.file = open(self.part_path, 'wb')
+
+    def _write(self, data) -> None:
+        self.file.write(data)
+        self.size += len(data)
+
+    def commit(self) -> int:
+        """
+        Move the segment to its final name.
+
+        Returns:
+            int: Size of the segment file.
+        """
+        self.file.close()
+        os.replace(self.part_path, self.path)
+        self.file = None
+        return self.size
+
+    def discard(self) -> None:
+        if self.file is None:
+            return
+
+        self.file.close()
+        self.file = None
+        try:
+            os.remove(self.part_path)
+        except OSError as e:
+            logging.info(f"Can't remove partial segment {self.part_path}: {e}")
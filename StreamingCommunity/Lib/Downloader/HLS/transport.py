@@ -0,0 +1,177 @@
+# 17.10.26
+
+import asyncio
+import logging
+import threading
+import importlib.util
+from urllib.parse import urlparse
+from typing import Dict, Tuple
+
+
+# External libraries
+import httpx
+
+
+# Internal utilities
+from StreamingCommunity.Util.headers import get_userAgent
+from StreamingCommunity.Util.config_json import config_manager
+
+
+# Config
+REQUEST_VERIFY = config_manager.get_bool('REQUESTS', 'verify')
+MAX_TIMEOUT = config_manager.get_int("REQUESTS", "timeout")
+USE_HTTP2 = config_manager.get_bool('M3U8_DOWNLOAD', 'use_http2')
+POOL_MAX_CONNECTIONS = config_manager.get_int('M3U8_DOWNLOAD', 'pool_max_connections')
+POOL_MAX_KEEPALIVE = config_manager.get_int('M3U8_DOWNLOAD', 'pool_max_keepalive')
+
+# Check if h2 module is installed (required by httpx for HTTP/2)
+h2_installed = importlib.util.find_spec("h2") is not None
+
+
+class HLS_Transport:
+    """
+    Shared keep-alive transport for HLS requests.
+    Holds one connection-pooled client per host, so every playlist, key and segment
+    request of a download job reuses the same TCP/TLS connections.
+    """
+    def __init__(self, headers: dict = None, max_connections: int = None, max_keepalive: int = None, http2: bool = None):
+        """
+        Parameters:
+            - headers (dict): Headers sent with every request (default random User-Agent).
+            - max_connections (int): Max open connections per host (default from config).
+            - max_keepalive (int): Max idle keep-alive connections per host (default from config).
+            - http2 (bool): Enable HTTP/2 multiplexing if 'h2' is installed (default from config).
+        """
+        self.headers = headers or {'User-Agent': get_userAgent()}
+        self.limits = httpx.Limits(
+            max_connections=max_connections or POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive or POOL_MAX_KEEPALIVE
+        )
+
+        self.http2 = USE_HTTP2 if http2 is None else http2
+        if self.http2 and not h2_installed:
+            logging.warning("HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1")
+            self.http2 = False
+
+        self._clients: Dict[str, httpx.Client] = {}
+        self._async_clients: Dict[Tuple[int, str], httpx.AsyncClient] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def _get_host(url: str) -> str:
+        """Return the pool key (scheme + netloc) of a URL."""
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def get_client(self, url: str) -> httpx.Client:
+        """
+        Return the pooled client for the host of the given URL, creating it on first use.
+
+        Parameters:
+            - url (str): Target URL.
+        """
+        host = self._get_host(url)
+        client = self._clients.get(host)
+        if client is not None:
+            return client
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("HLS transport already closed")
+
+            client = self._clients.get(host)
+            if client is None:
+                client = httpx.Client(
+                    headers=self.headers,
+                    timeout=MAX_TIMEOUT,
+                    follow_redirects=True,
+                    verify=REQUEST_VERIFY,
+                    http2=self.http2,
+                    limits=self.limits
+                )
+                self._clients[host] = client
+                logging.info(f"Open pooled client for host: {host} (http2: {self.http2})")
+
+        return client
+
+    def get(self, url: str, timeout: float = None, **kwargs) -> httpx.Response:
+        """
+        Send a GET request through the pooled client of the URL host.
+
+        Parameters:
+            - url (str): Target URL.
+            - timeout (float): Request timeout, overrides the client default.
+        """
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        return self.get_client(url).get(url, **kwargs)
+
+    def stream(self, url: str, timeout: float = None, **kwargs):
+        """
+        Send a streaming GET request through the pooled client of the URL host.
+        Use it as a context manager, the body is read with `iter_bytes`.
+
+        Parameters:
+            - url (str): Target URL.
+            - timeout (float): Request timeout, overrides the client default.
+        """
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        return self.get_client(url).stream("GET", url, **kwargs)
+
+    def get_async_client(self, url: str) -> httpx.AsyncClient:
+        """
+        Return the pooled async client for the host of the given URL.
+        Async clients are bound to the running event loop, so one pool is kept per loop.
+
+        Parameters:
+            - url (str): Target URL.
+        """
+        key = (id(asyncio.get_running_loop()), self._get_host(url))
+        client = self._async_clients.get(key)
+
+        if client is None:
+            client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=MAX_TIMEOUT,
+                follow_redirects=True,
+                verify=REQUEST_VERIFY,
+                http2=self.http2,
+                limits=self.limits
+            )
+            self._async_clients[key] = client
+            logging.info(f"Open pooled async client for host: {key[1]} (http2: {self.http2})")
+
+        return client
+
+    async def aclose(self) -> None:
+        """Close the async clients bound to the running event loop."""
+        loop_id = id(asyncio.get_running_loop())
+        keys = [key for key in self._async_clients if key[0] == loop_id]
+
+        for key in keys:
+            client = self._async_clients.pop(key)
+            try:
+                await client.aclose()
+            except Exception as e:
+                logging.error(f"Error closing pooled async client: {e}")
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        with self._lock:
+            self._closed = True
+            clients = list(self._clients.values())
+            self._clients.clear()
+
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logging.error(f"Error closing pooled client: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -24,10 +24,13 @@ from StreamingCommunity.Util.config_json import config_manager
 from StreamingCommunity.Util.os import internet_manager, os_manager
 from StreamingCommunity.TelegramHelp.telegram_bot import get_bot_instance
 from StreamingCommunity.Util.plex_naming import post_process_media_file
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Logic class
 from ...FFmpeg import print_duration_table
+from ..metrics import metrics_hub
+from ..telemetry import telemetry
 
 
 # Config
@@ -114,11 +117,14 @@ def MP4_downloader(url: str, path: str, referer: str = None, headers_: dict = No
 
     # Ensure the output directory exists
     os.makedirs(os.path.dirname(path), exist_ok=True)
+    metrics = metrics_hub.start_job(os.path.basename(path), kind="mp4")
 
     try:
-        with httpx.Client(verify=REQUEST_VERIFY) as client:
+        with profiler.phase('download'), httpx.Client(verify=REQUEST_VERIFY) as client:
+            request_start = time.monotonic()
             with client.stream("GET", url, headers=headers) as response:
                 response.raise_for_status()
+                metrics.record_request(time.monotonic() - request_start)
                 total = int(response.headers.get('content-length', 0))
                 
                 if total == 0:
@@ -153,6 +159,7 @@ def MP4_downloader(url: str, path: str, referer: str = None, headers_: dict = No
                                 size = file.write(chunk)
                                 downloaded += size
                                 bar.update(size)
+                                metrics.record_bytes(size)
 
                     except KeyboardInterrupt:
                         if not interrupt_handler.force_quit:
@@ -163,7 +170,8 @@ def MP4_downloader(url: str, path: str, referer: str = None, headers_: dict = No
 
         if os.path.exists(path):
             # Post-process file for Plex naming conventions
-            processed_path = post_process_media_file(path)
+            with telemetry.phase('post_process', kind='mp4'):
+                processed_path = post_process_media_file(path)
             # Update path if it was changed
             if processed_path != path:
                 path = processed_path
@@ -189,9 +197,12 @@ def MP4_downloader(url: str, path: str, referer: str = None, headers_: dict = No
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
         console.print(f"[bold red]Unexpected Error: {e}[/bold red]")
+        metrics.record_failure()
         if os.path.exists(temp_path):
             os.remove(temp_path)
         return None, interrupt_handler.kill_download
     
     finally:
         signal.signal(signal.SIGINT, original_handler)
+        metrics_hub.end_job(metrics)
+        telemetry.end_job(metrics, interrupted=interrupt_handler.kill_download)
@@ -21,6 +21,11 @@ from StreamingCommunity.Util.os import internet_manager
 from StreamingCommunity.Util.config_json import config_manager
 
 
+# Logic class
+from ..metrics import metrics_hub
+from ..telemetry import telemetry
+
+
 # Configuration
 HOST = config_manager.get('QBIT_CONFIG', 'host')
 PORT = config_manager.get('QBIT_CONFIG', 'port')
@@ -312,6 +317,9 @@ class TOR_downloader:
             self.console.print("[yellow]No active torrent to download[/yellow]")
             return False
         
+        metrics = metrics_hub.start_job(self.latest_torrent_hash, kind="tor")
+        completed = False
+
         try:
             # Ensure the torrent is started
             self.qb.torrents_resume(torrent_hashes=self.latest_torrent_hash)
@@ -361,6 +369,10 @@ class TOR_downloader:
                     downloaded_size = torrent_info.downloaded
                     eta = torrent_info.eta  # eta in seconds
 
+                    # qBittorrent reports a running total, the job gets what arrived since the last poll
+                    if downloaded_size > metrics.bytes:
+                        metrics.record_bytes(downloaded_size - metrics.bytes)
+
                     # Format sizes and speeds using the existing functions without modification
                     downloaded_size_str = internet_manager.format_file_size(downloaded_size)
                     total_size_str = internet_manager.format_file_size(total_size)
@@ -416,6 +428,7 @@ class TOR_downloader:
                     time.sleep(0.3)
                 
                 self.console.print(f"[bold green]Download complete: {self.torrent_name}[/bold green]")
+                completed = True
                 return True
                 
         except KeyboardInterrupt:
@@ -426,6 +439,12 @@ class TOR_downloader:
             logging.error(f"Error monitoring download: {str(e)}")
             self.console.print(f"[bold red]Error monitoring download: {str(e)}[/bold red]")
             return False
+
+        finally:
+            if not completed:
+                metrics.record_failure()
+            metrics_hub.end_job(metrics)
+            telemetry.end_job(metrics, torrent=self.torrent_name, completed=completed)
     
     def is_file_in_use(self, file_path):
         """
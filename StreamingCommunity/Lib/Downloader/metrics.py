@@ -0,0 +1,221 @@
+# 17.10.26
+
+import time
+import bisect
+import threading
+from typing import Dict, List
+
+
+# Variable
+WINDOW_SECONDS = 5
+MAX_ENDED_JOBS = 100        # Jobs over kept for the reports, the oldest are dropped
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)     # Upper bounds in seconds, plus +Inf
+
+
+class ThroughputWindow:
+    """
+    Bytes per second over the last complete seconds, kept in one bucket per second.
+    Adding bytes is O(1), reading the rate sums a fixed number of buckets, whatever the traffic.
+    """
+    def __init__(self, window: int = WINDOW_SECONDS):
+        """
+        Parameters:
+            - window (int): Number of complete seconds averaged.
+        """
+        self.window = window
+        self.buckets: List[List[int]] = [[-1, 0] for _ in range(window + 1)]     # [second, bytes]
+        self.started = int(time.monotonic())
+
+    def add(self, n_bytes: int, now: float) -> None:
+        second = int(now)
+        bucket = self.buckets[second % len(self.buckets)]
+        if bucket[0] != second:
+            bucket[0], bucket[1] = second, 0
+        bucket[1] += n_bytes
+
+    def rate(self, now: float) -> float:
+        second = int(now)
+        total = sum(n for sec, n in self.buckets if second - self.window <= sec < second)
+        return total / max(1, min(self.window, second - self.started))
+
+
+class LatencyHistogram:
+    """
+    Request latencies counted in the fixed buckets of LATENCY_BUCKETS, the last bucket is +Inf.
+    """
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, latency: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def cumulative(self) -> List[int]:
+        """Requests up to each bound, as Prometheus histograms expect."""
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class JobMetrics:
+    """
+    Counters of one download (a track), updated by the downloader and read by the progress bar and the exporters.
+    """
+    def __init__(self, hub: "MetricsHub", name: str, kind: str, job_id: int):
+        """
+        Parameters:
+            - hub (MetricsHub): Hub holding the job, every update also goes to its global counters.
+            - name (str): Job name shown in reports.
+            - kind (str): Downloader of the job: 'hls', 'mp4' or 'tor'.
+            - job_id (int): Number of the job in the process.
+        """
+        self.hub = hub
+        self.name = name
+        self.kind = kind
+        self.job_id = job_id
+        self.started = time.monotonic()
+        self.ended = None
+        self.bytes = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.latency_total = 0.0
+        self.latency = LatencyHistogram()
+        self.reorder_depth = 0
+        self.reorder_peak = 0
+        self.throughput = ThroughputWindow()
+
+    def record_bytes(self, n_bytes: int) -> None:
+        """Bytes received from the network, reported as they arrive."""
+        now = time.monotonic()
+        with self.hub.lock:
+            self.bytes += n_bytes
+            self.throughput.add(n_bytes, now)
+            self.hub.bytes += n_bytes
+            self.hub.throughput.add(n_bytes, now)
+
+    def record_request(self, latency: float) -> None:
+        """A completed request and its duration in seconds."""
+        with self.hub.lock:
+            self.requests += 1
+            self.latency_total += latency
+            self.latency.add(latency)
+            self.hub.requests += 1
+            self.hub.latency_total += latency
+            self.hub.latency.add(latency)
+
+    def record_retry(self) -> None:
+        with self.hub.lock:
+            self.retries += 1
+            self.hub.retries += 1
+
+    def record_failure(self) -> None:
+        """A segment given up after its last retry."""
+        with self.hub.lock:
+            self.failures += 1
+            self.hub.failures += 1
+
+    def record_reorder_depth(self, depth: int) -> None:
+        """Segments waiting in the reorder buffer for the writer."""
+        with self.hub.lock:
+            self.reorder_depth = depth
+            self.reorder_peak = max(self.reorder_peak, depth)
+
+    def get_speed(self) -> float:
+        """Current download speed in bytes per second."""
+        with self.hub.lock:
+            return self.throughput.rate(time.monotonic())
+
+    def snapshot(self) -> Dict:
+        """Return the counters of the job."""
+        with self.hub.lock:
+            elapsed = (self.ended or time.monotonic()) - self.started
+            return {
+                'id': self.job_id,
+                'name': self.name,
+                'kind': self.kind,
+                'bytes': self.bytes,
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures,
+                'avg_latency': self.latency_total / self.requests if self.requests else 0.0,
+                'latency_buckets': self.latency.cumulative(),
+                'reorder_depth': self.reorder_depth,
+                'reorder_peak': self.reorder_peak,
+                'speed': self.throughput.rate(time.monotonic()) if self.ended is None else 0.0,
+                'avg_speed': self.bytes / elapsed if elapsed > 0 else 0.0,
+                'elapsed': elapsed,
+                'active': self.ended is None
+            }
+
+
+class MetricsHub:
+    """
+    Process-wide metrics of the downloads: one job per track, and the totals of every job.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs: List[JobMetrics] = []
+        self.n_jobs = 0
+        self.bytes = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.latency_total = 0.0
+        self.latency = LatencyHistogram()
+        self.throughput = ThroughputWindow()
+
+    def start_job(self, name: str, kind: str = "hls") -> JobMetrics:
+        """
+        Register a new download.
+
+        Parameters:
+            - name (str): Job name shown in reports.
+            - kind (str): Downloader of the job: 'hls', 'mp4' or 'tor'.
+        """
+        with self.lock:
+            self.n_jobs += 1
+            job = JobMetrics(self, name, kind, self.n_jobs)
+            self.jobs.append(job)
+        return job
+
+    def end_job(self, job: JobMetrics) -> None:
+        """Mark a download as over, it stops counting in the active jobs."""
+        with self.lock:
+            job.ended = time.monotonic()
+
+            ended = [j for j in self.jobs if j.ended is not None]
+            for old_job in ended[:max(0, len(ended) - MAX_ENDED_JOBS)]:
+                self.jobs.remove(old_job)
+
+    def get_active_jobs(self) -> List[JobMetrics]:
+        with self.lock:
+            return [job for job in self.jobs if job.ended is None]
+
+    def get_speed(self) -> float:
+        """Current download speed of all the jobs, in bytes per second."""
+        with self.lock:
+            return self.throughput.rate(time.monotonic())
+
+    def snapshot(self) -> Dict:
+        """Return the totals and the counters of every job."""
+        with self.lock:
+            totals = {
+                'bytes': self.bytes,
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures,
+                'avg_latency': self.latency_total / self.requests if self.requests else 0.0,
+                'latency_total': self.latency_total,
+                'latency_buckets': self.latency.cumulative(),
+                'speed': self.throughput.rate(time.monotonic()),
+                'active_jobs': sum(1 for job in self.jobs if job.ended is None)
+            }
+            jobs = list(self.jobs)
+
+        totals['jobs'] = [job.snapshot() for job in jobs]
+        return totals
+
+
+metrics_hub = MetricsHub()
@@ -0,0 +1,181 @@
+# 17.10.26
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+# Internal utilities
+from StreamingCommunity.Util.config_json import config_manager
+from StreamingCommunity.Util.profiler import profiler
+
+
+# Logic class
+from .metrics import LATENCY_BUCKETS, JobMetrics, MetricsHub, metrics_hub
+
+
+# Config
+TELEMETRY_JSONL = config_manager.get('DEFAULT', 'telemetry_jsonl')
+TELEMETRY_PROMETHEUS = config_manager.get('DEFAULT', 'telemetry_prometheus')
+
+
+# Variable
+PREFIX = "streamingcommunity"
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Telemetry:
+    """
+    Machine-readable export of the downloads, for unattended runs:
+        - a JSON-lines event log, one line per finished job or phase, appended across runs.
+        - a Prometheus textfile (node_exporter textfile collector) rewritten after every event.
+    Both outputs are off while their path is empty.
+    """
+    def __init__(self, jsonl_path: str = None, prometheus_path: str = None, hub: MetricsHub = None):
+        """
+        Parameters:
+            - jsonl_path (str): File the events are appended to.
+            - prometheus_path (str): Textfile rewritten with the current metrics.
+            - hub (MetricsHub): Hub the job counters are read from.
+        """
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.hub = hub or metrics_hub
+        self.lock = threading.Lock()
+        self.phases: Dict[str, List[float]] = {}        # name -> [count, total seconds, last seconds]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.jsonl_path or self.prometheus_path)
+
+    def emit(self, event: str, **fields) -> None:
+        """
+        Append one event to the JSON-lines log.
+
+        Parameters:
+            - event (str): Event name, e.g. 'job_end' or 'phase'.
+            - fields: Values of the event, must be JSON serializable.
+        """
+        if not self.jsonl_path:
+            return
+
+        line = json.dumps(dict({'ts': round(time.time(), 3), 'event': event}, **fields), default=str)
+        try:
+            with self.lock, open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+        except Exception as e:
+            logging.error(f"Can't write telemetry event to {self.jsonl_path}: {e}")
+
+    def end_job(self, job: JobMetrics, **fields) -> None:
+        """
+        Export a finished job, `MetricsHub.end_job` must be called first.
+
+        Parameters:
+            - job (JobMetrics): The job.
+            - fields: Downloader specific values added to the event.
+        """
+        if not self.enabled or job is None:
+            return
+
+        self.emit('job_end', **dict(job.snapshot(), **fields))
+        self.write_prometheus()
+
+    @contextmanager
+    def phase(self, name: str, **fields):
+        """
+        Time a phase of a job (merge, post-processing, ...) and export its duration, the phase runs even if telemetry is off.
+        The phase is also reported by the profiler in --profile mode.
+
+        Parameters:
+            - name (str): Phase name.
+            - fields: Values added to the event, e.g. the output file.
+        """
+        start = time.monotonic()
+        ok = False
+        try:
+            with profiler.phase(name):
+                yield
+            ok = True
+
+        finally:
+            duration = time.monotonic() - start
+            with self.lock:
+                stats = self.phases.setdefault(name, [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += duration
+                stats[2] = duration
+
+            if self.enabled:
+                self.emit('phase', phase=name, duration=round(duration, 3), ok=ok, **fields)
+                self.write_prometheus()
+
+    def render_prometheus(self) -> str:
+        """Return the current metrics in the Prometheus text format."""
+        snapshot = self.hub.snapshot()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_str = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+                lines.append(f"{PREFIX}_{name}{{{label_str}}} {value}" if label_str else f"{PREFIX}_{name} {value}")
+
+        metric("bytes_total", "counter", "Bytes downloaded.", [({}, snapshot['bytes'])])
+        metric("requests_total", "counter", "Segment requests completed.", [({}, snapshot['requests'])])
+        metric("retries_total", "counter", "Failed attempts retried.", [({}, snapshot['retries'])])
+        metric("failures_total", "counter", "Segments given up after the last retry.", [({}, snapshot['failures'])])
+        metric("active_jobs", "gauge", "Downloads running.", [({}, snapshot['active_jobs'])])
+        metric("speed_bytes", "gauge", "Current download speed in bytes per second.", [({}, round(snapshot['speed'], 1))])
+
+        # Segment latency histogram
+        lines.append(f"# HELP {PREFIX}_segment_latency_seconds Duration of the segment requests.")
+        lines.append(f"# TYPE {PREFIX}_segment_latency_seconds histogram")
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+        for bound, count in zip(bounds, snapshot['latency_buckets']):
+            lines.append(f'{PREFIX}_segment_latency_seconds_bucket{{le="{bound}"}} {count}')
+        lines.append(f"{PREFIX}_segment_latency_seconds_sum {round(snapshot['latency_total'], 3)}")
+        lines.append(f"{PREFIX}_segment_latency_seconds_count {snapshot['requests']}")
+
+        # Per job
+        jobs = [({'id': job['id'], 'job': job['name'], 'kind': job['kind']}, job) for job in snapshot['jobs']]
+        metric("job_bytes", "gauge", "Bytes downloaded by the job.", [(labels, job['bytes']) for labels, job in jobs])
+        metric("job_avg_speed_bytes", "gauge", "Average speed of the job in bytes per second.", [(labels, round(job['avg_speed'], 1)) for labels, job in jobs])
+        metric("job_retries", "gauge", "Failed attempts retried by the job.", [(labels, job['retries']) for labels, job in jobs])
+        metric("job_failures", "gauge", "Segments the job gave up.", [(labels, job['failures']) for labels, job in jobs])
+        metric("job_reorder_depth_peak", "gauge", "Most segments waiting in the reorder buffer.", [(labels, job['reorder_peak']) for labels, job in jobs])
+        metric("job_elapsed_seconds", "gauge", "Duration of the job.", [(labels, round(job['elapsed'], 3)) for labels, job in jobs])
+
+        # Phases
+        with self.lock:
+            phases = {name: list(stats) for name, stats in self.phases.items()}
+        metric("phase_runs_total", "counter", "Phases run.", [({'phase': name}, stats[0]) for name, stats in phases.items()])
+        metric("phase_duration_seconds_total", "counter", "Time spent in each phase.", [({'phase': name}, round(stats[1], 3)) for name, stats in phases.items()])
+        metric("phase_last_duration_seconds", "gauge", "Duration of the last run of each phase.", [({'phase': name}, round(stats[2], 3)) for name, stats in phases.items()])
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self) -> None:
+        """Rewrite the textfile atomically, so the collector never reads half a file."""
+        if not self.prometheus_path:
+            return
+
+        try:
+            tmp_path = f"{self.prometheus_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render_prometheus())
+            os.replace(tmp_path, self.prometheus_path)
+
+        except Exception as e:
+            logging.error(f"Can't write Prometheus textfile {self.prometheus_path}: {e}")
+
+
+telemetry = Telemetry(TELEMETRY_JSONL, TELEMETRY_PROMETHEUS)
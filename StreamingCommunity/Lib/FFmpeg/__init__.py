@@ -1,4 +1,5 @@
 # 18.04.24
 
-from .command import join_video, join_audios, join_subtitle
-from .util import print_duration_table, get_video_duration
\ No newline at end of file
+from .command import join_video, join_audios, join_subtitle, join_all
+from .util import print_duration_table, get_video_duration, get_media_info, has_audio_stream
+from .stream_mux import StreamMuxer
\ No newline at end of file
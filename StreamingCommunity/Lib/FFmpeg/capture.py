@@ -1,9 +1,11 @@
 # 16.04.24
 
-import re
+import time
 import logging
 import threading
 import subprocess
+from collections import deque
+from typing import Optional
 
 
 # External library
@@ -17,97 +19,140 @@ from StreamingCommunity.Util.os import internet_manager
 # Variable
 console = Console()
 terminate_flag = threading.Event()
+PROGRESS_REFRESH = 0.5          # Seconds between two updates of the progress line
+STDERR_TAIL_LINES = 30
 
 
-def capture_output(process: subprocess.Popen, description: str) -> None:
+class FFmpegProgress:
     """
-    Function to capture and print output from a subprocess.
+    State of a running FFmpeg command, read from the key=value blocks of `-progress pipe:1`.
+    """
+    def __init__(self, duration: float = None):
+        """
+        Parameters:
+            - duration (float): Duration of the input in seconds, enables percentage and ETA.
+        """
+        self.duration = duration
+        self.out_time: float = 0.0          # Seconds of output written
+        self.speed: Optional[float] = None  # Multiple of real time
+        self.total_size: int = 0            # Bytes of output written
+        self.fps: float = 0.0
+        self.is_end = False
+
+    def update(self, key: str, value: str) -> bool:
+        """
+        Apply one key=value line.
+
+        Returns:
+            bool: True when the line closes a block ('progress=continue' or 'progress=end').
+        """
+        try:
+            if key == "out_time_us":
+                self.out_time = int(value) / 1_000_000
+            elif key == "total_size":
+                self.total_size = int(value)
+            elif key == "fps":
+                self.fps = float(value)
+            elif key == "speed":
+                self.speed = float(value.rstrip("x"))
+            elif key == "progress":
+                self.is_end = value == "end"
+                return True
+
+        # N/A until FFmpeg knows the value
+        except ValueError:
+            pass
+
+        return False
+
+    def get_percentage(self) -> Optional[float]:
+        if not self.duration:
+            return None
+        return min(100.0, self.out_time / self.duration * 100)
+
+    def get_eta(self) -> Optional[float]:
+        """Seconds left at the current speed, None if unknown."""
+        if not self.duration or not self.speed:
+            return None
+        return max(0.0, (self.duration - self.out_time) / self.speed)
+
+
+def format_progress(progress: FFmpegProgress, description: str) -> str:
+    """Build the progress line shown while FFmpeg runs."""
+    progress_string = (f" {description}[white]: "
+                       f"([green]'speed': [yellow]{f'{progress.speed:.1f}x' if progress.speed else 'N/A'}[white], "
+                       f"[green]'size': [yellow]{internet_manager.format_file_size(progress.total_size)}[white]")
+
+    percentage = progress.get_percentage()
+    if percentage is not None:
+        progress_string += f", [green]'done': [yellow]{percentage:.0f}%[white]"
+
+    eta = progress.get_eta()
+    if eta is not None and not progress.is_end:
+        progress_string += f", [green]'eta': [yellow]{int(eta // 60)}m {int(eta % 60)}s[white]"
+
+    return progress_string + ")"
+
+
+def capture_output(process: subprocess.Popen, description: str, progress: FFmpegProgress) -> None:
+    """
+    Function to read the progress of a subprocess and print it at a fixed rate.
 
     Parameters:
-        - process (subprocess.Popen): The subprocess whose output is captured.
+        - process (subprocess.Popen): The subprocess started with '-progress pipe:1'.
         - description (str): Description of the command being executed.
+        - progress (FFmpegProgress): Progress state to update.
     """
+    stop = False
+
     try:
         max_length = 0
+        last_print = 0.0
 
         for line in iter(process.stdout.readline, ''):
-            try:
-                line = line.strip()
-                if not line:
-                    continue
-
-                logging.info(f"CAPTURE ffmpeg line: {line}")
-
-                # Check if termination is requested
-                if terminate_flag.is_set():
-                    break
-
-                if "size=" in line:
-                    try:
 
-                        # Parse the output line to extract relevant information
-                        data = parse_output_line(line)
+            # Check if termination is requested
+            if terminate_flag.is_set():
+                stop = True
+                break
 
-                        if 'q' in data:
-                            is_end = (float(data.get('q', -1.0)) == -1.0)
-                            size_key = 'Lsize' if is_end else 'size'
-                            byte_size = int(re.findall(r'\d+', data.get(size_key, '0'))[0]) * 1000
-                        else:
-                            byte_size = int(re.findall(r'\d+', data.get('size', '0'))[0]) * 1000
+            key, _, value = line.strip().partition('=')
+            if not progress.update(key, value):
+                continue
 
+            now = time.monotonic()
+            if now - last_print < PROGRESS_REFRESH and not progress.is_end:
+                continue
+            last_print = now
 
-                        # Construct the progress string with formatted output information
-                        progress_string = (f" {description}[white]: "
-                                           f"([green]'speed': [yellow]{data.get('speed', 'N/A')}[white], "
-                                           f"[green]'size': [yellow]{internet_manager.format_file_size(byte_size)}[white])")
-                        max_length = max(max_length, len(progress_string))
-
-                        # Print the progress string to the console, overwriting the previous line
-                        console.print(progress_string.ljust(max_length), end="\r")
-
-                    except Exception as e:
-                        logging.error(f"Error parsing output line: {line} - {e}")
-
-            except Exception as e:
-                logging.error(f"Error processing line from subprocess: {e}")
+            # Print the progress string to the console, overwriting the previous line
+            progress_string = format_progress(progress, description)
+            max_length = max(max_length, len(progress_string))
+            console.print(progress_string.ljust(max_length), end="\r")
 
     except Exception as e:
         logging.error(f"Error in capture_output: {e}")
+        stop = True
 
     finally:
+
+        # FFmpeg closes stdout before exiting, at EOF it is still finishing the output file
         try:
-            terminate_process(process)
+            if stop or terminate_flag.is_set():
+                terminate_process(process)
+            else:
+                process.wait()
         except Exception as e:
             logging.error(f"Error terminating process: {e}")
 
 
-def parse_output_line(line: str) -> dict:
-    """
-    Function to parse the output line and extract relevant information.
-
-    Parameters:
-        - line (str): The output line to parse.
-
-    Returns:
-        dict: A dictionary containing parsed information.
-    """
+def drain_stderr(process: subprocess.Popen, tail: deque) -> None:
+    """Read the log of FFmpeg so the pipe never fills up, only the last lines are kept."""
     try:
-        data = {}
-        parts = line.replace("  ", "").replace("= ", "=").split()
-
-        for part in parts:
-            key_value = part.split('=')
-
-            if len(key_value) == 2:
-                key = key_value[0]
-                value = key_value[1]
-                data[key] = value
-
-        return data
-    
+        for line in iter(process.stderr.readline, ''):
+            tail.append(line.rstrip())
     except Exception as e:
-        logging.error(f"Error parsing line: {line} - {e}")
-        return {}
+        logging.error(f"Error reading FFmpeg log: {e}")
 
 
 def terminate_process(process):
@@ -124,27 +169,38 @@ def terminate_process(process):
         logging.error(f"Failed to terminate process: {e}")
 
 
-def capture_ffmpeg_real_time(ffmpeg_command: list, description: str) -> None:
+def capture_ffmpeg_real_time(ffmpeg_command: list, description: str, duration: float = None) -> Optional[int]:
     """
-    Function to capture real-time output from ffmpeg process.
+    Function to run ffmpeg and show its progress, read from the machine-readable '-progress pipe:1' stream.
 
     Parameters:
         - ffmpeg_command (list): The command to execute ffmpeg.
         - description (str): Description of the command being executed.
+        - duration (float): Duration of the input in seconds, to show percentage and ETA.
+
+    Returns:
+        int: The return code of ffmpeg, None if it could not be started.
     """
     global terminate_flag
 
     # Clear the terminate_flag before starting a new capture
     terminate_flag.clear()
 
+    # Global options, right after the binary
+    ffmpeg_command = ffmpeg_command[:1] + ['-progress', 'pipe:1', '-nostats'] + ffmpeg_command[1:]
+    progress = FFmpegProgress(duration)
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+
     try:
 
         # Start the ffmpeg process with subprocess.Popen
-        process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
 
-        # Start a thread to capture and print output
-        output_thread = threading.Thread(target=capture_output, args=(process, description))
+        # Start the threads reading progress and log
+        output_thread = threading.Thread(target=capture_output, args=(process, description, progress))
+        stderr_thread = threading.Thread(target=drain_stderr, args=(process, stderr_tail), daemon=True)
         output_thread.start()
+        stderr_thread.start()
 
         try:
             # Wait for ffmpeg process to complete
@@ -152,13 +208,21 @@ def capture_ffmpeg_real_time(ffmpeg_command: list, description: str) -> None:
 
         except KeyboardInterrupt:
             logging.error("Terminating ffmpeg process...")
+            terminate_flag.set()
+            terminate_process(process)
 
         except Exception as e:
             logging.error(f"Error in ffmpeg process: {e}")
-            
+
         finally:
             terminate_flag.set()
             output_thread.join()
+            stderr_thread.join(timeout=5)
+
+        if process.returncode != 0:
+            logging.error(f"FFmpeg exited with code {process.returncode}: " + "\n".join(stderr_tail))
+        return process.returncode
 
     except Exception as e:
-        logging.error(f"Failed to start ffmpeg process: {e}")
\ No newline at end of file
+        logging.error(f"Failed to start ffmpeg process: {e}")
+        return None
@@ -14,10 +14,11 @@ from rich.console import Console
 # Internal utilities
 from StreamingCommunity.Util.config_json import config_manager, get_use_large_bar
 from StreamingCommunity.Util.os import os_manager, suppress_output, get_ffmpeg_path
+from StreamingCommunity.Util.ffmpeg_capabilities import capability_store
 
 
 # Logic class
-from .util import need_to_force_to_ts, check_duration_v_a
+from .util import need_to_force_to_ts, check_duration_v_a, get_video_duration
 from .capture import capture_ffmpeg_real_time
 from ..M3U8 import M3U8_Codec
 
@@ -39,31 +40,19 @@ console = Console()
 
 def check_subtitle_encoders() -> Tuple[Optional[bool], Optional[bool]]:
     """
-    Executes 'ffmpeg -encoders' and checks if 'mov_text' and 'webvtt' encoders are available.
+    Checks if the 'mov_text' and 'webvtt' encoders are available, from the capabilities of the FFmpeg binary
+    (detected once with 'ffmpeg -encoders' and then kept next to the config).
     
     Returns:
         Tuple[Optional[bool], Optional[bool]]: A tuple containing (mov_text_supported, webvtt_supported)
-            Returns (None, None) if the FFmpeg command fails
+            Returns (None, None) if the capabilities can't be detected
     """
-    try:
-        result = subprocess.run(
-            [get_ffmpeg_path(), '-encoders'],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        
-        # Check for encoder presence in output
-        output = result.stdout
-        mov_text_supported = "mov_text" in output
-        webvtt_supported = "webvtt" in output
-        
-        return mov_text_supported, webvtt_supported
-        
-    except subprocess.CalledProcessError as e:
-        print(f"Error executing 'ffmpeg -encoders': {e}")
+    capabilities = capability_store.get(get_ffmpeg_path())
+    if capabilities is None:
         return None, None
 
+    return capabilities.has_encoder("mov_text"), capabilities.has_encoder("webvtt")
+
 
 def select_subtitle_encoder() -> Optional[str]:
     """
@@ -159,13 +148,13 @@ def join_video(video_path: str, out_path: str, codec: M3U8_Codec = None):
     else:
 
         if get_use_large_bar():
-            capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join video")
+            capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join video", get_video_duration(video_path))
             print()
 
         else:
             console.log(f"[purple]FFmpeg [white][[cyan]Join video[white]] ...")
             with suppress_output():
-                capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join video")
+                capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join video", get_video_duration(video_path))
                 print()
 
     return out_path
@@ -260,12 +249,12 @@ def join_audios(video_path: str, audio_tracks: List[Dict[str, str]], out_path: s
                 raise RuntimeError(f"FFmpeg error: {result.stderr}")
         else:
             if get_use_large_bar():
-                capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join audio")
+                capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join audio", get_video_duration(video_path))
                 print()
             else:
                 console.log(f"[purple]FFmpeg [white][[cyan]Join audio[white]] ...")
                 with suppress_output():
-                    capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join audio")
+                    capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join audio", get_video_duration(video_path))
                     print()
         
         # Verifica che il file di output sia stato creato
@@ -330,12 +319,12 @@ def join_subtitle(video_path: str, subtitles_list: List[Dict[str, str]], out_pat
                 raise RuntimeError(f"FFmpeg error: {result.stderr}")
         else:
             if get_use_large_bar():
-                capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join subtitle")
+                capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join subtitle", get_video_duration(video_path))
                 print()
             else:
                 console.log(f"[purple]FFmpeg [white][[cyan]Join subtitle[white]] ...")
                 with suppress_output():
-                    capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join subtitle")
+                    capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join subtitle", get_video_duration(video_path))
                     print()
         
         # Verifica che il file di output sia stato creato
@@ -349,4 +338,152 @@ def join_subtitle(video_path: str, subtitles_list: List[Dict[str, str]], out_pat
     except Exception as e:
         logging.error(f"Errore durante join_subtitle: {str(e)}")
         # Ritorna comunque il path anche in caso di errore, verrà gestito dal chiamante
-        return out_path
\ No newline at end of file
+        return out_path
+
+def join_all(video_path: str, audio_tracks: List[Dict[str, str]], subtitles_list: List[Dict[str, str]], out_path: str, codec: M3U8_Codec = None):
+    """
+    Joins video, audio tracks and subtitles in a single FFmpeg pass: every input is read once and the output written once,
+    without the intermediate file of 'join_audios' + 'join_subtitle'.
+    
+    Parameters:
+        - video_path (str): The path to the video file.
+        - audio_tracks (list[dict[str, str]]): Audio tracks, each dictionary with the 'path' and 'name' keys.
+        - subtitles_list (list[dict[str, str]]): Subtitles, each dictionary with the 'path' and 'language' keys.
+        - out_path (str): The path to save the output file.
+        - codec (M3U8_Codec): The codec used if 'use_codec' is enabled.
+
+    Returns:
+        str: The path of the output file, an exception is raised if it has not been created.
+    """
+    for track in audio_tracks + subtitles_list:
+        if not os_manager.check_file(track.get('path')):
+            raise FileNotFoundError(f"Input file doesn't exist: {track.get('path')}")
+
+    subtitle_encoder = None
+    if subtitles_list:
+        subtitle_encoder = select_subtitle_encoder()
+        if subtitle_encoder is None:
+            raise RuntimeError("No supported subtitle encoder found")
+
+    # Start command with locate ffmpeg
+    ffmpeg_cmd = [get_ffmpeg_path()]
+
+    # Enabled the use of gpu
+    if USE_GPU:
+        ffmpeg_cmd.extend(['-hwaccel', 'cuda'])
+
+    # Insert every input: video, audios, subtitles
+    ffmpeg_cmd.extend(['-i', video_path])
+    for track in audio_tracks + subtitles_list:
+        ffmpeg_cmd.extend(['-i', track['path']])
+
+    # Map the video, the audio tracks (or the audio of the video file if any) and the subtitles
+    ffmpeg_cmd.extend(['-map', '0:v'])
+
+    if audio_tracks:
+        for i in range(1, len(audio_tracks) + 1):
+            ffmpeg_cmd.extend(['-map', f'{i}:a'])
+    else:
+        ffmpeg_cmd.extend(['-map', '0:a?'])
+
+    first_sub_input = len(audio_tracks) + 1
+    for idx, subtitle in enumerate(subtitles_list):
+        ffmpeg_cmd.extend(['-map', f'{first_sub_input + idx}:s'])
+
+    # Add stream metadata
+    for idx, audio_track in enumerate(audio_tracks):
+        ffmpeg_cmd.extend([f'-metadata:s:a:{idx}', f"title={audio_track['name']}"])
+    for idx, subtitle in enumerate(subtitles_list):
+        ffmpeg_cmd.extend([f'-metadata:s:s:{idx}', f"title={subtitle['language']}"])
+
+    # Add output Parameters: video and audio as 'join_audios' with audio tracks, copied as 'join_subtitle' without
+    encode_video = False
+    if audio_tracks and USE_CODEC and codec is not None:
+        if USE_VCODEC:
+            if codec.video_codec_name: 
+                if not USE_GPU: 
+                    ffmpeg_cmd.extend(['-c:v', codec.video_codec_name])
+                else: 
+                    ffmpeg_cmd.extend(['-c:v', 'h264_nvenc'])
+                encode_video = True
+            else: 
+                console.log("[red]Cant find vcodec for 'join_all'")
+        else:
+            if USE_GPU:
+                ffmpeg_cmd.extend(['-c:v', 'h264_nvenc'])
+                encode_video = True
+
+        if USE_ACODEC:
+            if codec.audio_codec_name: 
+                ffmpeg_cmd.extend(['-c:a', codec.audio_codec_name])
+            else: 
+                console.log("[red]Cant find acodec for 'join_all'")
+
+        if USE_BITRATE:
+            ffmpeg_cmd.extend(['-b:v',  f'{codec.video_bitrate // 1000}k'])
+            ffmpeg_cmd.extend(['-b:a',  f'{codec.audio_bitrate // 1000}k'])
+
+    elif USE_CODEC:
+        ffmpeg_cmd.extend(['-c:v', 'copy', '-c:a', 'copy'])
+    else:
+        ffmpeg_cmd.extend(['-c', 'copy'])
+
+    if subtitle_encoder:
+        ffmpeg_cmd.extend(['-c:s', subtitle_encoder])
+
+    # Ultrafast preset or fast for gpu, only read by the video encoder
+    if encode_video:
+        if not USE_GPU:
+            ffmpeg_cmd.extend(['-preset', FFMPEG_DEFAULT_PRESET])
+        else:
+            ffmpeg_cmd.extend(['-preset', 'fast'])
+
+    # Use shortest input path for video and audios. With subtitles mapped '-shortest' would also stop at the
+    # last subtitle, so the output is cut at the shortest video or audio track instead
+    if audio_tracks:
+        video_audio_same_duration, duration_diff = check_duration_v_a(video_path, audio_tracks[0].get('path'))
+        if not video_audio_same_duration:
+            console.log(f"[red]Use shortest input (Duration difference: {duration_diff:.2f} seconds)...")
+
+            if subtitles_list:
+                durations = [get_video_duration(path) for path in [video_path] + [track['path'] for track in audio_tracks]]
+                durations = [duration for duration in durations if duration]
+                if durations:
+                    ffmpeg_cmd.extend(['-t', f'{min(durations):.3f}'])
+                ffmpeg_cmd.extend(['-strict', 'experimental'])
+            else:
+                ffmpeg_cmd.extend(['-shortest', '-strict', 'experimental'])
+
+    # Overwrite
+    ffmpeg_cmd += [out_path, "-y"]
+
+    # Run join
+    logging.info(f"Esecuzione FFmpeg per join_all: {' '.join(ffmpeg_cmd)}")
+
+    if DEBUG_MODE:
+        result = subprocess.run(ffmpeg_cmd, check=False, capture_output=True, text=True)
+        if result.returncode != 0:
+            logging.error(f"Errore FFmpeg (join_all): {result.stderr}")
+            raise RuntimeError(f"FFmpeg error: {result.stderr}")
+    else:
+        if get_use_large_bar():
+            return_code = capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join all", get_video_duration(video_path))
+            print()
+        else:
+            console.log(f"[purple]FFmpeg [white][[cyan]Join all[white]] ...")
+            with suppress_output():
+                return_code = capture_ffmpeg_real_time(ffmpeg_cmd, "[cyan]Join all", get_video_duration(video_path))
+                print()
+
+        # A partial output must not hide the failure, the caller falls back to the two-pass merge
+        if return_code != 0:
+            logging.error(f"Errore FFmpeg (join_all): return code {return_code}")
+            raise RuntimeError(f"FFmpeg error: return code {return_code}")
+
+    # Verifica che il file di output sia stato creato
+    if not os.path.exists(out_path) or os.path.getsize(out_path) == 0:
+        logging.error(f"FFmpeg non ha generato il file di output: {out_path}")
+        raise FileNotFoundError(f"Il file di output non esiste o è vuoto: {out_path}")
+
+    logging.info(f"Join all completato con successo: {out_path}")
+    return out_path
@@ -0,0 +1,150 @@
+# 17.10.26
+
+import os
+import time
+import errno
+import shutil
+import logging
+import subprocess
+from typing import BinaryIO, List, Optional
+
+
+# Internal utilities
+from StreamingCommunity.Util.config_json import config_manager
+from StreamingCommunity.Util.os import get_ffmpeg_path
+
+
+# Logic class
+from .capture import terminate_process
+
+
+# Config
+DEBUG_MODE = config_manager.get_bool("DEFAULT", "debug")
+
+
+# Variable
+OPEN_POLL_INTERVAL = 0.2
+
+
+class StreamMuxer:
+    """
+    Remuxes the tracks of a download while their segments arrive.
+
+    FFmpeg reads every track from a named pipe (video first, then the audio tracks) and writes the
+    final MP4 with `-c copy`: the track data never lands on disk as a full-size file.
+    """
+    def __init__(self, fifo_dir: str, out_path: str, n_audio: int = 0):
+        """
+        Parameters:
+            - fifo_dir (str): Folder of the named pipes and of the FFmpeg log.
+            - out_path (str): Path of the MP4 to write.
+            - n_audio (int): Number of audio tracks muxed with the video.
+        """
+        self.fifo_dir = fifo_dir
+        self.out_path = out_path
+        self.inputs = [os.path.join(fifo_dir, f"{i}.ts") for i in range(1 + n_audio)]
+        self.opened = [False] * len(self.inputs)
+        self.log_path = os.path.join(fifo_dir, "ffmpeg.log")
+        self.process: subprocess.Popen = None
+
+    @staticmethod
+    def is_supported() -> bool:
+        """Named pipes are only available on POSIX systems."""
+        return hasattr(os, "mkfifo")
+
+    def _build_command(self) -> List[str]:
+        ffmpeg_cmd = [get_ffmpeg_path(), "-hide_banner", "-loglevel", "debug" if DEBUG_MODE else "error"]
+
+        # Format probed from the data: MPEG-TS or fragmented MP4 (init section first)
+        for path in self.inputs:
+            ffmpeg_cmd.extend(["-i", path])
+
+        # Only the video stream of the first input when audio tracks are added
+        if len(self.inputs) > 1:
+            ffmpeg_cmd.extend(["-map", "0:v"])
+            for i in range(1, len(self.inputs)):
+                ffmpeg_cmd.extend(["-map", f"{i}:a"])
+
+        ffmpeg_cmd.extend(["-c", "copy", self.out_path, "-y"])
+        return ffmpeg_cmd
+
+    def start(self) -> None:
+        """Create the named pipes and start FFmpeg, it waits for the first segments of every track."""
+        shutil.rmtree(self.fifo_dir, ignore_errors=True)
+        os.makedirs(self.fifo_dir, exist_ok=True)
+        for path in self.inputs:
+            os.mkfifo(path)
+
+        ffmpeg_cmd = self._build_command()
+        logging.info(f"Start stream mux: {' '.join(ffmpeg_cmd)}")
+
+        with open(self.log_path, "wb") as log_file:
+            self.process = subprocess.Popen(
+                ffmpeg_cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=log_file,
+                stderr=log_file,
+                start_new_session=True      # Ctrl+C is handled by the download, FFmpeg must not quit on it
+            )
+
+    def open_input(self, index: int) -> Optional[BinaryIO]:
+        """
+        Open the pipe of a track for writing, once FFmpeg opens it for reading.
+
+        Parameters:
+            - index (int): 0 for the video, 1.. for the audio tracks.
+
+        Returns:
+            BinaryIO: Blocking binary file, None if FFmpeg exited before reading the track.
+        """
+        while self.process is not None and self.process.poll() is None:
+            try:
+                fd = os.open(self.inputs[index], os.O_WRONLY | os.O_NONBLOCK)
+
+            except OSError as e:
+                # No reader yet: FFmpeg is still probing the tracks before this one
+                if e.errno != errno.ENXIO:
+                    raise
+                time.sleep(OPEN_POLL_INTERVAL)
+                continue
+
+            os.set_blocking(fd, True)
+            self.opened[index] = True
+            return os.fdopen(fd, "wb")
+
+        logging.error(f"FFmpeg exited before reading track {index}, see {self.log_path}")
+        return None
+
+    def abort(self) -> None:
+        """Stop FFmpeg, the output is incomplete."""
+        if self.process is not None:
+            terminate_process(self.process)
+            self.process.wait()
+
+    def finish(self) -> bool:
+        """
+        Wait for FFmpeg to write the end of the MP4, once every track pipe has been closed by its writer.
+
+        Returns:
+            bool: True if the MP4 has been written.
+        """
+        if self.process is None:
+            return False
+
+        # A track never fed keeps FFmpeg waiting on its pipe forever
+        if not all(self.opened):
+            logging.error("Stream mux aborted: some tracks were never written")
+            self.abort()
+            return False
+
+        return_code = self.process.wait()
+        if return_code != 0:
+            with open(self.log_path, "r", errors="replace") as log_file:
+                logging.error(f"Stream mux failed ({return_code}): {log_file.read()[-2000:]}")
+            return False
+
+        return os.path.exists(self.out_path) and os.path.getsize(self.out_path) > 0
+
+    def cleanup(self) -> None:
+        """Remove the named pipes."""
+        shutil.rmtree(self.fifo_dir, ignore_errors=True)
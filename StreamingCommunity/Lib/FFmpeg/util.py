@@ -1,11 +1,12 @@
 # 16.04.24
 
 import os
-import sys
 import json
+import threading
 import subprocess
 import logging
-from typing import Tuple
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 
 
 # External library
@@ -14,10 +15,80 @@ from rich.console import Console
 
 # Internal utilities
 from StreamingCommunity.Util.os import get_ffprobe_path
+from StreamingCommunity.Util.profiler import profiler
 
 
 # Variable
 console = Console()
+MEDIA_INFO_CACHE_SIZE = 128
+_media_info_cache: "OrderedDict[Tuple[str, int, int], Dict]" = OrderedDict()
+_media_info_lock = threading.Lock()
+
+
+def get_media_info(file_path: str) -> Optional[Dict]:
+    """
+    Get the format and streams of a media file, probed once with `ffprobe -show_format -show_streams`.
+    The result is cached by path, size and modification time, so the probe runs again only if the file changes.
+
+    Parameters:
+        - file_path (str): Path to the media file.
+
+    Returns:
+        dict: The ffprobe output with the 'format' and 'streams' keys, None if the file can't be probed.
+    """
+    try:
+        file_stat = os.stat(file_path)
+    except OSError as e:
+        logging.error(f"Cannot access file {file_path}: {e}")
+        return None
+
+    cache_key = (os.path.abspath(file_path), file_stat.st_size, file_stat.st_mtime_ns)
+    with _media_info_lock:
+        if cache_key in _media_info_cache:
+            _media_info_cache.move_to_end(cache_key)
+            return _media_info_cache[cache_key]
+
+    # Get ffprobe path and verify it exists
+    ffprobe_path = get_ffprobe_path()
+    if not ffprobe_path or not os.path.exists(ffprobe_path):
+        logging.error(f"FFprobe not found at path: {ffprobe_path}")
+        return None
+
+    if not os.access(file_path, os.R_OK):
+        logging.error(f"No read permission for file: {file_path}")
+        return None
+
+    try:
+        cmd = [ffprobe_path, '-v', 'error', '-show_format', '-show_streams', '-print_format', 'json', file_path]
+        logging.info(f"Running FFprobe command: {' '.join(cmd)}")
+        
+        with profiler.phase('probe'):
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                check=False  # Don't raise exception on non-zero exit
+            )
+
+        if result.returncode != 0:
+            logging.error(f"FFprobe failed with return code {result.returncode}")
+            logging.error(f"FFprobe stderr: {result.stderr}")
+            return None
+
+        info = json.loads(result.stdout)
+        info.setdefault('format', {})
+        info.setdefault('streams', [])
+
+    except Exception as e:
+        logging.error(f"FFprobe execution failed: {e}")
+        return None
+
+    with _media_info_lock:
+        _media_info_cache[cache_key] = info
+        while len(_media_info_cache) > MEDIA_INFO_CACHE_SIZE:
+            _media_info_cache.popitem(last=False)
+
+    return info
 
 
 def has_audio_stream(video_path: str) -> bool:
@@ -30,22 +101,12 @@ def has_audio_stream(video_path: str) -> bool:
     Returns:
         has_audio (bool): True if the input video has an audio stream, False otherwise.
     """
-    try:
-        ffprobe_cmd = [get_ffprobe_path(), '-v', 'error', '-print_format', 'json', '-select_streams', 'a', '-show_streams', video_path]
-        logging.info(f"FFmpeg command: {ffprobe_cmd}")
-
-        with subprocess.Popen(ffprobe_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as proc:
-            stdout, stderr = proc.communicate()
-            if stderr:
-                logging.error(f"Error: {stderr}")
-            else:
-                probe_result = json.loads(stdout)
-                return bool(probe_result.get('streams', []))
-            
-    except Exception as e:
-        logging.error(f"Error: {e}")
+    info = get_media_info(video_path)
+    if info is None:
         return False
 
+    return any(stream.get('codec_type') == 'audio' for stream in info['streams'])
+
 
 def get_video_duration(file_path: str) -> float:
     """
@@ -57,31 +118,16 @@ def get_video_duration(file_path: str) -> float:
     Returns:
         (float): The duration of the video in seconds if successful, None if there's an error.
     """
-    try:
-        ffprobe_cmd = [get_ffprobe_path(), '-v', 'error', '-show_format', '-print_format', 'json', file_path]
-        logging.info(f"FFmpeg command: {ffprobe_cmd}")
-
-        # Use a with statement to ensure the subprocess is cleaned up properly
-        with subprocess.Popen(ffprobe_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as proc:
-            stdout, stderr = proc.communicate()
-            
-            if proc.returncode != 0:
-                logging.error(f"Error: {stderr}")
-                return None
-            
-            # Parse JSON output
-            probe_result = json.loads(stdout)
-
-            # Extract duration from the video information
-            try:
-                return float(probe_result['format']['duration'])
-            
-            except:
-                return 1
+    info = get_media_info(file_path)
+    if info is None:
+        return None
 
-    except Exception as e:
-        logging.error(f"Get video duration error: {e}")
-        sys.exit(0)
+    # Extract duration from the video information
+    try:
+        return float(info['format']['duration'])
+    
+    except (KeyError, TypeError, ValueError):
+        return 1
 
 
 def format_duration(seconds: float) -> Tuple[int, int, int]:
@@ -138,61 +184,14 @@ def get_ffprobe_info(file_path):
         dict: A dictionary containing the format name and a list of codec names.
               Returns None if file does not exist or ffprobe crashes.
     """
-    if not os.path.exists(file_path):
-        logging.error(f"File not found: {file_path}")
-        return None
-
-    # Get ffprobe path and verify it exists
-    ffprobe_path = get_ffprobe_path()
-    if not ffprobe_path or not os.path.exists(ffprobe_path):
-        logging.error(f"FFprobe not found at path: {ffprobe_path}")
+    info = get_media_info(file_path)
+    if info is None:
         return None
 
-    # Verify file permissions
-    try:
-        file_stat = os.stat(file_path)
-        logging.info(f"File permissions: {oct(file_stat.st_mode)}")
-        if not os.access(file_path, os.R_OK):
-            logging.error(f"No read permission for file: {file_path}")
-            return None
-    except OSError as e:
-        logging.error(f"Cannot access file {file_path}: {e}")
-        return None
-
-    try:
-        cmd = [ffprobe_path, '-v', 'error', '-show_format', '-show_streams', '-print_format', 'json', file_path]
-        logging.info(f"Running FFprobe command: {' '.join(cmd)}")
-        
-        # Use subprocess.run instead of Popen for better error handling
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=False  # Don't raise exception on non-zero exit
-        )
-
-        if result.returncode != 0:
-            logging.error(f"FFprobe failed with return code {result.returncode}")
-            logging.error(f"FFprobe stderr: {result.stderr}")
-            logging.error(f"FFprobe stdout: {result.stdout}")
-            logging.error(f"Command: {' '.join(cmd)}")
-            logging.error(f"FFprobe path permissions: {oct(os.stat(ffprobe_path).st_mode)}")
-            return None
-
-        # Parse JSON output
-        try:
-            info = json.loads(result.stdout)
-            return {
-                'format_name': info.get('format', {}).get('format_name'),
-                'codec_names': [stream.get('codec_name') for stream in info.get('streams', [])]
-            }
-        except json.JSONDecodeError as e:
-            logging.error(f"Failed to parse FFprobe output: {e}")
-            return None
-
-    except Exception as e:
-        logging.error(f"FFprobe execution failed: {e}")
-        return None
+    return {
+        'format_name': info['format'].get('format_name'),
+        'codec_names': [stream.get('codec_name') for stream in info['streams']]
+    }
 
 
 def is_png_format_or_codec(file_info):
@@ -25,6 +25,63 @@ from Cryptodome.Util.Padding import unpad
 
 
 
+class M3U8_StreamDecryptor:
+    """
+    Incremental decryption of one segment: chunks are fed as they come from the network.
+    For padded modes the last full block is held back until `finalize`, where the padding is removed.
+    """
+    def __init__(self, cipher, padded: bool) -> None:
+        """
+        Parameters:
+            cipher: Fresh AES cipher object for this segment.
+            padded (bool): The plaintext ends with PKCS#7 padding (ECB/CBC).
+        """
+        self.cipher = cipher
+        self.padded = padded
+        self.pending = bytearray()
+
+    def update(self, chunk: bytes) -> bytes:
+        """
+        Decrypt the whole blocks available so far.
+
+        Parameters:
+            chunk (bytes): Next piece of ciphertext.
+
+        Returns:
+            bytes: The plaintext ready to be written, possibly empty.
+        """
+        if not self.padded:
+            return self.cipher.decrypt(chunk)
+
+        self.pending += chunk
+        usable = len(self.pending) - len(self.pending) % AES.block_size
+        if usable == len(self.pending):
+            usable -= AES.block_size
+
+        if usable <= 0:
+            return b""
+
+        with memoryview(self.pending) as view:
+            decrypted_data = self.cipher.decrypt(view[:usable])
+        del self.pending[:usable]
+        return decrypted_data
+
+    def finalize(self) -> bytes:
+        """
+        Decrypt the held back block and remove the padding.
+
+        Returns:
+            bytes: The last plaintext bytes.
+        """
+        if not self.padded or not self.pending:
+            return b""
+
+        if len(self.pending) % AES.block_size:
+            raise ValueError(f"Ciphertext length is not a multiple of {AES.block_size} bytes")
+
+        return unpad(self.cipher.decrypt(bytes(self.pending)), AES.block_size)
+
+
 class M3U8_Decryption:
     """
     Class for decrypting M3U8 playlist content using AES with pycryptodomex.
@@ -40,19 +97,51 @@ class M3U8_Decryption:
         """
         self.key = key
         self.iv = iv
-        if "0x" in str(iv):
-            self.iv = bytes.fromhex(iv.replace("0x", ""))
+        if isinstance(iv, str):
+            self.iv = bytes.fromhex(iv[2:] if iv.lower().startswith("0x") else iv)
         self.method = method
 
-        # Pre-create the cipher based on the encryption method
+        if self.method not in {"AES", "AES-128", "AES-128-CTR"}:
+            raise ValueError("Invalid or unsupported method")
+
+    def _new_cipher(self):
+        """
+        Create the cipher for one segment.
+        Ciphers keep the chaining state, so a segment must never continue the state left by another one.
+        """
         if self.method == "AES":
-            self.cipher = AES.new(self.key, AES.MODE_ECB)
+            return AES.new(self.key, AES.MODE_ECB)
         elif self.method == "AES-128":
-            self.cipher = AES.new(self.key[:16], AES.MODE_CBC, iv=self.iv)
-        elif self.method == "AES-128-CTR":
-            self.cipher = AES.new(self.key[:16], AES.MODE_CTR, nonce=self.iv)
+            return AES.new(self.key[:16], AES.MODE_CBC, iv=self.iv)
+        elif self.iv is not None and len(self.iv) == AES.block_size:
+            return AES.new(self.key[:16], AES.MODE_CTR, nonce=b"", initial_value=self.iv)   # Full counter block
         else:
-            raise ValueError("Invalid or unsupported method")
+            return AES.new(self.key[:16], AES.MODE_CTR, nonce=self.iv)
+
+    def new_stream(self) -> M3U8_StreamDecryptor:
+        """Return an incremental decryptor for one segment."""
+        return M3U8_StreamDecryptor(self._new_cipher(), padded=self.method in {"AES", "AES-128"})
+
+    def decrypt_inplace(self, buffer: bytearray) -> memoryview:
+        """
+        Decrypt a whole segment in place, without copying it.
+
+        Parameters:
+            buffer (bytearray): The encrypted segment, overwritten with the plaintext.
+
+        Returns:
+            memoryview: View of the plaintext over `buffer`, padding excluded.
+        """
+        view = memoryview(buffer)
+        self._new_cipher().decrypt(view, output=view)
+
+        if self.method == "AES-128-CTR":
+            return view
+
+        pad_len = view[-1] if len(view) else 0
+        if not 1 <= pad_len <= AES.block_size or view[-pad_len:] != bytes([pad_len]) * pad_len:
+            raise ValueError("Padding is incorrect.")
+        return view[:-pad_len]
 
     def decrypt(self, ciphertext: bytes) -> bytes:
         """
@@ -67,10 +156,10 @@ class M3U8_Decryption:
         #start = time.perf_counter_ns()
 
         if self.method in {"AES", "AES-128"}:
-            decrypted_data = self.cipher.decrypt(ciphertext)
+            decrypted_data = self._new_cipher().decrypt(ciphertext)
             decrypted_content = unpad(decrypted_data, AES.block_size)
         elif self.method == "AES-128-CTR":
-            decrypted_content = self.cipher.decrypt(ciphertext)
+            decrypted_content = self._new_cipher().decrypt(ciphertext)
         else:
             raise ValueError("Invalid or unsupported method")
 
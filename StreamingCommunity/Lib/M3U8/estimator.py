@@ -3,11 +3,10 @@
 import time
 import logging
 import threading
-from collections import deque
+from typing import Optional
 
 
 # External libraries
-import psutil
 from tqdm import tqdm
 
 
@@ -16,135 +15,118 @@ from StreamingCommunity.Util.color import Colors
 from StreamingCommunity.Util.os import internet_manager
 
 
+# Variable
+EWMA_ALPHA = 0.2                # Weight of the newest sample in the moving averages
+THROUGHPUT_INTERVAL = 0.5       # Seconds of data in one throughput sample
+
+
 class M3U8_Ts_Estimator:
+    """
+    Running statistics of the segments of a track: count, mean and EWMA of the segment size, EWMA of the throughput.
+    Every update is O(1), it's called by every worker on every segment.
+    """
     def __init__(self, total_segments: int, segments_instance=None):
         """
         Initialize the M3U8_Ts_Estimator object.
         
         Parameters:
             - total_segments (int): Length of total segments to download.
+            - segments_instance: Downloader of the track, its `metrics` job gives the download speed.
         """
-        self.ts_file_sizes = []
         self.total_segments = total_segments
         self.segments_instance = segments_instance
         self.lock = threading.Lock()
-        self.speed = {"upload": "N/A", "download": "N/A"}
-        self._running = True
-        
-        self.speed_thread = threading.Thread(target=self.capture_speed)
-        self.speed_thread.daemon = True
-        self.speed_thread.start()
 
-    def __del__(self):
-        """Ensure thread is properly stopped when the object is destroyed."""
-        self._running = False
-        
+        self.count = 0
+        self.total_bytes = 0
+        self.ewma_size: float = None
+        self.ewma_throughput: float = None
+
+        # Bytes committed since the last throughput sample
+        self.sample_start = time.monotonic()
+        self.sample_bytes = 0
+
     def add_ts_file(self, size: int):
-        """Add a file size to the list of file sizes."""
+        """Add the size of a downloaded segment."""
         if size <= 0:
             logging.error(f"Invalid input values: size={size}")
             return
 
-        self.ts_file_sizes.append(size)
+        now = time.monotonic()
+        with self.lock:
+            self.count += 1
+            self.total_bytes += size
+            self.ewma_size = size if self.ewma_size is None else EWMA_ALPHA * size + (1 - EWMA_ALPHA) * self.ewma_size
 
-    def capture_speed(self, interval: float = 1.5):
-        """Capture the internet speed periodically with improved efficiency."""
-        last_upload, last_download = 0, 0
-        speed_buffer = deque(maxlen=3)
-        
-        while self._running:
-            try:
-                # Get IO counters only once per loop to reduce function calls
-                io_counters = psutil.net_io_counters()
-                if not io_counters:
-                    raise ValueError("No IO counters available")
-                
-                current_upload, current_download = io_counters.bytes_sent, io_counters.bytes_recv
-                
-                if last_upload and last_download:
-                    upload_speed = (current_upload - last_upload) / interval
-                    download_speed = (current_download - last_download) / interval
-                    
-                    # Only update buffer when we have valid data
-                    if download_speed > 0:
-                        speed_buffer.append(download_speed)
-                    
-                    # Use a more efficient approach for thread synchronization
-                    avg_speed = sum(speed_buffer) / len(speed_buffer) if speed_buffer else 0
-                    formatted_upload = internet_manager.format_transfer_speed(max(0, upload_speed))
-                    formatted_download = internet_manager.format_transfer_speed(avg_speed)
-                    
-                    # Minimize lock time by preparing data outside the lock
-                    with self.lock:
-                        self.speed = {
-                            "upload": formatted_upload,
-                            "download": formatted_download
-                        }
-                
-                last_upload, last_download = current_upload, current_download
-                
-            except Exception as e:
-                if self._running:  # Only log if we're still supposed to be running
-                    logging.error(f"Error in speed capture: {str(e)}")
-                self.speed = {"upload": "N/A", "download": "N/A"}
-            
-            time.sleep(interval)
+            self.sample_bytes += size
+            elapsed = now - self.sample_start
+            if elapsed >= THROUGHPUT_INTERVAL:
+                rate = self.sample_bytes / elapsed
+                self.ewma_throughput = rate if self.ewma_throughput is None else EWMA_ALPHA * rate + (1 - EWMA_ALPHA) * self.ewma_throughput
+                self.sample_start, self.sample_bytes = now, 0
+
+    def get_mean_size(self) -> float:
+        """Mean size of the segments downloaded so far."""
+        return self.total_bytes / self.count if self.count else 0.0
+
+    def get_total_size(self) -> float:
+        """Estimated size of the whole track in bytes."""
+        return self.get_mean_size() * self.total_segments
+
+    def get_eta(self, segments_done: int) -> Optional[float]:
+        """
+        Seconds left: remaining segments at the recent segment size, over the measured bandwidth.
+
+        Parameters:
+            - segments_done (int): Segments already downloaded, resumed ones included.
+        """
+        with self.lock:
+            ewma_size, throughput = self.ewma_size, self.ewma_throughput
+
+        if not ewma_size or not throughput:
+            return None
+        return max(0, self.total_segments - segments_done) * ewma_size / throughput
+
+    def get_speed(self) -> str:
+        """Return the download speed of the track, measured from the bytes it received."""
+        metrics = getattr(self.segments_instance, 'metrics', None)
+        if metrics is None:
+            return "N/A"
+
+        return internet_manager.format_transfer_speed(metrics.get_speed())
 
     def calculate_total_size(self) -> str:
         """
-        Calculate the total size of the files.
+        Calculate the estimated size of the track.
 
         Returns:
-            str: The mean size of the files in a human-readable format.
+            str: The estimated size in a human-readable format.
         """
-        try:
-            # Only do calculations if we have data
-            if not self.ts_file_sizes:
-                return "0 B"
-                
-            total_size = sum(self.ts_file_sizes)
-            mean_size = total_size / len(self.ts_file_sizes)
-            return internet_manager.format_file_size(mean_size)
-
-        except Exception as e:
-            logging.error("An unexpected error occurred: %s", e)
-            return "Error"
+        return internet_manager.format_file_size(self.get_total_size())
     
     def update_progress_bar(self, total_downloaded: int, progress_counter: tqdm) -> None:
+        """
+        Add a downloaded segment and update the ETA and the postfix of the progress bar.
+        The bar must be created with a two item postfix list: [eta, info].
+
+        Parameters:
+            - total_downloaded (int): Size of the segment in bytes.
+            - progress_counter (tqdm): Progress bar of the track.
+        """
         try:
-            self.add_ts_file(total_downloaded * self.total_segments)
-            
-            file_total_size = self.calculate_total_size()
-            if file_total_size == "Error":
-                return
-                
-            number_file_total_size = file_total_size.split(' ')[0]
-            units_file_total_size = file_total_size.split(' ')[1]
-            
-            # Reduce lock contention by acquiring data with minimal synchronization
-            retry_count = 0
-            if self.segments_instance:
-                with self.segments_instance.active_retries_lock:
-                    retry_count = self.segments_instance.active_retries
-            
-            # Get speed data outside of any locks
-            speed_data = ["N/A", ""]
-            with self.lock:
-                download_speed = self.speed['download']
-            
-            if download_speed != "N/A":
-                speed_data = download_speed.split(" ")
-            
-            average_internet_speed = speed_data[0] if len(speed_data) >= 1 else "N/A"
-            average_internet_unit = speed_data[1] if len(speed_data) >= 2 else ""
+            self.add_ts_file(total_downloaded)
+
+            eta = self.get_eta(progress_counter.n + 1)
+            number_file_total_size, _, units_file_total_size = self.calculate_total_size().partition(' ')
+            average_internet_speed, _, average_internet_unit = self.get_speed().partition(' ')
             
             progress_str = (
-                f"{Colors.GREEN}{number_file_total_size} {Colors.RED}{units_file_total_size}"
+                f"{Colors.WHITE}, {Colors.GREEN}{number_file_total_size} {Colors.RED}{units_file_total_size}"
                 f"{Colors.WHITE}, {Colors.CYAN}{average_internet_speed} {Colors.RED}{average_internet_unit} "
-                #f"{Colors.WHITE}, {Colors.GREEN}CRR {Colors.RED}{retry_count} "
             )
-            
-            progress_counter.set_postfix_str(progress_str)
+
+            # Redrawn by tqdm at its own rate
+            progress_counter.postfix = [tqdm.format_interval(eta) if eta is not None else "--:--", progress_str]
             
         except Exception as e:
-            logging.error(f"Error updating progress bar: {str(e)}")
\ No newline at end of file
+            logging.error(f"Error updating progress bar: {str(e)}")
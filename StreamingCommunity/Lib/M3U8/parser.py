@@ -227,7 +227,27 @@ class M3U8_Video:
                 return video['uri'], video['resolution']
             
         return None, None
-    
+
+    def get_alternate_uris(self, uri):
+        """
+        Returns the redundant copies of a variant: playlists with the same resolution and bandwidth but another URI,
+        usually the same stream served by another CDN.
+
+        Parameters:
+            - uri (str): URI of the selected variant.
+
+        Returns:
+            list: The URIs of the redundant variants, possibly empty.
+        """
+        selected = next((video for video in self.video_playlist if video['uri'] == uri), None)
+        if selected is None:
+            return []
+
+        return [
+            video['uri'] for video in self.video_playlist
+            if video['uri'] != uri and video['resolution'] == selected['resolution'] and video['bandwidth'] == selected['bandwidth']
+        ]
+
     def get_list_resolution(self):
         """
         Retrieve a list of resolutions from the video playlist.
@@ -384,6 +404,12 @@ class M3U8_Parser:
         self.segments = []
         self.video_playlist = []
         self.keys = None
+        self.segment_keys = []
+        self.init_section = None
+        self.media_sequence = 0
+        self.target_duration = 0
+        self.is_open = False
+        self.is_event = False
         self.subtitle_playlist = []
         self.subtitle = []
         self.audio_playlist = []
@@ -409,6 +435,13 @@ class M3U8_Parser:
         self.__parse_segments__(m3u8_obj)
         self.is_master_playlist = self.__is_master__(m3u8_obj)
 
+        # Media playlist without EXT-X-ENDLIST: segments may keep coming, but many VOD CDNs leave out both
+        # EXT-X-ENDLIST and EXT-X-PLAYLIST-TYPE. Only an EVENT playlist is known to grow
+        self.target_duration = m3u8_obj.target_duration or 0
+        playlist_type = str(m3u8_obj.playlist_type).upper()
+        self.is_open = not self.is_master_playlist and not m3u8_obj.is_endlist and playlist_type != "VOD"
+        self.is_event = self.is_open and playlist_type == "EVENT"
+
     @staticmethod
     def extract_resolution(uri: str) -> int:
         """
@@ -525,7 +558,7 @@ class M3U8_Parser:
 
     def __parse_encryption_keys__(self, obj) -> None:
         """
-        Extracts encryption keys either from the M3U8 object or from individual segments.
+        Extracts the first encryption key either from the M3U8 object or from individual segments.
 
         Parameters:
             - obj: Either the main M3U8 object or an individual segment.
@@ -541,19 +574,32 @@ class M3U8_Parser:
                 if self.keys is None:
                     self.keys = key_info
 
-                """
-                elif obj.key.uri not in self.keys:
-                    if isinstance(self.keys, dict):
-                        self.keys[obj.key.uri] = key_info
-                    else:
-                        old_key = self.keys
-                        self.keys = {'default': old_key, obj.key.uri: key_info}
-                """
-
         except Exception as e:
             logging.error(f"Error parsing encryption keys: {e}")
             pass
 
+    def __get_segment_key__(self, segment, sequence: int):
+        """
+        Returns the key in effect for a segment, with the IV derived from the media sequence number
+        when the EXT-X-KEY tag has none (RFC 8216, section 5.2).
+
+        Parameters:
+            - segment: The segment object.
+            - sequence (int): Media sequence number of the segment.
+
+        Returns:
+            dict or None: {'method', 'iv', 'uri'}, None for a clear segment.
+        """
+        key = getattr(segment, 'key', None)
+        if key is None or key.method is None or key.method.upper() == "NONE":
+            return None
+
+        return {
+            'method': key.method,
+            'iv': key.iv or f"0x{sequence:032x}",
+            'uri': key.uri
+        }
+
     def __parse_subtitles_and_audio__(self, m3u8_obj) -> None:
         """
         Extracts subtitles and audio information from the M3U8 object.
@@ -592,15 +638,27 @@ class M3U8_Parser:
             - m3u8_obj: The M3U8 object containing segment data.
         """
         try:
+            self.media_sequence = m3u8_obj.media_sequence or 0
+
             for segment in m3u8_obj.segments:
 
                 # Parse key
                 self.__parse_encryption_keys__(segment)
+
+                # fMP4 / CMAF: init section (EXT-X-MAP) shared by the fragments
+                if segment.init_section is not None:
+                    init_section = {'uri': segment.init_section.uri, 'byterange': segment.init_section.byterange}
+                    if self.init_section is None:
+                        self.init_section = init_section
+                    elif init_section != self.init_section:
+                        logging.warning(f"Multiple init sections are not supported, using {self.init_section['uri']}")
                 
                 # Collect all index duration
                 self.duration += segment.duration
 
+                # The default IV counts media segments only, vtt entries mixed in the playlist don't shift it
                 if "vtt" not in segment.uri:
+                    self.segment_keys.append(self.__get_segment_key__(segment, self.media_sequence + len(self.segments)))
                     self.segments.append(segment.uri)
                 else:
                     self.subtitle.append(segment.uri)
@@ -0,0 +1,218 @@
+# 17.10.26
+
+import os
+import json
+import logging
+import threading
+import subprocess
+from typing import Dict, List, Optional, Set
+
+
+# Internal utilities
+from StreamingCommunity.Util.config_json import config_manager
+
+
+# Variable
+STORE_FILE_NAME = "ffmpeg_capabilities.json"
+DETECT_TIMEOUT = 30
+
+
+def _get_stamp(path: str) -> Optional[List[int]]:
+    """Return [size, mtime_ns] of a file, None if it can't be read. A binary replaced or upgraded gets a new stamp."""
+    try:
+        file_stat = os.stat(path)
+        return [file_stat.st_size, file_stat.st_mtime_ns]
+    except OSError:
+        return None
+
+
+def _list_after_separator(output: str, separator: str) -> List[str]:
+    """Return the names listed by `ffmpeg -encoders` / `-muxers`: the 2nd column of every line after the separator line."""
+    names = []
+    started = False
+
+    for line in output.splitlines():
+        if not started:
+            started = line.strip().startswith(separator)
+            continue
+
+        parts = line.split()
+        if len(parts) >= 2:
+            names.extend(parts[1].split(','))
+
+    return names
+
+
+class FFmpegCapabilities:
+    """
+    Version, encoders, muxers and hardware acceleration methods of one FFmpeg binary.
+    """
+    def __init__(self, version: str = None, encoders: List[str] = None, muxers: List[str] = None, hwaccels: List[str] = None):
+        """
+        Parameters:
+            - version (str): Version string, e.g. '7.1'.
+            - encoders (List[str]): Encoder names (`ffmpeg -encoders`).
+            - muxers (List[str]): Muxer names (`ffmpeg -muxers`).
+            - hwaccels (List[str]): Hardware acceleration methods (`ffmpeg -hwaccels`).
+        """
+        self.version = version
+        self.encoders: Set[str] = set(encoders or [])
+        self.muxers: Set[str] = set(muxers or [])
+        self.hwaccels: Set[str] = set(hwaccels or [])
+
+    def has_encoder(self, name: str) -> bool:
+        return name in self.encoders
+
+    def has_muxer(self, name: str) -> bool:
+        return name in self.muxers
+
+    def has_hwaccel(self, name: str) -> bool:
+        return name in self.hwaccels
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': self.version,
+            'encoders': sorted(self.encoders),
+            'muxers': sorted(self.muxers),
+            'hwaccels': sorted(self.hwaccels)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FFmpegCapabilities":
+        return cls(data.get('version'), data.get('encoders'), data.get('muxers'), data.get('hwaccels'))
+
+    @classmethod
+    def detect(cls, ffmpeg_path: str) -> "FFmpegCapabilities":
+        """
+        Run the binary to list its capabilities.
+
+        Parameters:
+            - ffmpeg_path (str): Path of the FFmpeg binary.
+        """
+        def run(option: str) -> str:
+            result = subprocess.run([ffmpeg_path, '-hide_banner', option], capture_output=True, text=True, timeout=DETECT_TIMEOUT, check=True)
+            return result.stdout
+
+        version_line = run('-version').splitlines()[0]      # ffmpeg version 7.1 Copyright ...
+        version = version_line.split()[2] if len(version_line.split()) > 2 else None
+
+        hwaccels = [line.strip() for line in run('-hwaccels').splitlines()[1:] if line.strip()]
+
+        return cls(
+            version=version,
+            encoders=_list_after_separator(run('-encoders'), '------'),
+            muxers=_list_after_separator(run('-muxers'), '--'),
+            hwaccels=hwaccels
+        )
+
+
+class CapabilityStore:
+    """
+    Capabilities of every FFmpeg binary seen and the last binaries located, kept in a JSON file next to config.json.
+    Both are keyed on the (path, size, mtime_ns) of the binaries: a binary replaced or upgraded in place is
+    located and detected again.
+    """
+    def __init__(self, path: str = None):
+        """
+        Parameters:
+            - path (str): Path of the JSON file (default next to config.json).
+        """
+        self.path = path or os.path.join(os.path.dirname(config_manager.file_path), STORE_FILE_NAME)
+        self.lock = threading.Lock()
+        self.loaded: Dict[str, FFmpegCapabilities] = {}
+
+    def _read(self) -> Dict:
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+
+        except Exception as e:
+            logging.error(f"Invalid FFmpeg capability store {self.path}: {e}")
+            return {}
+
+    def _write(self, data: Dict) -> None:
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, self.path)
+
+        except Exception as e:
+            logging.error(f"Can't save FFmpeg capability store {self.path}: {e}")
+
+    def get(self, ffmpeg_path: str) -> Optional[FFmpegCapabilities]:
+        """
+        Return the capabilities of a binary, detected on first use and then read from memory or disk.
+
+        Parameters:
+            - ffmpeg_path (str): Path of the FFmpeg binary.
+
+        Returns:
+            FFmpegCapabilities: None if the binary is missing or can't be run.
+        """
+        if not ffmpeg_path:
+            return None
+
+        stamp = _get_stamp(ffmpeg_path)
+        if stamp is None:
+            logging.error(f"Cannot access FFmpeg binary {ffmpeg_path}")
+            return None
+
+        key = (ffmpeg_path, *stamp)
+        with self.lock:
+            if key in self.loaded:
+                return self.loaded[key]
+
+            data = self._read()
+            entry = data.get('capabilities', {}).get(ffmpeg_path)
+
+            if entry is not None and entry.get('stamp') == stamp:
+                capabilities = FFmpegCapabilities.from_dict(entry)
+
+            else:
+                try:
+                    capabilities = FFmpegCapabilities.detect(ffmpeg_path)
+                except Exception as e:
+                    logging.error(f"Can't detect FFmpeg capabilities of {ffmpeg_path}: {e}")
+                    return None
+
+                logging.info(f"FFmpeg {capabilities.version} capabilities detected: {len(capabilities.encoders)} encoders, {len(capabilities.muxers)} muxers")
+                data.setdefault('capabilities', {})[ffmpeg_path] = dict(capabilities.to_dict(), stamp=stamp)
+                self._write(data)
+
+            self.loaded[key] = capabilities
+            return capabilities
+
+    def get_binaries(self) -> Optional[Dict[str, str]]:
+        """Return the paths of ffmpeg, ffprobe and ffplay located by the previous run, None if one of them is gone or changed."""
+        with self.lock:
+            data = self._read()
+
+        binaries = data.get('binaries')
+        stamps = data.get('binary_stamps', {})
+        if not binaries or not binaries.get('ffmpeg') or not binaries.get('ffprobe'):
+            return None
+
+        for path in binaries.values():
+            if path and (not os.access(path, os.X_OK) or stamps.get(path) is None or stamps.get(path) != _get_stamp(path)):
+                return None
+
+        return binaries
+
+    def set_binaries(self, ffmpeg_path: str, ffprobe_path: str, ffplay_path: str = None) -> None:
+        """Save the paths of the binaries located, the next start skips the search while they don't change."""
+        with self.lock:
+            data = self._read()
+            binaries = {'ffmpeg': ffmpeg_path, 'ffprobe': ffprobe_path, 'ffplay': ffplay_path}
+            stamps = {path: _get_stamp(path) for path in binaries.values() if path}
+
+            if data.get('binaries') != binaries or data.get('binary_stamps') != stamps:
+                data['binaries'] = binaries
+                data['binary_stamps'] = stamps
+                self._write(data)
+
+
+capability_store = CapabilityStore()
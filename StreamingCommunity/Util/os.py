@@ -24,6 +24,7 @@ from dns.resolver import dns
 
 # Internal utilities
 from .ffmpeg_installer import check_ffmpeg
+from .ffmpeg_capabilities import capability_store
 
 
 # Variable
@@ -441,8 +442,14 @@ class OsSummary:
         }
         arch = arch_map.get(arch, arch)
 
+        # Binaries located by the previous run, if still there
+        cached_binaries = capability_store.get_binaries()
+
+        if cached_binaries:
+            self.ffmpeg_path, self.ffprobe_path, self.ffplay_path = cached_binaries['ffmpeg'], cached_binaries['ffprobe'], cached_binaries.get('ffplay')
+
         # Check binary directory
-        if os.path.exists(binary_dir):
+        elif os.path.exists(binary_dir):
 
             # Search for any file containing 'ffmpeg' and the architecture
             ffmpeg_files = glob.glob(os.path.join(binary_dir, f'*ffmpeg*{arch}*'))
@@ -465,6 +472,8 @@ class OsSummary:
             console.log("[red]Can't locate ffmpeg or ffprobe")
             sys.exit(0)
 
+        capability_store.set_binaries(self.ffmpeg_path, self.ffprobe_path, self.ffplay_path)
+
         console.print(f"[cyan]Path: [red]ffmpeg [bold yellow]'{self.ffmpeg_path}'[/bold yellow][white], [red]ffprobe '[bold yellow]{self.ffprobe_path}'[/bold yellow]")
 
 
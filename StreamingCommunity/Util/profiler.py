@@ -0,0 +1,252 @@
+# 17.10.26
+
+import os
+import re
+import json
+import time
+import atexit
+import logging
+import cProfile
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+# External library
+from rich.console import Console
+from rich.table import Table
+
+
+# Variable
+console = Console()
+MEMORY_TOP_LINES = 15           # Allocation sites kept per phase run in the tracemalloc dump
+MEMORY_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+class PhaseStats:
+    """
+    Wall time of every run of one phase, and the memory it allocated when tracemalloc is on.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.memory = 0
+
+    def add(self, duration: float, memory: int = 0) -> None:
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.memory += memory
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'total': self.total, 'max': self.max, 'memory': self.memory}
+
+
+class PhaseProfiler:
+    """
+    Timers around the phases of a job (search, parse, download, merge, probe, post-processing), off by default.
+    Phases nest: each one is reported under the phases open around it in the same thread, e.g. 'download_film/download'.
+
+    Optionally:
+        - cProfile: one profile per phase, holding only the time not spent in a nested phase.
+          Only the main thread is profiled, work done by the download workers shows as waiting.
+        - tracemalloc: the allocations of every phase run, by source line.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.use_cprofile = False
+        self.use_tracemalloc = False
+        self.dump_dir: Optional[str] = None
+        self.started = None
+        self.reported = False
+
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stats: Dict[str, PhaseStats] = {}
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.memory_reports: Dict[str, List[str]] = {}
+        self.active_profile: Optional[cProfile.Profile] = None
+
+    def enable(self, dump_dir: str = None, use_cprofile: bool = False, use_tracemalloc: bool = False) -> None:
+        """
+        Start collecting, the summary is printed at exit.
+
+        Parameters:
+            - dump_dir (str): Folder for summary.json and the cProfile / tracemalloc dumps, None for no files.
+            - use_cprofile (bool): Profile each phase with cProfile.
+            - use_tracemalloc (bool): Trace the allocations of each phase.
+        """
+        self.enabled = True
+        self.dump_dir = dump_dir
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.started = time.perf_counter()
+
+        if use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        atexit.register(self.report)
+
+    def _get_stack(self) -> List[str]:
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+            self.local.overhead = 0.0
+        return self.local.stack
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        """Snapshot of the heap, the time it takes is left out of the phases around it."""
+        start = time.perf_counter()
+        snapshot = tracemalloc.take_snapshot()
+        self.local.overhead += time.perf_counter() - start
+        return snapshot
+
+    def _compare_snapshots(self, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> List[tracemalloc.StatisticDiff]:
+        start = time.perf_counter()
+        differences = [stat for stat in after.compare_to(before, 'lineno') if stat.traceback[0].filename not in MEMORY_IGNORED_FILES]
+        self.local.overhead += time.perf_counter() - start
+        return differences
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time a phase, does nothing while the profiler is off.
+
+        Parameters:
+            - name (str): Phase name.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._get_stack()
+        stack.append(name)
+        path = "/".join(stack)
+
+        # cProfile: pause the profile of the parent phase, it only keeps its own time
+        profile, parent_profile = None, None
+        if self.use_cprofile and threading.current_thread() is threading.main_thread():
+            parent_profile = self.active_profile
+            if parent_profile is not None:
+                parent_profile.disable()
+            profile = self.profiles.setdefault(path, cProfile.Profile())
+
+        snapshot = self._take_snapshot() if self.use_tracemalloc else None
+        if profile is not None:
+            profile.enable()
+            self.active_profile = profile
+        start, overhead = time.perf_counter(), self.local.overhead
+
+        try:
+            yield
+
+        finally:
+            duration = time.perf_counter() - start - (self.local.overhead - overhead)
+            if profile is not None:
+                profile.disable()
+
+            memory = 0
+            if snapshot is not None:
+                differences = self._compare_snapshots(snapshot, self._take_snapshot())
+                memory = sum(stat.size_diff for stat in differences)
+                with self.lock:
+                    report = self.memory_reports.setdefault(path, [])
+                    report.append(f"Run {len(report) + 1}: {memory / 1024:+.1f} KiB")
+                    report.extend(f"    {stat}" for stat in differences[:MEMORY_TOP_LINES])
+
+            if profile is not None:
+                self.active_profile = parent_profile
+                if parent_profile is not None:
+                    parent_profile.enable()
+
+            with self.lock:
+                self.stats.setdefault(path, PhaseStats()).add(duration, memory)
+            stack.pop()
+
+    def timed(self, name: str):
+        """Decorator running the whole function as a phase."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.phase(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _get_ordered_paths(self) -> List[str]:
+        """Phases in tree order, children right after their parent, siblings in the order they first ran."""
+        order = {path: index for index, path in enumerate(self.stats)}
+
+        def key(path: str):
+            parts = path.split("/")
+            return tuple(order.get("/".join(parts[:i + 1]), -1) for i in range(len(parts)))
+
+        return sorted(self.stats, key=key)
+
+    def _get_self_time(self, path: str) -> float:
+        """Time of a phase not spent in the phases nested in it."""
+        children = [child for child in self.stats if child.startswith(path + "/") and child.count("/") == path.count("/") + 1]
+        return max(0.0, self.stats[path].total - sum(self.stats[child].total for child in children))
+
+    def report(self) -> None:
+        """Print the summary table and write the dump files, once."""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+
+        wall = time.perf_counter() - self.started
+        with self.lock:
+            paths = self._get_ordered_paths()
+
+        table = Table(title=f"Profile ({wall:.2f} s)")
+        table.add_column("Phase", style="cyan")
+        for column in ("Runs", "Total s", "Self s", "% wall", "Max s") + (("Memory KiB",) if self.use_tracemalloc else ()):
+            table.add_column(column, justify="right")
+
+        for path in paths:
+            stats = self.stats[path]
+            row = [
+                "  " * path.count("/") + path.split("/")[-1],
+                str(stats.count),
+                f"{stats.total:.2f}",
+                f"{self._get_self_time(path):.2f}",
+                f"{stats.total / wall * 100:.1f}" if wall > 0 else "-",
+                f"{stats.max:.2f}"
+            ]
+            if self.use_tracemalloc:
+                row.append(f"{stats.memory / 1024:+.1f}")
+            table.add_row(*row)
+
+        console.print(table)
+
+        if self.dump_dir:
+            self._dump(wall, paths)
+
+    def _dump(self, wall: float, paths: List[str]) -> None:
+        """Write summary.json, a .prof file per phase (pstats, snakeviz) and the tracemalloc report."""
+        try:
+            os.makedirs(self.dump_dir, exist_ok=True)
+
+            summary = {'wall': wall, 'phases': {path: dict(self.stats[path].to_dict(), self_time=self._get_self_time(path)) for path in paths}}
+            with open(os.path.join(self.dump_dir, "summary.json"), 'w') as f:
+                json.dump(summary, f, indent=4)
+
+            for path, profile in self.profiles.items():
+                profile.dump_stats(os.path.join(self.dump_dir, re.sub(r'[^\w.-]', '_', path) + ".prof"))
+
+            if self.memory_reports:
+                with open(os.path.join(self.dump_dir, "tracemalloc.txt"), 'w') as f:
+                    for path in paths:
+                        if path in self.memory_reports:
+                            f.write(f"== {path}\n" + "\n".join(self.memory_reports[path]) + "\n\n")
+
+            console.print(f"[cyan]Profile saved in: [green]{os.path.abspath(self.dump_dir)}")
+
+        except Exception as e:
+            logging.error(f"Can't write profile to {self.dump_dir}: {e}")
+            console.print(f"[red]Can't write profile to {self.dump_dir}: {e}")
+
+
+profiler = PhaseProfiler()
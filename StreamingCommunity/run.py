@@ -24,6 +24,7 @@ from StreamingCommunity.Util.message import start_message
 from StreamingCommunity.Util.config_json import config_manager
 from StreamingCommunity.Util.os import os_summary, internet_manager
 from StreamingCommunity.Util.logger import Logger
+from StreamingCommunity.Util.profiler import profiler
 from StreamingCommunity.Upload.update import update as git_update
 from StreamingCommunity.Lib.TMBD import tmdb
 from StreamingCommunity.TelegramHelp.telegram_bot import get_bot_instance, TelegramSession
@@ -166,6 +167,7 @@ def force_exit():
     """Forza la chiusura dello script in qualsiasi contesto."""
 
     print("\nChiusura dello script in corso...")
+    profiler.report()     # os._exit skips atexit
 
     # 1 Chiudi tutti i thread tranne il principale
     for t in threading.enumerate():
@@ -285,10 +287,30 @@ def main(script_id = 0):
 
     # Add arguments for search functions
     parser.add_argument('-s', '--search', default=None, help='Search terms')
+
+    # Add profiling options
+    parser.add_argument(
+        '--profile', action='store_true', help='Time each phase of the job (search, parse, download, merge, probe, post-processing) and print a summary at exit.'
+    )
+    parser.add_argument(
+        '--profile_cprofile', action='store_true', help='With --profile, also run cProfile on each phase and save one .prof file per phase.'
+    )
+    parser.add_argument(
+        '--profile_tracemalloc', action='store_true', help='With --profile, also trace the memory allocated by each phase.'
+    )
+    parser.add_argument(
+        '--profile_dir', type=str, default=None, help='Folder for the profile summary and dumps (default: profile_<timestamp> with --profile_cprofile or --profile_tracemalloc).'
+    )
     
     # Parse command-line arguments
     args = parser.parse_args()
 
+    if args.profile:
+        dump_dir = args.profile_dir
+        if dump_dir is None and (args.profile_cprofile or args.profile_tracemalloc):
+            dump_dir = f"profile_{time.strftime('%Y%m%d_%H%M%S')}"
+        profiler.enable(dump_dir, use_cprofile=args.profile_cprofile, use_tracemalloc=args.profile_tracemalloc)
+
     search_terms = args.search
     # Map command-line arguments to the config values
     config_updates = {}
@@ -0,0 +1,250 @@
+# 17.10.26
+
+"""
+Offline benchmark of the downloaders against the local stand-in CDN of cdn.py.
+
+Every case (target, variant, engine, workers) runs in its own process, so peak RSS and CPU time belong to that case
+only, while the CDN runs in this process and doesn't weigh on them. Targets:
+    - hls: HLS_Downloader on the master playlist, the whole job: parse, download, merge (without FFmpeg the
+      downloader falls back to the raw track, the merge time is then not representative)
+    - segments: M3U8_Segments on the media playlist, the download engine alone, the track is checked against the
+      content served
+    - mp4: MP4_downloader on the progressive file (variant, engine and workers don't apply)
+Post-processing (TMDB lookup and move to the library) is skipped, it would leave the machine.
+
+Example:
+    python Test/Benchmark/bench.py --targets segments,mp4 --engines thread,async --workers 4,16 --latency 0.05 --jitter 0.02
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import argparse
+import itertools
+import subprocess
+import contextlib
+from typing import Dict, List
+
+# Fix import
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT_PATH)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rich.console import Console
+from rich.table import Table
+
+from cdn import LocalCDN, CDNProfile, VARIANTS
+
+
+# Variable
+console = Console()
+TARGETS = ("hls", "segments", "mp4")
+ENGINES = ("thread", "async")
+
+
+def get_peak_rss() -> int:
+    """Peak resident memory of this process in bytes."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    # Windows
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+
+
+def run_case(case: Dict) -> Dict:
+    """
+    Run one case in this process, the downloaders are imported here so the parent stays light.
+
+    Parameters:
+        - case (dict): target, variant, engine, workers, urls of the CDN and hash of the expected track.
+
+    Returns:
+        dict: ok, error, wall, cpu, download (seconds of the segment jobs), requests, bytes, retries, failures, peak_rss.
+    """
+    import StreamingCommunity.Lib.Downloader.HLS.segments as segments_module
+    import StreamingCommunity.Lib.Downloader.HLS.downloader as hls_module
+    import StreamingCommunity.Lib.Downloader.MP4.downloader as mp4_module
+    from StreamingCommunity.Lib.Downloader.metrics import metrics_hub
+
+    # Fixed worker count, nothing learned or stored for the local host
+    workers = case['workers']
+    segments_module.DOWNLOAD_ENGINE = case['engine']
+    segments_module.ADAPTIVE_WORKERS = False
+    segments_module.DEFAULT_VIDEO_WORKERS = segments_module.DEFAULT_AUDIO_WORKERS = workers
+    segments_module.MAX_WORKERS = hls_module.MAX_WORKERS = max(workers, hls_module.MAX_WORKERS)
+    hls_module.post_process_media_file = mp4_module.post_process_media_file = lambda path: path
+
+    tmp_dir = tempfile.mkdtemp(prefix="sc_bench_")
+    out_path = os.path.join(tmp_dir, "bench.mp4")
+    ok, error = False, None
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            if case['target'] == "segments":
+                track_dir = os.path.join(tmp_dir, "video")
+                segments = segments_module.M3U8_Segments(case['media_url'], track_dir)
+                result = segments.download_streams("Video", "video")
+                track_path = segments.tmp_file_path
+                with open(track_path, 'rb') as f:
+                    ok = result['nFailed'] == 0 and hashlib.sha1(f.read()).hexdigest() == case['track_sha1']
+
+            elif case['target'] == "hls":
+                result = hls_module.HLS_Downloader(m3u8_url=case['master_url'], output_path=out_path).start()
+                ok, error = result['error'] is None, result['error']
+
+            else:
+                path, _ = mp4_module.MP4_downloader(case['mp4_url'], out_path)
+                ok = path is not None and os.path.getsize(path) == case['mp4_size']
+
+    except Exception as e:
+        error = str(e)
+
+    finally:
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    snapshot = metrics_hub.snapshot()
+    return {
+        'ok': ok,
+        'error': error,
+        'wall': wall,
+        'cpu': cpu,
+        'download': max((job['elapsed'] for job in snapshot['jobs']), default=wall),
+        'requests': snapshot['requests'],
+        'bytes': snapshot['bytes'],
+        'retries': snapshot['retries'],
+        'failures': snapshot['failures'],
+        'peak_rss': get_peak_rss()
+    }
+
+
+def spawn_case(case: Dict) -> Dict:
+    """Run a case in a child process and return its result."""
+    with tempfile.NamedTemporaryFile('r', suffix=".json", delete=False) as f:
+        result_path = f.name
+
+    try:
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", json.dumps(case), "--result", result_path],
+            cwd=ROOT_PATH, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        with open(result_path, 'r') as f:
+            content = f.read()
+
+        if process.returncode != 0 or not content:
+            last_lines = (process.stderr or "").strip().splitlines()
+            return {'ok': False, 'error': last_lines[-1] if last_lines else f"exit code {process.returncode}"}
+        return json.loads(content)
+
+    finally:
+        os.remove(result_path)
+
+
+def build_cases(args, cdn: LocalCDN) -> List[Dict]:
+    cases = []
+
+    for target in args.targets:
+        if target == "mp4":
+            cases.append(dict(target=target, variant="-", engine="-", workers=1, mp4_url=cdn.mp4_url, mp4_size=cdn.n_segments * cdn.segment_size))
+            continue
+
+        for variant, engine, workers in itertools.product(args.variants, args.engines, args.workers):
+            cases.append(dict(
+                target=target, variant=variant, engine=engine, workers=workers,
+                master_url=cdn.master_url(variant),
+                media_url=cdn.media_url(variant),
+                track_sha1=hashlib.sha1(cdn.expected_track(variant)).hexdigest()
+            ))
+
+    return cases
+
+
+def print_results(results: List[Dict]) -> None:
+    table = Table(title="Offline download benchmark")
+    for column in ("target", "variant", "engine", "workers", "ok", "segments/s", "MB/s", "wall s", "cpu s", "peak RSS MB", "retries"):
+        table.add_column(column, justify="left" if column in ("target", "variant", "engine") else "right")
+
+    for case, result in results:
+        if 'wall' not in result:
+            table.add_row(case['target'], case['variant'], case['engine'], str(case['workers']), f"[red]{result['error']}", *["-"] * 6)
+            continue
+
+        download = result['download'] or result['wall']
+        segments_rate = result['requests'] / download if case['target'] != "mp4" else 0
+        table.add_row(
+            case['target'], case['variant'], case['engine'], str(case['workers']),
+            "[green]yes" if result['ok'] else f"[red]no {result['error'] or ''}",
+            f"{segments_rate:.1f}" if segments_rate else "-",
+            f"{result['bytes'] / download / 1024 / 1024:.1f}",
+            f"{result['wall']:.2f}",
+            f"{result['cpu']:.2f}",
+            f"{result['peak_rss'] / 1024 / 1024:.0f}",
+            str(result['retries'])
+        )
+
+    console.print(table)
+
+
+def parse_list(value: str, choices=None, cast=str) -> List:
+    items = [cast(item.strip()) for item in value.split(",") if item.strip()]
+    if choices is not None:
+        for item in items:
+            if item not in choices:
+                raise argparse.ArgumentTypeError(f"invalid choice: {item} (choose from {', '.join(choices)})")
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline HLS/MP4 download benchmark against a local stand-in CDN")
+    parser.add_argument("--targets", type=lambda v: parse_list(v, TARGETS), default=["hls", "mp4"], help="hls, segments, mp4")
+    parser.add_argument("--variants", type=lambda v: parse_list(v, VARIANTS), default=list(VARIANTS), help="clear, aes, fmp4")
+    parser.add_argument("--engines", type=lambda v: parse_list(v, ENGINES), default=list(ENGINES), help="thread, async")
+    parser.add_argument("--workers", type=lambda v: parse_list(v, cast=int), default=[4, 16], help="Worker counts, e.g. 4,8,16")
+    parser.add_argument("--segments", type=int, default=100, help="Segments per playlist")
+    parser.add_argument("--segment-size", type=int, default=256 * 1024, help="Bytes per segment")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before every segment response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Max random seconds added to or removed from the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of segment requests answered with 503 (0-1)")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="Server bandwidth cap in MB/s, 0 for no cap")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_case(json.loads(args.child))
+        with open(args.result, 'w') as f:
+            json.dump(result, f)
+        return
+
+    profile = CDNProfile(args.latency, args.jitter, args.error_rate, args.bandwidth, args.seed)
+    cdn = LocalCDN(args.segments, args.segment_size, profile).start()
+    results = []
+
+    try:
+        for case in build_cases(args, cdn):
+            console.print(f"[cyan]Run [white]{case['target']} {case['variant']} {case['engine']} x{case['workers']}")
+            results.append((case, spawn_case(case)))
+
+    finally:
+        cdn.stop()
+
+    print_results(results)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump([dict(case, **result) for case, result in results], f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# 17.10.26
+
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Optional
+
+
+# External library
+from Cryptodome.Cipher import AES
+from Cryptodome.Util.Padding import pad
+
+
+# Variable
+VARIANTS = ("clear", "aes", "fmp4")
+TS_PACKET_SIZE = 188
+SEND_CHUNK_SIZE = 64 * 1024
+BURST_SECONDS = 0.1             # Bytes the bandwidth cap lets through at once, in seconds of traffic
+SEGMENT_DURATION = 4
+KEY = bytes(range(16))
+IV = bytes(range(16, 32))
+INIT_SECTION = b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso6" + b"\x00\x00\x00\x08moov"
+
+
+class CDNProfile:
+    """
+    Network conditions simulated by the stand-in CDN.
+    """
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, bandwidth: float = 0.0, seed: int = 0):
+        """
+        Parameters:
+            - latency (float): Seconds before every segment response starts.
+            - jitter (float): Max random seconds added to or removed from the latency.
+            - error_rate (float): Share of segment requests answered with 503 (0-1).
+            - bandwidth (float): Cap in MB/s shared by every connection, 0 for no cap.
+            - seed (int): Seed of the latency and error draws, for reproducible runs.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bandwidth = bandwidth
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def draw_delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def draw_error(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+
+class TokenBucket:
+    """
+    Bandwidth cap shared by all the connections of the server.
+    """
+    def __init__(self, rate: float):
+        """
+        Parameters:
+            - rate (float): Bytes per second.
+        """
+        self.rate = rate
+        self.capacity = rate * BURST_SECONDS
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, n_bytes: int) -> None:
+        """Wait until `n_bytes` can be sent."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= n_bytes
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+
+
+def make_segment(index: int, size: int) -> bytes:
+    """
+    Synthetic MPEG-TS segment: 188 bytes packets starting with the sync byte, the payload tells the segment index.
+    """
+    header = bytes([0x47, 0x01, 0x00, 0x10 | (index & 0x0F)])
+    payload = index.to_bytes(4, 'big') * ((TS_PACKET_SIZE - len(header)) // 4)
+    packet = header + payload
+    return (packet * (size // TS_PACKET_SIZE + 1))[:size]
+
+
+def encrypt_segment(data: bytes) -> bytes:
+    return AES.new(KEY, AES.MODE_CBC, iv=IV).encrypt(pad(data, AES.block_size))
+
+
+class LocalCDN:
+    """
+    Local HTTP server standing in for a CDN, it generates every playlist and segment on request:
+        - /<variant>/master.m3u8: master playlist with one rendition, variant is 'clear', 'aes' or 'fmp4'
+        - /<variant>/index.m3u8: media playlist
+        - /<variant>/seg<i>.ts (.m4s for fmp4), /aes/key.bin, /fmp4/init.mp4
+        - /video.mp4: progressive file of the same size as the segments together
+    Segment requests go through the latency, jitter, error rate and bandwidth cap of the profile.
+    """
+    def __init__(self, n_segments: int = 100, segment_size: int = 256 * 1024, profile: CDNProfile = None):
+        """
+        Parameters:
+            - n_segments (int): Segments in every media playlist.
+            - segment_size (int): Bytes of every clear segment.
+            - profile (CDNProfile): Network conditions.
+        """
+        self.n_segments = n_segments
+        self.segment_size = segment_size
+        self.profile = profile or CDNProfile()
+        self.bucket = TokenBucket(self.profile.bandwidth * 1024 * 1024) if self.profile.bandwidth > 0 else None
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.hits: Dict[str, int] = {'segments': 0, 'errors': 0, 'active': 0, 'peak_active': 0}
+        self.hits_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def master_url(self, variant: str) -> str:
+        return f"{self.base_url}/{variant}/master.m3u8"
+
+    def media_url(self, variant: str) -> str:
+        return f"{self.base_url}/{variant}/index.m3u8"
+
+    @property
+    def mp4_url(self) -> str:
+        return f"{self.base_url}/video.mp4"
+
+    def expected_track(self, variant: str) -> bytes:
+        """Content of the track once downloaded and decrypted, to check a run."""
+        data = b"".join(make_segment(i, self.segment_size) for i in range(self.n_segments))
+        return INIT_SECTION + data if variant == "fmp4" else data
+
+    def master_playlist(self) -> str:
+        bandwidth = int(self.segment_size * 8 / SEGMENT_DURATION)
+        return ("#EXTM3U\n"
+                f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION=1920x1080,CODECS="avc1.640028,mp4a.40.2"\n'
+                "index.m3u8\n")
+
+    def media_playlist(self, variant: str) -> str:
+        extension = "m4s" if variant == "fmp4" else "ts"
+        lines = ["#EXTM3U", "#EXT-X-VERSION:7" if variant == "fmp4" else "#EXT-X-VERSION:3",
+                 f"#EXT-X-TARGETDURATION:{SEGMENT_DURATION}", "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD"]
+
+        if variant == "fmp4":
+            lines.append('#EXT-X-MAP:URI="init.mp4"')
+        if variant == "aes":
+            lines.append(f'#EXT-X-KEY:METHOD=AES-128,URI="key.bin",IV=0x{IV.hex()}')
+
+        for i in range(self.n_segments):
+            lines.append(f"#EXTINF:{SEGMENT_DURATION:.1f},")
+            lines.append(f"seg{i}.{extension}")
+
+        lines.append("#EXT-X-ENDLIST")
+        return "\n".join(lines) + "\n"
+
+    def _make_handler(self):
+        cdn = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b"", content_type: str = "application/octet-stream", throttle: bool = False):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+
+                for start in range(0, len(body), SEND_CHUNK_SIZE):
+                    chunk = body[start:start + SEND_CHUNK_SIZE]
+                    if throttle and cdn.bucket is not None:
+                        cdn.bucket.consume(len(chunk))
+                    self.wfile.write(chunk)
+
+            def do_GET(self):
+                path = self.path.split("?")[0].strip("/")
+                parts = path.split("/")
+
+                if path == "video.mp4":
+                    time.sleep(cdn.profile.draw_delay())
+                    return self._send(200, cdn.expected_track("clear"), "video/mp4", throttle=True)
+
+                if len(parts) != 2 or parts[0] not in VARIANTS:
+                    return self._send(404)
+                variant, name = parts
+
+                if name == "master.m3u8":
+                    return self._send(200, cdn.master_playlist().encode(), "application/vnd.apple.mpegurl")
+                if name == "index.m3u8":
+                    return self._send(200, cdn.media_playlist(variant).encode(), "application/vnd.apple.mpegurl")
+                if name == "key.bin" and variant == "aes":
+                    return self._send(200, KEY)
+                if name == "init.mp4" and variant == "fmp4":
+                    return self._send(200, INIT_SECTION, "video/mp4")
+
+                if not name.startswith("seg"):
+                    return self._send(404)
+
+                try:
+                    index = int(name[3:].split(".")[0])
+                except ValueError:
+                    return self._send(404)
+                if not 0 <= index < cdn.n_segments:
+                    return self._send(404)
+
+                # Segment requests being served at the same time
+                with cdn.hits_lock:
+                    cdn.hits['active'] += 1
+                    cdn.hits['peak_active'] = max(cdn.hits['peak_active'], cdn.hits['active'])
+
+                try:
+                    time.sleep(cdn.profile.draw_delay())
+                    failed = cdn.profile.draw_error()
+                    with cdn.hits_lock:
+                        cdn.hits['segments'] += 1
+                        cdn.hits['errors'] += failed
+                    if failed:
+                        return self._send(503)
+
+                    data = make_segment(index, cdn.segment_size)
+                    if variant == "aes":
+                        data = encrypt_segment(data)
+                    self._send(200, data, "video/mp2t", throttle=True)
+
+                finally:
+                    with cdn.hits_lock:
+                        cdn.hits['active'] -= 1
+
+        return Handler
+
+    def start(self) -> "LocalCDN":
+        """Start serving on a free local port, in a daemon thread."""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,94 @@
+# 17.10.26
+
+"""
+Micro-benchmark of the decrypt stage: inline vs thread vs process decryption of AES segments, in MB/s.
+
+Example:
+    python Test/Benchmark/decrypt_bench.py --segments 24 --segment-size 1048576 --io-workers 8
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from rich.console import Console
+from rich.table import Table
+from Cryptodome.Cipher import AES
+from Cryptodome.Util.Padding import pad
+
+from StreamingCommunity.Lib.M3U8.decryptor import M3U8_Decryption
+from StreamingCommunity.Lib.Downloader.HLS.decrypt_stage import DecryptStage
+
+
+# Variable
+console = Console()
+METHODS = ("AES-128", "AES-128-CTR")
+MODES = ("inline", "thread", "process")
+
+
+def encrypt(method: str, key: bytes, iv: bytes, data: bytes) -> bytes:
+    if method == "AES-128":
+        return AES.new(key, AES.MODE_CBC, iv=iv).encrypt(pad(data, AES.block_size))
+    return AES.new(key, AES.MODE_CTR, nonce=b"", initial_value=iv).encrypt(data)
+
+
+def run_mode(mode: str, decryption: M3U8_Decryption, segments: list, plaintext: bytes, io_workers: int, stage_workers: int) -> float:
+    """
+    Decrypt every segment from `io_workers` threads, as the network workers do.
+
+    Returns:
+        float: Seconds taken, the output is checked against the plaintext.
+    """
+    stage = DecryptStage(mode, workers=stage_workers)
+
+    def work(ciphertext):
+        if mode == "inline":
+            return bytes(decryption.decrypt(ciphertext))
+        return bytes(stage.decrypt(decryption, bytearray(ciphertext)))
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=io_workers) as executor:
+            results = list(executor.map(work, segments))
+        elapsed = time.perf_counter() - start
+    finally:
+        stage.close()
+
+    if any(result != plaintext for result in results):
+        raise RuntimeError(f"Wrong plaintext from the {mode} stage")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline vs offloaded AES segment decryption benchmark")
+    parser.add_argument("--segments", type=int, default=24, help="Segments decrypted per run")
+    parser.add_argument("--segment-size", type=int, default=1024 * 1024, help="Bytes per segment")
+    parser.add_argument("--io-workers", type=int, default=8, help="Threads handing segments to the stage")
+    parser.add_argument("--stage-workers", type=int, default=2, help="Threads or processes of the stage")
+    args = parser.parse_args()
+
+    key, iv = os.urandom(16), os.urandom(16)
+    plaintext = os.urandom(args.segment_size)
+
+    table = Table(title="Segment decryption")
+    for column in ("method", "mode", "MB/s"):
+        table.add_column(column, justify="right" if column == "MB/s" else "left")
+
+    for method in METHODS:
+        decryption = M3U8_Decryption(key, iv, method)
+        segments = [encrypt(method, key, iv, plaintext)] * args.segments
+
+        for mode in MODES:
+            elapsed = run_mode(mode, decryption, segments, plaintext, args.io_workers, args.stage_workers)
+            table.add_row(method, mode, f"{args.segment_size * args.segments / elapsed / 1024 / 1024:.1f}")
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# 17.10.26
+
+import os
+import sys
+import logging
+import tempfile
+import unittest
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+from StreamingCommunity.Lib.Downloader.HLS.concurrency import AdaptiveConcurrency, ConcurrencyStore
+
+logging.getLogger().setLevel(logging.ERROR)
+
+
+def status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "http://cdn.test/seg.ts")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def test_grows_while_healthy(self):
+        controller = AdaptiveConcurrency(2, max_limit=4)
+        for _ in range(50):
+            controller.record_success(0.1, 1000)
+        self.assertEqual(controller.get_limit(), 4)
+
+    def test_rate_limit_halves_once_per_window(self):
+        controller = AdaptiveConcurrency(8)
+        controller.record_failure(status_error(429))
+        controller.record_failure(status_error(429))
+        self.assertEqual(controller.get_limit(), 4)
+
+    def test_ignores_client_errors(self):
+        controller = AdaptiveConcurrency(8)
+        controller.record_failure(status_error(404))
+        for _ in range(8):
+            controller.record_failure(status_error(503))
+        self.assertEqual(controller.get_limit(), 8)
+
+        controller.record_success(0.1, 1000)
+        self.assertEqual(controller.get_limit(), 8)
+
+        # The window closes with too many server errors
+        for _ in range(7):
+            controller.record_success(0.1, 1000)
+        self.assertEqual(controller.get_limit(), 4)
+
+    def test_store_per_host(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConcurrencyStore(os.path.join(tmp_dir, "concurrency.json"))
+            store.set("cdn-a.test", 6)
+            store.set("cdn-b.test", 20)
+            self.assertEqual(store.get("cdn-a.test"), 6)
+            self.assertEqual(store.get("cdn-b.test"), 20)
+            self.assertIsNone(store.get("cdn-c.test"))
+
+
+if __name__ == '__main__':
+    unittest.main()
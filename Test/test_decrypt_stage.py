@@ -0,0 +1,46 @@
+# 17.10.26
+
+import os
+import sys
+import unittest
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Cryptodome.Cipher import AES
+from Cryptodome.Util.Padding import pad
+from StreamingCommunity.Lib.M3U8.decryptor import M3U8_Decryption
+from StreamingCommunity.Lib.Downloader.HLS.decrypt_stage import DecryptStage
+
+
+def encrypt(method: str, key: bytes, iv: bytes, data: bytes) -> bytes:
+    if method == "AES-128":
+        return AES.new(key, AES.MODE_CBC, iv=iv).encrypt(pad(data, AES.block_size))
+    return AES.new(key, AES.MODE_CTR, nonce=b"", initial_value=iv).encrypt(data)
+
+
+class TestDecryptStage(unittest.TestCase):
+    """Every stage mode returns the same plaintext, throughput is measured by Test/Benchmark/decrypt_bench.py."""
+
+    def test_modes_match_reference(self):
+        key, iv = os.urandom(16), os.urandom(16)
+        plaintext = os.urandom(64 * 1024 + 5)
+
+        for method in ("AES-128", "AES-128-CTR"):
+            decryption = M3U8_Decryption(key, iv, method)
+            ciphertext = encrypt(method, key, iv, plaintext)
+            reference = bytes(decryption.decrypt(ciphertext))
+            self.assertEqual(reference, plaintext)
+
+            for mode in ("inline", "thread", "process"):
+                with self.subTest(method=method, mode=mode):
+                    stage = DecryptStage(mode, workers=1)
+                    try:
+                        self.assertEqual(stage.offloaded, mode != "inline")
+                        self.assertEqual(bytes(stage.decrypt(decryption, bytearray(ciphertext))), reference)
+                    finally:
+                        stage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# 17.10.26
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Util.ffmpeg_capabilities import CapabilityStore, FFmpegCapabilities, _list_after_separator
+
+
+ENCODERS_OUTPUT = """Encoders:
+ V..... = Video
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10 (codec h264)
+ S..... mov_text             3GPP Timed Text subtitle
+"""
+
+
+class TestFFmpegCapabilities(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.binary = os.path.join(self.tmp_dir, "ffmpeg")
+        with open(self.binary, 'w') as f:
+            f.write("")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_parse_encoders(self):
+        self.assertEqual(_list_after_separator(ENCODERS_OUTPUT, '------'), ['libx264', 'mov_text'])
+
+    def test_detect_once_per_binary(self):
+        store_path = os.path.join(self.tmp_dir, "capabilities.json")
+        detected = FFmpegCapabilities("7.1", encoders=["mov_text"], hwaccels=["cuda"])
+
+        with mock.patch.object(FFmpegCapabilities, 'detect', return_value=detected) as detect:
+            self.assertTrue(CapabilityStore(store_path).get(self.binary).has_encoder("mov_text"))
+
+            # Another run reads the file, no detection
+            capabilities = CapabilityStore(store_path).get(self.binary)
+            self.assertEqual(detect.call_count, 1)
+            self.assertEqual(capabilities.version, "7.1")
+            self.assertTrue(capabilities.has_hwaccel("cuda"))
+            self.assertFalse(capabilities.has_encoder("webvtt"))
+
+            # A replaced binary is detected again
+            os.utime(self.binary, ns=(0, 0))
+            CapabilityStore(store_path).get(self.binary)
+            self.assertEqual(detect.call_count, 2)
+
+            # Same modification time, new size
+            with open(self.binary, 'w') as f:
+                f.write("upgraded")
+            os.utime(self.binary, ns=(0, 0))
+            CapabilityStore(store_path).get(self.binary)
+            self.assertEqual(detect.call_count, 3)
+
+    def test_binaries_located_again_when_changed(self):
+        store = CapabilityStore(os.path.join(self.tmp_dir, "capabilities.json"))
+        ffprobe = os.path.join(self.tmp_dir, "ffprobe")
+        for path in (self.binary, ffprobe):
+            with open(path, 'w') as f:
+                f.write("")
+            os.chmod(path, 0o755)
+
+        store.set_binaries(self.binary, ffprobe)
+        self.assertEqual(store.get_binaries()['ffmpeg'], self.binary)
+
+        with open(self.binary, 'w') as f:
+            f.write("upgraded")
+        self.assertIsNone(store.get_binaries())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# 17.10.26
+
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+import contextlib
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.FFmpeg import capture
+from StreamingCommunity.Lib.FFmpeg.capture import FFmpegProgress, capture_output
+
+
+class TestFFmpegProgress(unittest.TestCase):
+    def test_progress_block(self):
+        progress = FFmpegProgress(duration=100)
+        block = "fps=N/A\ntotal_size=2048\nout_time_us=25000000\nspeed=2.5x\nprogress=continue"
+
+        closed = [progress.update(*line.split('=', 1)) for line in block.splitlines()]
+        self.assertEqual(closed, [False, False, False, False, True])
+        self.assertEqual(progress.total_size, 2048)
+        self.assertEqual(progress.fps, 0.0)
+        self.assertEqual(progress.get_percentage(), 25.0)
+        self.assertEqual(progress.get_eta(), 30.0)
+        self.assertFalse(progress.is_end)
+
+        progress.update("progress", "end")
+        self.assertTrue(progress.is_end)
+
+    def test_unknown_duration(self):
+        progress = FFmpegProgress()
+        progress.update("speed", "N/A")
+        self.assertIsNone(progress.get_percentage())
+        self.assertIsNone(progress.get_eta())
+
+
+class TestCaptureOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        capture.terminate_flag.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_waits_for_exit_after_stdout_closes(self):
+        output = os.path.join(self.tmp_dir, "out.mp4")
+
+        # Like FFmpeg: the last progress block, stdout closed, then the trailer written
+        script = ("import os, sys, time\n"
+                  "sys.stdout.write('total_size=4\\nprogress=end\\n'); sys.stdout.flush(); os.close(1)\n"
+                  f"time.sleep(0.5)\nopen({output!r}, 'wb').write(b'moov')\n")
+        process = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, universal_newlines=True)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            capture_output(process, "Merge", FFmpegProgress())
+
+        self.assertEqual(process.returncode, 0)
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(), b'moov')
+
+    def test_terminate_flag_kills_process(self):
+        process = subprocess.Popen([sys.executable, "-c", "import time; print('progress=continue', flush=True); time.sleep(30)"],
+                                   stdout=subprocess.PIPE, universal_newlines=True)
+        capture.terminate_flag.set()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            capture_output(process, "Merge", FFmpegProgress())
+
+        self.assertNotEqual(process.wait(timeout=5), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+# 17.10.26
+
+import os
+import sys
+import unittest
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.Downloader.HLS.hedge import HedgePolicy
+
+
+class TestHedgePolicy(unittest.TestCase):
+    def test_threshold_needs_samples(self):
+        policy = HedgePolicy(percentile=90, min_samples=10)
+        for latency in range(9):
+            policy.record_latency(latency / 10)
+        self.assertIsNone(policy.threshold())
+
+        policy.record_latency(0.9)
+        self.assertAlmostEqual(policy.threshold(), 0.9)
+
+    def test_hedges_capped_by_completed_segments(self):
+        policy = HedgePolicy(max_ratio=0.1, min_samples=1)
+        for _ in range(19):
+            policy.record_latency(0.1)
+
+        self.assertTrue(policy.try_hedge())
+        self.assertFalse(policy.try_hedge())
+
+        policy.record_latency(0.1)
+        self.assertTrue(policy.try_hedge())
+        self.assertEqual(policy.n_hedged, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# 17.10.26
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.FFmpeg import command as command_module
+
+
+class TestJoinAll(unittest.TestCase):
+    """Flags of the one-pass merge, FFmpeg itself is not run."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.out_path = os.path.join(self.tmp_dir, "final.mp4")
+        self.codec = SimpleNamespace(video_codec_name="libx264", audio_codec_name="aac", video_bitrate=2000000, audio_bitrate=128000)
+        self.commands = []
+
+        patches = [
+            mock.patch.object(command_module, 'DEBUG_MODE', False),
+            mock.patch.object(command_module, 'USE_GPU', False),
+            mock.patch.object(command_module, 'USE_BITRATE', False),
+            mock.patch.object(command_module, 'get_use_large_bar', return_value=True),
+            mock.patch.object(command_module, 'get_ffmpeg_path', return_value="ffmpeg"),
+            mock.patch.object(command_module, 'select_subtitle_encoder', return_value="mov_text"),
+            mock.patch.object(command_module.os_manager, 'check_file', return_value=True),
+            mock.patch.object(command_module, 'get_video_duration', side_effect=lambda path: 10.0 if "video" in path else 8.0),
+            mock.patch.object(command_module, 'check_duration_v_a', return_value=(False, 2.0)),
+            mock.patch.object(command_module, 'console'),
+            mock.patch('builtins.print')
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _run(self, audio_tracks, subtitles, return_code=0):
+        def capture(ffmpeg_cmd, description, duration=None):
+            self.commands.append(ffmpeg_cmd)
+            with open(self.out_path, 'wb') as f:
+                f.write(b"mp4")
+            return return_code
+
+        with mock.patch.object(command_module, 'capture_ffmpeg_real_time', side_effect=capture):
+            command_module.join_all("video.ts", audio_tracks, subtitles, self.out_path, self.codec)
+        return self.commands[-1]
+
+    def test_subtitles_only_copies_video(self):
+        with mock.patch.object(command_module, 'USE_CODEC', True):
+            cmd = self._run([], [{'path': "it.vtt", 'language': "it"}])
+
+        self.assertIn('-c:v', cmd)
+        self.assertEqual(cmd[cmd.index('-c:v') + 1], "copy")
+        self.assertNotIn('-preset', cmd)
+        self.assertNotIn('-shortest', cmd)
+
+    def test_copy_has_no_preset(self):
+        with mock.patch.object(command_module, 'USE_CODEC', False):
+            cmd = self._run([{'path': "audio.ts", 'name': "it"}], [])
+
+        self.assertEqual(cmd[cmd.index('-c') + 1], "copy")
+        self.assertNotIn('-preset', cmd)
+        self.assertIn('-shortest', cmd)
+
+    def test_encode_with_subtitles_cuts_at_shortest_track(self):
+        with mock.patch.object(command_module, 'USE_CODEC', True), mock.patch.object(command_module, 'USE_VCODEC', True), \
+                mock.patch.object(command_module, 'USE_ACODEC', True):
+            cmd = self._run([{'path': "audio.ts", 'name': "it"}], [{'path': "it.vtt", 'language': "it"}])
+
+        self.assertEqual(cmd[cmd.index('-c:v') + 1], "libx264")
+        self.assertIn('-preset', cmd)
+        self.assertNotIn('-shortest', cmd)
+        self.assertEqual(cmd[cmd.index('-t') + 1], "8.000")
+
+    def test_failed_ffmpeg_raises(self):
+        with mock.patch.object(command_module, 'USE_CODEC', False), self.assertRaises(RuntimeError):
+            self._run([{'path': "audio.ts", 'name': "it"}], [], return_code=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
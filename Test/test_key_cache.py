@@ -0,0 +1,74 @@
+# 17.10.26
+
+import os
+import sys
+import time
+import threading
+import unittest
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.M3U8 import M3U8_Parser
+from StreamingCommunity.Lib.Downloader.HLS.keycache import KeyCache
+
+
+class TestKeyCache(unittest.TestCase):
+    def test_concurrent_requests_fetch_once(self):
+        cache = KeyCache()
+        calls = []
+
+        def fetch(uri):
+            calls.append(uri)
+            time.sleep(0.1)
+            return b"k" * 16
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get("http://cdn/key", fetch))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(calls, ["http://cdn/key"])
+        self.assertEqual(results, [b"k" * 16] * 8)
+
+    def test_lru_eviction(self):
+        cache = KeyCache(max_size=2)
+        for uri in ("a", "b", "c"):
+            cache.get(uri, lambda u: u.encode())
+        self.assertIsNone(cache.get_cached("a"))
+        self.assertEqual(cache.get_cached("c"), b"c")
+
+
+class TestSegmentKeys(unittest.TestCase):
+    def test_rotation_and_sequence_iv(self):
+        playlist = (
+            "#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXT-X-MEDIA-SEQUENCE:7\n"
+            "#EXT-X-KEY:METHOD=AES-128,URI=\"k1\"\n#EXTINF:4.0,\ns0.ts\n"
+            "#EXT-X-KEY:METHOD=AES-128,URI=\"k2\",IV=0x0000000000000000000000000000abcd\n#EXTINF:4.0,\ns1.ts\n"
+            "#EXT-X-KEY:METHOD=NONE\n#EXTINF:4.0,\ns2.ts\n#EXT-X-ENDLIST\n"
+        )
+        parser = M3U8_Parser()
+        parser.parse_data(uri="http://cdn/index.m3u8", raw_content=playlist)
+
+        first, second, third = parser.segment_keys
+        self.assertEqual((first['uri'], first['iv']), ("k1", f"0x{7:032x}"))
+        self.assertEqual((second['uri'], second['iv']), ("k2", "0x0000000000000000000000000000abcd"))
+        self.assertIsNone(third)
+
+    def test_sequence_iv_skips_vtt_entries(self):
+        playlist = (
+            "#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXT-X-MEDIA-SEQUENCE:7\n"
+            "#EXT-X-KEY:METHOD=AES-128,URI=\"k1\"\n#EXTINF:4.0,\ns0.ts\n#EXTINF:4.0,\nsub0.vtt\n"
+            "#EXTINF:4.0,\ns1.ts\n#EXT-X-ENDLIST\n"
+        )
+        parser = M3U8_Parser()
+        parser.parse_data(uri="http://cdn/index.m3u8", raw_content=playlist)
+
+        self.assertEqual(parser.segments, ["s0.ts", "s1.ts"])
+        self.assertEqual([key['iv'] for key in parser.segment_keys], [f"0x{7:032x}", f"0x{8:032x}"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+# 17.10.26
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.M3U8 import M3U8_Parser
+from StreamingCommunity.Lib.Downloader.HLS import segments as segments_module
+
+
+def make_playlist(tags: str = "", endlist: bool = False) -> str:
+    return ("#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXT-X-MEDIA-SEQUENCE:0\n" + tags
+            + "#EXTINF:4.0,\ns0.ts\n#EXTINF:4.0,\ns1.ts\n" + ("#EXT-X-ENDLIST\n" if endlist else ""))
+
+
+class TestLivePlaylist(unittest.TestCase):
+    def _is_live(self, playlist: str, live_recording: bool = False) -> bool:
+        parser = M3U8_Parser()
+        parser.parse_data(uri="http://cdn/index.m3u8", raw_content=playlist)
+
+        # Only the playlist URL is needed, no folder is created
+        segments = segments_module.M3U8_Segments.__new__(segments_module.M3U8_Segments)
+        segments.url = "http://cdn/index.m3u8"
+        with mock.patch.object(segments_module, 'LIVE_RECORDING', live_recording):
+            return segments._is_live(parser)
+
+    def test_untyped_playlist_without_endlist_is_vod(self):
+        self.assertFalse(self._is_live(make_playlist()))
+        self.assertTrue(self._is_live(make_playlist(), live_recording=True))
+
+    def test_event_playlist_is_recorded(self):
+        self.assertTrue(self._is_live(make_playlist("#EXT-X-PLAYLIST-TYPE:EVENT\n")))
+        self.assertFalse(self._is_live(make_playlist("#EXT-X-PLAYLIST-TYPE:EVENT\n", endlist=True)))
+
+    def test_vod_playlist_is_never_recorded(self):
+        self.assertFalse(self._is_live(make_playlist("#EXT-X-PLAYLIST-TYPE:VOD\n"), live_recording=True))
+        self.assertFalse(self._is_live(make_playlist(endlist=True), live_recording=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
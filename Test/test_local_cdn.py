@@ -0,0 +1,159 @@
+# 17.10.26
+
+import io
+import os
+import sys
+import time
+import signal
+import asyncio
+import shutil
+import tempfile
+import unittest
+import threading
+import contextlib
+from unittest import mock
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Benchmark'))
+
+from cdn import LocalCDN, CDNProfile
+from StreamingCommunity.Lib.M3U8 import M3U8_UrlFix
+from StreamingCommunity.Lib.Downloader.HLS import segments as segments_module
+from StreamingCommunity.Lib.Downloader.HLS import downloader as downloader_module
+from StreamingCommunity.Lib.Downloader.HLS.concurrency import ConcurrencyBudget
+from StreamingCommunity.Lib.Downloader.HLS.transport import HLS_Transport
+
+
+class TestLocalCDN(unittest.TestCase):
+    """Download from the stand-in CDN of the benchmark, no internet needed."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cdn = LocalCDN(n_segments=12, segment_size=20000, profile=CDNProfile(latency=0.01, jitter=0.005)).start()
+        self.adaptive = segments_module.ADAPTIVE_WORKERS
+        segments_module.ADAPTIVE_WORKERS = False
+
+    def tearDown(self):
+        segments_module.ADAPTIVE_WORKERS = self.adaptive
+        self.cdn.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_download_variants(self):
+        for variant in ("aes", "fmp4"):
+            with self.subTest(variant=variant):
+                segments = segments_module.M3U8_Segments(self.cdn.media_url(variant), os.path.join(self.tmp_dir, variant))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = segments.download_streams("Video", "video")
+
+                self.assertEqual(result['nFailed'], 0)
+                with open(segments.tmp_file_path, 'rb') as f:
+                    self.assertEqual(f.read(), self.cdn.expected_track(variant))
+
+    def _download_track(self, url: str, folder: str, engine: str) -> bytes:
+        segments = segments_module.M3U8_Segments(url, os.path.join(self.tmp_dir, folder))
+        with mock.patch.object(segments_module, 'DOWNLOAD_ENGINE', engine), contextlib.redirect_stdout(io.StringIO()):
+            result = segments.download_streams("Video", "video")
+
+        self.assertEqual(result['nFailed'], 0)
+        with open(segments.tmp_file_path, 'rb') as f:
+            return f.read()
+
+    def test_async_engine_matches_thread_engine(self):
+        for variant in ("clear", "aes", "fmp4"):
+            with self.subTest(variant=variant):
+                url = self.cdn.media_url(variant)
+                threaded = self._download_track(url, f"thread_{variant}", "thread")
+                self.assertEqual(self._download_track(url, f"async_{variant}", "async"), threaded)
+                self.assertEqual(threaded, self.cdn.expected_track(variant))
+
+    def test_async_engine_retries_errors(self):
+        cdn = LocalCDN(n_segments=20, segment_size=20000, profile=CDNProfile(latency=0.01, error_rate=0.1, seed=3)).start()
+        try:
+            threaded = self._download_track(cdn.media_url("aes"), "thread_errors", "thread")
+            errors = cdn.hits['errors']
+            self.assertEqual(self._download_track(cdn.media_url("aes"), "async_errors", "async"), threaded)
+        finally:
+            cdn.stop()
+
+        self.assertEqual(threaded, cdn.expected_track("aes"))
+        self.assertGreater(errors, 0)
+        self.assertGreater(cdn.hits['errors'], errors)
+
+    def test_parallel_tracks_share_budget(self):
+        budgets = []
+
+        class RecordingBudget(ConcurrencyBudget):
+            def __init__(self, max_total):
+                super().__init__(max_total)
+                self.peak = 0
+                budgets.append(self)
+
+            def try_acquire(self):
+                acquired = super().try_acquire()
+                with self.lock:
+                    self.peak = max(self.peak, self.inflight)
+                return acquired
+
+        cdn = LocalCDN(n_segments=30, segment_size=20000, profile=CDNProfile(latency=0.05, jitter=0.01)).start()
+        manager = downloader_module.DownloadManager(self.tmp_dir, downloader_module.HLSClient(HLS_Transport()), M3U8_UrlFix(cdn.master_url("clear")))
+        audio = {'uri': cdn.media_url("aes"), 'language': "ita"}
+        sigint_handler = signal.getsignal(signal.SIGINT)
+
+        # Each track alone would keep 4 requests in flight, together they get 4
+        try:
+            with mock.patch.object(downloader_module, 'ConcurrencyBudget', RecordingBudget), \
+                    mock.patch.object(downloader_module, 'MAX_WORKERS', 4), \
+                    mock.patch.multiple(segments_module, DEFAULT_VIDEO_WORKERS=4, DEFAULT_AUDIO_WORKERS=4, HEDGE_REQUESTS=False), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                stopped = asyncio.run(manager.download_all_parallel(cdn.media_url("clear"), [audio], []))
+        finally:
+            signal.signal(signal.SIGINT, sigint_handler)
+            cdn.stop()
+
+        self.assertFalse(stopped)
+        self.assertEqual([result['nFailed'] for result in manager.missing_segments], [0, 0])
+        with open(os.path.join(self.tmp_dir, 'video', '0.ts'), 'rb') as f:
+            self.assertEqual(f.read(), cdn.expected_track("clear"))
+        with open(os.path.join(self.tmp_dir, 'audio', 'ita', '0.ts'), 'rb') as f:
+            self.assertEqual(f.read(), cdn.expected_track("aes"))
+
+        self.assertEqual(budgets[0].peak, 4)
+        self.assertLessEqual(cdn.hits['peak_active'], 4)
+        self.assertEqual(budgets[0].inflight, 0)
+
+    def test_slow_muxer_pipe_gets_whole_track(self):
+        read_fd, write_fd = os.pipe()
+        received = bytearray()
+
+        # The muxer starts reading long after the downloads are over, like FFmpeg waiting for another track
+        def read_pipe():
+            time.sleep(1)
+            with os.fdopen(read_fd, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    received.extend(chunk)
+
+        reader = threading.Thread(target=read_pipe)
+        reader.start()
+
+        segments = segments_module.M3U8_Segments(self.cdn.media_url("clear"), os.path.join(self.tmp_dir, "pipe"))
+        segments.output_pipe = lambda: os.fdopen(write_fd, 'wb')
+        with mock.patch.object(segments_module, 'WRITER_JOIN_TIMEOUT', 0.1), contextlib.redirect_stdout(io.StringIO()):
+            result = segments.download_streams("Video", "video")
+        reader.join()
+
+        self.assertEqual(result['nFailed'], 0)
+        self.assertEqual(bytes(received), self.cdn.expected_track("clear"))
+
+    def test_closed_muxer_pipe_fails_track(self):
+        read_fd, write_fd = os.pipe()
+        os.close(read_fd)
+
+        segments = segments_module.M3U8_Segments(self.cdn.media_url("clear"), os.path.join(self.tmp_dir, "closed"))
+        segments.output_pipe = lambda: os.fdopen(write_fd, 'wb')
+        with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(RuntimeError):
+            segments.download_streams("Video", "video")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+# 17.10.26
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.FFmpeg import util
+
+
+PROBE_OUTPUT = json.dumps({
+    'format': {'format_name': 'mpegts', 'duration': '12.5'},
+    'streams': [{'codec_type': 'video', 'codec_name': 'h264'}, {'codec_type': 'audio', 'codec_name': 'aac'}]
+})
+
+
+class TestMediaInfo(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, "0.ts")
+        with open(self.file_path, 'wb') as f:
+            f.write(b"data")
+
+        util._media_info_cache.clear()
+        self.run = mock.patch.object(util.subprocess, 'run', return_value=mock.Mock(returncode=0, stdout=PROBE_OUTPUT)).start()
+        mock.patch.object(util, 'get_ffprobe_path', return_value=sys.executable).start()
+
+    def tearDown(self):
+        mock.patch.stopall()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_probe_once_per_file(self):
+        self.assertEqual(util.get_video_duration(self.file_path), 12.5)
+        self.assertTrue(util.has_audio_stream(self.file_path))
+        self.assertEqual(util.get_ffprobe_info(self.file_path), {'format_name': 'mpegts', 'codec_names': ['h264', 'aac']})
+        self.assertEqual(self.run.call_count, 1)
+
+        # A rewritten file is probed again
+        with open(self.file_path, 'ab') as f:
+            f.write(b"more")
+        util.get_video_duration(self.file_path)
+        self.assertEqual(self.run.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# 17.10.26
+
+import os
+import sys
+import unittest
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.Downloader.metrics import MetricsHub, ThroughputWindow
+
+
+class TestMetricsHub(unittest.TestCase):
+    def test_throughput_window(self):
+        window = ThroughputWindow(window=2)
+        window.started = 100
+        window.add(1000, 100.2)
+        window.add(3000, 101.5)
+        window.add(500, 102.1)     # Current second, not complete yet
+
+        self.assertEqual(window.rate(102.5), 2000)
+        self.assertEqual(window.rate(110.0), 0)
+
+    def test_job_and_totals(self):
+        hub = MetricsHub()
+        video, audio = hub.start_job("Video"), hub.start_job("Audio")
+        video.record_bytes(100)
+        video.record_request(0.5)
+        video.record_request(1.5)
+        audio.record_bytes(50)
+        audio.record_retry()
+        hub.end_job(audio)
+
+        snapshot = hub.snapshot()
+        self.assertEqual((snapshot['bytes'], snapshot['requests'], snapshot['retries']), (150, 2, 1))
+        self.assertEqual(snapshot['avg_latency'], 1.0)
+        self.assertEqual(snapshot['active_jobs'], 1)
+        self.assertEqual([job.name for job in hub.get_active_jobs()], ["Video"])
+        self.assertEqual(snapshot['jobs'][1]['bytes'], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
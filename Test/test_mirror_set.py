@@ -0,0 +1,44 @@
+# 17.10.26
+
+import os
+import sys
+import unittest
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.Downloader.HLS.mirrors import MirrorSet, rewrite_host
+
+
+class TestMirrorSet(unittest.TestCase):
+    def test_spread_and_failover(self):
+        mirrors = MirrorSet(["a", "b", "c"], fail_threshold=2)
+        self.assertEqual([mirrors.pick(i) for i in range(4)], [0, 1, 2, 0])
+
+        # Retries move to the next source
+        self.assertEqual(mirrors.pick(0, attempt=1), 1)
+
+        mirrors.record_failure(1)
+        mirrors.record_success(1)
+        mirrors.record_failure(1)
+        self.assertEqual(mirrors.pick(1), 1)
+
+        mirrors.record_failure(1)
+        self.assertEqual([mirrors.pick(i) for i in range(4)], [0, 2, 0, 2])
+        self.assertTrue(mirrors.has_alternative(0))
+
+    def test_single_source(self):
+        mirrors = MirrorSet(["a"], fail_threshold=1)
+        mirrors.record_failure(0)
+        self.assertEqual(mirrors.pick(5, attempt=3), 0)
+        self.assertFalse(mirrors.has_alternative(0))
+
+    def test_rewrite_host(self):
+        self.assertEqual(
+            rewrite_host("https://cdn1.example.com/v/seg1.ts?token=x", "cdn2.example.com:8443"),
+            "https://cdn2.example.com:8443/v/seg1.ts?token=x"
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
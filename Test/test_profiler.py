@@ -0,0 +1,68 @@
+# 17.10.26
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+import contextlib
+from unittest import mock
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Util import profiler as profiler_module
+from StreamingCommunity.Util.profiler import PhaseProfiler
+
+
+class TestPhaseProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_disabled_is_transparent(self):
+        profiler = PhaseProfiler()
+
+        @profiler.timed('download_film')
+        def download_film(name):
+            return name.upper()
+
+        self.assertEqual(download_film("film"), "FILM")
+        self.assertEqual(profiler.stats, {})
+
+    def test_nested_phases_and_dumps(self):
+        profiler = PhaseProfiler()
+        profiler.enable(self.tmp_dir, use_cprofile=True)
+
+        @profiler.timed('download_film')
+        def download_film():
+            with profiler.phase('download'):
+                time.sleep(0.05)
+            with profiler.phase('merge'):
+                pass
+
+        download_film()
+        download_film()
+
+        self.assertEqual(list(profiler.stats), ['download_film/download', 'download_film/merge', 'download_film'])
+        self.assertEqual(profiler._get_ordered_paths(), ['download_film', 'download_film/download', 'download_film/merge'])
+        self.assertEqual(profiler.stats['download_film'].count, 2)
+        self.assertGreaterEqual(profiler.stats['download_film/download'].total, 0.1)
+        self.assertLess(profiler._get_self_time('download_film'), profiler.stats['download_film/download'].total)
+
+        with contextlib.redirect_stdout(io.StringIO()), mock.patch.object(profiler_module.console, 'print'):
+            profiler.report()
+
+        with open(os.path.join(self.tmp_dir, "summary.json")) as f:
+            summary = json.load(f)
+        self.assertEqual(summary['phases']['download_film/merge']['count'], 2)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, "download_film_download.prof")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+# 17.10.26
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+import unittest
+from unittest import mock
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.Downloader.HLS.journal import SegmentJournal, STATUS_FAILED, OWN_FILE_OFFSET, INIT_INDEX
+from StreamingCommunity.Lib.Downloader.HLS import segments as segments_module
+
+logging.getLogger().setLevel(logging.ERROR)
+
+
+class TestSegmentJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data_path = os.path.join(self.tmp_dir, "0.ts")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _append(self, journal, index, content):
+        with open(self.data_path, 'ab') as f:
+            offset = f.tell()
+            f.write(content)
+        journal.record(index, offset, len(content))
+
+    def test_resume_only_pending_segments(self):
+        journal = SegmentJournal(self.tmp_dir)
+        self.assertFalse(journal.open(4, "abc"))
+        self._append(journal, 0, b"AA")
+        journal.record(1, 2, 0, STATUS_FAILED)
+        self._append(journal, 2, b"CC")
+        journal.close()
+
+        # Partial record left by a crash
+        with open(journal.path, 'a') as f:
+            f.write("3 4 ")
+
+        resumed = SegmentJournal(self.tmp_dir)
+        self.assertTrue(resumed.open(4, "abc"))
+        self.assertEqual(resumed.get_pending(), [1, 3])
+        self.assertEqual(resumed.get_data_size(), 4)
+        self.assertFalse(SegmentJournal.is_track_complete(self.tmp_dir))
+        resumed.close()
+
+    def test_other_playlist_restarts(self):
+        journal = SegmentJournal(self.tmp_dir)
+        journal.open(2, "abc")
+        self._append(journal, 0, b"AA")
+        journal.close()
+
+        other = SegmentJournal(self.tmp_dir)
+        self.assertFalse(other.open(2, "def"))
+        self.assertEqual(other.get_pending(), [0, 1])
+        other.close()
+
+    def test_reorder_filled_holes(self):
+        journal = SegmentJournal(self.tmp_dir)
+        journal.open(3, "abc")
+        self._append(journal, 0, b"AA")
+        self._append(journal, 2, b"CC")
+        self._append(journal, 1, b"BB")
+
+        self.assertTrue(journal.needs_reorder())
+        journal.reorder(self.data_path)
+        journal.mark_complete()
+        journal.close()
+
+        with open(self.data_path, 'rb') as f:
+            self.assertEqual(f.read(), b"AABBCC")
+        self.assertTrue(SegmentJournal.is_track_complete(self.tmp_dir))
+
+    def test_reorder_keeps_init_section_first(self):
+        journal = SegmentJournal(self.tmp_dir)
+        journal.open(2, "abc")
+        self._append(journal, INIT_INDEX, b"II")
+        self._append(journal, 1, b"BB")
+        self._append(journal, 0, b"AA")
+
+        self.assertEqual(sorted(journal.get_written()), [0, 1])
+        self.assertTrue(journal.has_init())
+        journal.reorder(self.data_path)
+        journal.close()
+
+        with open(self.data_path, 'rb') as f:
+            self.assertEqual(f.read(), b"IIAABB")
+
+    def test_assemble_own_segment_files(self):
+        journal = SegmentJournal(self.tmp_dir)
+        journal.open(3, "abc")
+        self._append(journal, 0, b"AA")
+        os.makedirs(journal.segment_folder)
+
+        for index, content in ((2, b"CC"), (1, b"BB")):
+            with open(journal.get_segment_path(index), 'wb') as f:
+                f.write(content)
+            journal.record(index, OWN_FILE_OFFSET, len(content))
+
+        self.assertEqual(journal.get_data_size(), 2)
+        self.assertTrue(journal.needs_reorder())
+        journal.reorder(self.data_path)
+        journal.close()
+
+        with open(self.data_path, 'rb') as f:
+            self.assertEqual(f.read(), b"AABBCC")
+        self.assertFalse(os.path.exists(journal.segment_folder))
+
+    def test_resume_finishes_interrupted_reorder(self):
+        journal = SegmentJournal(self.tmp_dir)
+        journal.open(2, "abc")
+        self._append(journal, 1, b"BB")
+        self._append(journal, 0, b"AA")
+
+        # Crash after the journal is rewritten, before the data file is swapped in
+        real_replace = os.replace
+
+        def replace(src, dst):
+            if dst == self.data_path:
+                raise OSError("crash")
+            real_replace(src, dst)
+
+        with mock.patch('StreamingCommunity.Lib.Downloader.HLS.journal.os.replace', side_effect=replace):
+            with self.assertRaises(OSError):
+                journal.reorder(self.data_path)
+        journal.close()
+
+        resumed = SegmentJournal(self.tmp_dir)
+        self.assertTrue(resumed.open(2, "abc"))
+        self.assertFalse(resumed.needs_reorder())
+        resumed.close()
+
+        with open(self.data_path, 'rb') as f:
+            self.assertEqual(f.read(), b"AABB")
+        self.assertFalse(os.path.exists(f"{self.data_path}.reorder"))
+
+    def test_direct_assembly_skips_failed_segment(self):
+        segments = segments_module.M3U8_Segments("http://127.0.0.1/index.m3u8", self.tmp_dir)
+        segments.segments = [f"seg{i}.ts" for i in range(3)]
+        segments.playlist_id = "abc"
+        segments.direct_assembly = True
+        segments._prepare_journal()
+
+        for index, content in ((2, b"CC"), (0, b"AA")):
+            with open(segments.journal.get_segment_path(index), 'wb') as f:
+                f.write(content)
+            segments.journal.record(index, OWN_FILE_OFFSET, len(content))
+            segments.downloaded_segments.add(index)
+        segments.journal.record(1, OWN_FILE_OFFSET, 0, STATUS_FAILED)
+        segments.info_nFailed = 1
+
+        # One segment missing out of three is too much for verification, the data file stays as is
+        segments._finalize_journal()
+        self.assertEqual(os.path.getsize(self.data_path), 0)
+
+        segments.journal.open(3, "abc")
+        with mock.patch.object(segments_module, 'MIN_COMPLETE_RATIO', 0.5):
+            segments._finalize_journal()
+
+        with open(self.data_path, 'rb') as f:
+            self.assertEqual(f.read(), b"AACC")
+        self.assertFalse(os.path.exists(segments.journal.segment_folder))
+        self.assertFalse(SegmentJournal.is_track_complete(self.tmp_dir))
+
+        # The failed segment is fetched again on resume
+        resumed = SegmentJournal(self.tmp_dir)
+        self.assertTrue(resumed.open(3, "abc"))
+        self.assertEqual(resumed.get_pending(), [1])
+        resumed.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
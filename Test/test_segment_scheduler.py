@@ -0,0 +1,41 @@
+# 17.10.26
+
+import os
+import sys
+import unittest
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.Downloader.HLS.scheduler import SegmentScheduler
+
+
+class TestSegmentScheduler(unittest.TestCase):
+    def test_retry_goes_ahead_after_backoff(self):
+        scheduler = SegmentScheduler([2, 0, 1, 3])
+        self.assertEqual(scheduler.pop(), (0, 0))
+        self.assertEqual(scheduler.pop(), (1, 0))
+
+        scheduler.retry(0, 1, 0)
+        scheduler.retry(1, 1, 60)
+        self.assertEqual(scheduler.pop(), (0, 1))
+        self.assertEqual(scheduler.pop(), (2, 0))
+        self.assertEqual(scheduler.pop(), (3, 0))
+
+        # Only the delayed retry is left
+        self.assertIsNone(scheduler.pop())
+        self.assertEqual(len(scheduler), 1)
+        self.assertGreater(scheduler.next_ready_in(), 0)
+
+    def test_add_live_segments(self):
+        scheduler = SegmentScheduler([0, 1])
+        self.assertEqual(scheduler.pop(), (0, 0))
+
+        scheduler.retry(0, 1, 0)
+        scheduler.add([2, 3])
+        self.assertEqual([scheduler.pop() for _ in range(4)], [(0, 1), (1, 0), (2, 0), (3, 0)])
+        self.assertIsNone(scheduler.next_ready_in())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+# 17.10.26
+
+import os
+import sys
+import unittest
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Cryptodome.Cipher import AES
+from Cryptodome.Util.Padding import pad
+from StreamingCommunity.Lib.M3U8.decryptor import M3U8_Decryption
+
+
+class TestStreamDecryptor(unittest.TestCase):
+    def test_chunked_cbc_matches_whole_segment(self):
+        key, iv = os.urandom(16), os.urandom(16)
+        decryption = M3U8_Decryption(key, iv, "AES-128")
+
+        for size in (0, 15, 16, 188 * 50 + 3):
+            plaintext = os.urandom(size)
+            ciphertext = AES.new(key, AES.MODE_CBC, iv=iv).encrypt(pad(plaintext, AES.block_size))
+
+            for chunk_size in (1, 7, 16, 4096):
+                stream = decryption.new_stream()
+                out = b"".join(stream.update(ciphertext[i:i + chunk_size]) for i in range(0, len(ciphertext), chunk_size))
+                self.assertEqual(out + stream.finalize(), plaintext)
+
+            # Every segment starts from a fresh cipher
+            self.assertEqual(decryption.decrypt(ciphertext), plaintext)
+
+    def test_truncated_segment_fails(self):
+        key, iv = os.urandom(16), os.urandom(16)
+        stream = M3U8_Decryption(key, iv, "AES-128").new_stream()
+        stream.update(os.urandom(40))
+        with self.assertRaises(ValueError):
+            stream.finalize()
+
+
+if __name__ == '__main__':
+    unittest.main()
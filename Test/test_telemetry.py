@@ -0,0 +1,68 @@
+# 17.10.26
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.Downloader.metrics import MetricsHub
+from StreamingCommunity.Lib.Downloader.telemetry import Telemetry
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.jsonl_path = os.path.join(self.tmp_dir, "events.jsonl")
+        self.prom_path = os.path.join(self.tmp_dir, "sc.prom")
+        self.hub = MetricsHub()
+        self.telemetry = Telemetry(self.jsonl_path, self.prom_path, self.hub)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_job_and_phase_export(self):
+        job = self.hub.start_job('Audio "ita"', kind="hls")
+        job.record_bytes(2048)
+        job.record_request(0.07)
+        job.record_request(3.0)
+        job.record_retry()
+        job.record_reorder_depth(4)
+        job.record_reorder_depth(1)
+        self.hub.end_job(job)
+        self.telemetry.end_job(job, segments=2)
+
+        with self.assertRaises(RuntimeError):
+            with self.telemetry.phase('merge', kind='hls'):
+                raise RuntimeError("ffmpeg failed")
+
+        with open(self.jsonl_path) as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual([event['event'] for event in events], ['job_end', 'phase'])
+        self.assertEqual((events[0]['kind'], events[0]['bytes'], events[0]['retries'], events[0]['segments']), ('hls', 2048, 1, 2))
+        self.assertEqual((events[0]['reorder_depth'], events[0]['reorder_peak']), (1, 4))
+        self.assertEqual((events[1]['phase'], events[1]['ok']), ('merge', False))
+
+        with open(self.prom_path) as f:
+            prom = f.read()
+        self.assertIn('streamingcommunity_segment_latency_seconds_bucket{le="0.05"} 0', prom)
+        self.assertIn('streamingcommunity_segment_latency_seconds_bucket{le="0.1"} 1', prom)
+        self.assertIn('streamingcommunity_segment_latency_seconds_bucket{le="+Inf"} 2', prom)
+        self.assertIn('streamingcommunity_job_bytes{id="1",job="Audio \\"ita\\"",kind="hls"} 2048', prom)
+        self.assertIn('streamingcommunity_phase_runs_total{phase="merge"} 1', prom)
+        self.assertFalse(os.path.exists(f"{self.prom_path}.tmp"))
+
+    def test_disabled(self):
+        telemetry = Telemetry(None, None, self.hub)
+        with telemetry.phase('post_process'):
+            pass
+        telemetry.end_job(self.hub.start_job("Video"))
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+# 17.10.26
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Fix import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from StreamingCommunity.Lib.M3U8 import estimator
+from StreamingCommunity.Lib.M3U8.estimator import M3U8_Ts_Estimator
+
+
+class TestTsEstimator(unittest.TestCase):
+    def test_running_stats_and_eta(self):
+        clock = [100.0]
+        with mock.patch.object(estimator.time, 'monotonic', side_effect=lambda: clock[0]):
+            ts_estimator = M3U8_Ts_Estimator(10)
+            self.assertIsNone(ts_estimator.get_eta(0))
+
+            # 1000 bytes per segment, one segment per second
+            for _ in range(4):
+                clock[0] += 1
+                ts_estimator.add_ts_file(1000)
+
+        self.assertEqual(ts_estimator.count, 4)
+        self.assertEqual(ts_estimator.get_total_size(), 10000)
+        self.assertAlmostEqual(ts_estimator.ewma_throughput, 1000)
+        self.assertAlmostEqual(ts_estimator.get_eta(4), 6.0)
+
+    def test_invalid_size_ignored(self):
+        ts_estimator = M3U8_Ts_Estimator(10)
+        ts_estimator.add_ts_file(0)
+        self.assertEqual(ts_estimator.count, 0)
+        self.assertEqual(ts_estimator.get_mean_size(), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()